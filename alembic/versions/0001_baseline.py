@@ -0,0 +1,140 @@
+"""Baseline schema
+
+Matches the tables previously created by Base.metadata.create_all. Existing
+databases created that way should be marked with ``alembic stamp 0001``
+before upgrading.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+MENU_ITEM_TYPES = ("BEVERAGE", "FOOD", "DESSERT", "SNACK")
+PRODUCT_TYPES = ("COSMETIC", "CAR_PART", "CLOTHING", "DIGITAL", "PHYSICAL")
+
+
+def _timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "merchants",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        *_timestamps(),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_merchants_id", "merchants", ["id"])
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(), nullable=True),
+        sa.Column("hashed_password", sa.String(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "menu_categories",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        *_timestamps(),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("slug", sa.String(), nullable=True),
+        sa.Column("translations", sa.JSON(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("image_url", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("display_order", sa.Integer(), nullable=True),
+        sa.Column("merchant_id", sa.Integer(), sa.ForeignKey("merchants.id"), nullable=True),
+        sa.Column("parent_id", sa.Integer(), sa.ForeignKey("menu_categories.id"), nullable=True),
+    )
+    op.create_index("ix_menu_categories_id", "menu_categories", ["id"])
+    op.create_index("ix_menu_categories_name", "menu_categories", ["name"])
+    op.create_index("ix_menu_categories_slug", "menu_categories", ["slug"], unique=True)
+
+    op.create_table(
+        "menu_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        *_timestamps(),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("price_usd", sa.Float(), nullable=True),
+        sa.Column("price_khr", sa.Float(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("translations", sa.JSON(), nullable=True),
+        sa.Column("image_url", sa.String(), nullable=True),
+        sa.Column("item_type", sa.Enum(*MENU_ITEM_TYPES, name="menuitemtype"), nullable=True),
+        sa.Column("attributes", sa.JSON(), nullable=True),
+        sa.Column("merchant_id", sa.Integer(), sa.ForeignKey("merchants.id"), nullable=True),
+        sa.Column("category_id", sa.Integer(), sa.ForeignKey("menu_categories.id"), nullable=True),
+        sa.Column("external_id", sa.String(), nullable=True),
+        sa.UniqueConstraint("merchant_id", "external_id", name="uq_menu_items_merchant_external_id"),
+    )
+    op.create_index("ix_menu_items_id", "menu_items", ["id"])
+    op.create_index("ix_menu_items_name", "menu_items", ["name"])
+
+    op.create_table(
+        "menu_category_stats",
+        sa.Column(
+            "category_id",
+            sa.Integer(),
+            sa.ForeignKey("menu_categories.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("items_total", sa.Integer(), nullable=False),
+        sa.Column("items_active", sa.Integer(), nullable=False),
+        sa.Column("items_by_type", sa.JSON(), nullable=False),
+        sa.Column("min_price_usd", sa.Float(), nullable=True),
+        sa.Column("max_price_usd", sa.Float(), nullable=True),
+        sa.Column("min_price_khr", sa.Float(), nullable=True),
+        sa.Column("max_price_khr", sa.Float(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+    op.create_table(
+        "categories",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        *_timestamps(),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("parent_id", sa.Integer(), sa.ForeignKey("categories.id"), nullable=True),
+    )
+    op.create_index("ix_categories_id", "categories", ["id"])
+    op.create_index("ix_categories_name", "categories", ["name"], unique=True)
+
+    op.create_table(
+        "products",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        *_timestamps(),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("price", sa.Float(), nullable=True),
+        sa.Column("stock", sa.Integer(), nullable=True),
+        sa.Column("type", sa.Enum(*PRODUCT_TYPES, name="producttype"), nullable=True),
+        sa.Column("attributes", sa.JSON(), nullable=True),
+        sa.Column("category_id", sa.Integer(), sa.ForeignKey("categories.id"), nullable=True),
+    )
+    op.create_index("ix_products_id", "products", ["id"])
+    op.create_index("ix_products_name", "products", ["name"])
+
+
+def downgrade() -> None:
+    op.drop_table("products")
+    op.drop_table("categories")
+    op.drop_table("menu_category_stats")
+    op.drop_table("menu_items")
+    op.drop_table("menu_categories")
+    op.drop_table("users")
+    op.drop_table("merchants")
+    sa.Enum(name="producttype").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="menuitemtype").drop(op.get_bind(), checkfirst=True)
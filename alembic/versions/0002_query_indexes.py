@@ -0,0 +1,99 @@
+"""Composite, partial and GIN indexes for the hot query paths
+
+* menu_items: (merchant_id, category_id, id) for GET /menu/ filters and
+  keyset paging, plus a partial index over active items.
+* menu_categories: (merchant_id, parent_id, is_active, display_order) for
+  GET /categories/, plus a partial index over active categories.
+* products: (type, category_id) for GET /products/.
+* On Postgres, translations/attributes become JSONB with GIN indexes.
+
+Indexes are built CONCURRENTLY on Postgres so large tables stay writable.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+JSON_COLUMNS = (
+    ("menu_items", "translations"),
+    ("menu_items", "attributes"),
+    ("menu_categories", "translations"),
+    ("products", "attributes"),
+)
+
+# name, table, columns, options
+INDEXES = (
+    ("ix_menu_items_merchant_category", "menu_items", ["merchant_id", "category_id", "id"], {}),
+    ("ix_menu_items_category_id", "menu_items", ["category_id"], {}),
+    ("ix_menu_items_active_merchant_category", "menu_items", ["merchant_id", "category_id"],
+     {"postgresql_where": sa.text("is_active"), "sqlite_where": sa.text("is_active")}),
+    ("ix_menu_categories_merchant_parent_active_order", "menu_categories",
+     ["merchant_id", "parent_id", "is_active", "display_order"], {}),
+    ("ix_menu_categories_active_merchant_parent_order", "menu_categories",
+     ["merchant_id", "parent_id", "display_order", "id"],
+     {"postgresql_where": sa.text("is_active"), "sqlite_where": sa.text("is_active")}),
+    ("ix_products_type_category", "products", ["type", "category_id"], {}),
+    ("ix_products_category_id", "products", ["category_id"], {}),
+)
+
+GIN_INDEXES = (
+    ("ix_menu_items_translations_gin", "menu_items", "translations", None),
+    ("ix_menu_items_attributes_gin", "menu_items", "attributes", "jsonb_path_ops"),
+    ("ix_menu_categories_translations_gin", "menu_categories", "translations", None),
+    ("ix_products_attributes_gin", "products", "attributes", "jsonb_path_ops"),
+)
+
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    postgres = _is_postgres()
+    if postgres:
+        for table, column in JSON_COLUMNS:
+            op.alter_column(
+                table, column,
+                type_=JSONB(),
+                existing_type=sa.JSON(),
+                postgresql_using=f"{column}::jsonb",
+            )
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=postgres, **options)
+        if postgres:
+            for name, table, column, ops in GIN_INDEXES:
+                op.create_index(
+                    name, table, [column],
+                    postgresql_using="gin",
+                    postgresql_ops={column: ops} if ops else {},
+                    postgresql_concurrently=True,
+                )
+
+
+def downgrade() -> None:
+    postgres = _is_postgres()
+    with op.get_context().autocommit_block():
+        if postgres:
+            for name, table, _, _ in GIN_INDEXES:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        for name, table, _, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=postgres)
+
+    if postgres:
+        for table, column in JSON_COLUMNS:
+            op.alter_column(
+                table, column,
+                type_=sa.JSON(),
+                existing_type=JSONB(),
+                postgresql_using=f"{column}::json",
+            )
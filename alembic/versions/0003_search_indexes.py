@@ -0,0 +1,54 @@
+"""Full-text and trigram search indexes
+
+Adds pg_trgm, the immutable catalog_search_text() function and, per
+searchable table, GIN indexes over its tsvector and its trigrams. The
+expressions match app/db/search.py. No-op outside Postgres, where search
+uses the in-process index.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+from app.db.search import SEARCH_TEXT_FUNCTION
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# table, catalog_search_text() arguments
+SEARCH_DOCUMENTS = (
+    ("menu_items", "name, NULL::text, translations"),
+    ("menu_categories", "name, description, translations"),
+    ("products", "name, description, NULL::jsonb"),
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(SEARCH_TEXT_FUNCTION)
+    with op.get_context().autocommit_block():
+        for table, arguments in SEARCH_DOCUMENTS:
+            document = f"catalog_search_text({arguments})"
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_search_tsv ON {table} "
+                f"USING gin (to_tsvector('simple'::regconfig, {document}))"
+            )
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_search_trgm ON {table} "
+                f"USING gin ({document} gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        for table, _ in SEARCH_DOCUMENTS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_search_trgm")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_search_tsv")
+    op.execute("DROP FUNCTION IF EXISTS catalog_search_text(text, text, jsonb)")
@@ -1,11 +1,14 @@
 # app/api/deps.py
+import time
 from typing import Generator
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import SessionLocal, get_async_db
 from app.core.config import settings
+from app.core.security import Principal, principal_cache, token_digest
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token")
@@ -17,10 +20,16 @@ def get_db() -> Generator:
     finally:
         db.close()
 
-async def get_current_user(
-        db: Session = Depends(get_db),
-        token: str = Depends(oauth2_scheme)
-) -> User:
+async def resolve_principal(db: AsyncSession, token: str) -> Principal:
+    """
+    Resolve a bearer token to a Principal. Verified tokens are cached until
+    their ``exp`` so repeat requests skip both jwt.decode and the users lookup.
+    """
+    digest = token_digest(token)
+    principal = await principal_cache.get(digest)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -36,14 +45,42 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+    user = await db.scalar(select(User).where(User.username == username))
     if user is None:
         raise credentials_exception
-    return user
+
+    principal = Principal(
+        id=user.id,
+        username=user.username,
+        is_active=getattr(user, "is_active", True)
+    )
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        await principal_cache.set(
+            digest, principal, ttl=float(expires_at) - time.time(), tags=[("user", username)]
+        )
+    return principal
+
+async def get_current_user(
+        db: AsyncSession = Depends(get_async_db),
+        token: str = Depends(oauth2_scheme)
+) -> Principal:
+    return await resolve_principal(db, token)
+
+def check_profiler_user(principal: Principal) -> None:
+    if principal.username not in settings.PROFILER_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Profiling is not enabled for this user"
+        )
+
+def get_profiler_user(current_user: Principal = Depends(get_current_user)) -> Principal:
+    check_profiler_user(current_user)
+    return current_user
 
 def get_current_active_user(
-        current_user: User = Depends(get_current_user),
-) -> User:
+        current_user: Principal = Depends(get_current_user),
+) -> Principal:
     if not current_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
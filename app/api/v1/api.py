@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from app.api.v1.endpoints import auth, menu, protected
-from app.api.v1.endpoints import categories
+from app.api.v1.endpoints import categories, products, search, system
 
 api_router = APIRouter()
 api_router.include_router(menu.router, prefix="/menu", tags=["menu"])
@@ -12,4 +12,10 @@ api_router.include_router(
     prefix="/categories",
     tags=["categories"]
 )
-
+api_router.include_router(
+    products.router,
+    prefix="/products",
+    tags=["products"]
+)
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(system.router, prefix="/system", tags=["system"])
@@ -1,10 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.core.security import verify_password, create_access_token, get_password_hash
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.security import (
+    create_access_token,
+    get_password_hash_async,
+    invalidate_user,
+    verify_password_async,
+)
 from app.models.user import User as UserModel
 from app.schemas.user import UserCreate, User as UserSchema, Token
-from app.db.session import get_db
+from app.db.session import get_async_db
 
 router = APIRouter()
 
@@ -14,23 +20,24 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
         form_data: OAuth2PasswordRequestForm = Depends(),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(UserModel).filter(UserModel.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.scalar(select(UserModel).where(UserModel.username == form_data.username))
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=400,
             detail="Incorrect username or password"
         )
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_access_token(user.username)
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/users/", response_model=UserSchema)
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    hashed_password = get_password_hash(user.password)
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    hashed_password = await get_password_hash_async(user.password)
     db_user = UserModel(username=user.username, hashed_password=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    await invalidate_user(db_user.username)
     return db_user
@@ -1,121 +1,286 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from app.api.deps import get_current_user
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import and_, exists, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.db.session import get_db
-from app.models.menu import MenuCategory
-from app.schemas.menu import Category, CategoryCreate
+from app.core.config import settings
+from app.core.menu_cache import invalidate_merchant_menu
+from app.db.session import get_async_db
+from app.models.menu import MenuCategory, MenuItem
+from app.schemas.menu import (
+    Category,
+    CategoryCreate,
+    CategoryListResponse,
+    LocalizedCategory,
+    LocalizedCategoryListResponse,
+)
+from app.utils.category_tree import attach_subcategories, build_category_tree, category_node, category_query
+from app.utils.etag import etag_matches, not_modified_response, query_etag, weak_etag
+from app.utils.fieldsets import parse_fields, project, sparse_response
+from app.utils.i18n import negotiate_language
+from app.utils.pagination import MAX_PAGE_SIZE, build_page, decode_cursor
+from app.utils.serialization import adapter_response
 
 router = APIRouter()
 
+MAX_CATEGORY_DEPTH = 10
+
+# Serializers keyed by include_translations, used by the fast path and when
+# the translations map is left out (response_model would put it back)
+category_adapters = {True: TypeAdapter(Category), False: TypeAdapter(LocalizedCategory)}
+category_list_adapters = {True: TypeAdapter(List[Category]), False: TypeAdapter(List[LocalizedCategory])}
+category_page_adapters = {
+    True: TypeAdapter(CategoryListResponse),
+    False: TypeAdapter(LocalizedCategoryListResponse),
+}
+
+
+async def _get_category(db: AsyncSession, category_id: int) -> Optional[MenuCategory]:
+    # Async sessions cannot lazy-load, so the recursive ``subcategories`` field is
+    # eagerly loaded level by level (one SELECT per level, not per node). Built
+    # here rather than at import, since it needs the mappers configured.
+    query = (
+        select(MenuCategory)
+        .where(MenuCategory.id == category_id)
+        .options(selectinload(MenuCategory.subcategories, recursion_depth=MAX_CATEGORY_DEPTH))
+        .execution_options(populate_existing=True)
+    )
+    return await db.scalar(query)
+
+
+async def _categories_etag(db: AsyncSession, request: Request, merchant_id) -> str:
+    """
+    ETag scope for category responses. Nested subcategories and item counts
+    are part of the payload, so any change in the merchant's categories or
+    menu items invalidates it.
+    """
+    category_criteria, item_criteria = [], []
+    if merchant_id is not None:
+        category_criteria.append(MenuCategory.merchant_id == merchant_id)
+        item_criteria.append(MenuItem.merchant_id == merchant_id)
+    category_etag = await query_etag(db, MenuCategory, category_criteria, request)
+    item_etag = await query_etag(db, MenuItem, item_criteria, request)
+    return weak_etag(category_etag, item_etag)
+
+
+async def _slug_exists(db: AsyncSession, slug: str) -> bool:
+    return await db.scalar(select(exists().where(MenuCategory.slug == slug)))
+
 
 @router.post("/", response_model=Category)
-def create_category(
+async def create_category(
         category: CategoryCreate,
         current_user=Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     # Check if slug is unique
-    if db.query(MenuCategory).filter(MenuCategory.slug == category.slug).first():
+    if await _slug_exists(db, category.slug):
         raise HTTPException(status_code=400, detail="Category slug already exists")
 
     db_category = MenuCategory(**category.model_dump())
     db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
-    return db_category
+    await db.commit()
+    await invalidate_merchant_menu(db_category.merchant_id)
+    return await _get_category(db, db_category.id)
 
 
-@router.get("/", response_model=List[Category])
-def get_categories(
-        skip: int = 0,
-        limit: int = 100,
+@router.get("/", response_model=Union[List[Category], CategoryListResponse])
+async def get_categories(
+        request: Request,
+        response: Response,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
         merchant_id: Optional[int] = None,
         parent_id: Optional[int] = None,
         lang: Optional[str] = None,
         include_inactive: bool = False,
-        db: Session = Depends(get_db)
+        include_translations: bool = True,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+        fields: Optional[str] = None,
+        accept_language: Optional[str] = Header(None),
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(MenuCategory)
+    """
+    List categories ordered by ``display_order``.
+
+    Passing ``cursor`` (empty for the first page) switches from
+    ``skip``/``limit`` paging to keyset pagination on ``(display_order, id)``
+    and returns a ``CategoryListResponse`` envelope. A matching
+    ``If-None-Match`` gets ``304 Not Modified`` from a single aggregate query.
+
+    Names and descriptions are localized in SQL for ``lang`` (or the
+    negotiated Accept-Language); ``include_translations=false`` leaves the
+    translations map out of the response. ``fields`` returns only the named
+    fields plus ``id``; stats and subcategories are only queried when asked for.
+    """
+    lang = negotiate_language(lang, accept_language)
+    field_set = parse_fields(fields, Category)
+    etag = await _categories_etag(db, request, merchant_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+
+    query = category_query(lang, include_translations, field_set)
 
     if merchant_id:
-        query = query.filter(MenuCategory.merchant_id == merchant_id)
+        query = query.where(MenuCategory.merchant_id == merchant_id)
     if parent_id is not None:
-        query = query.filter(MenuCategory.parent_id == parent_id)
+        query = query.where(MenuCategory.parent_id == parent_id)
     if not include_inactive:
-        query = query.filter(MenuCategory.is_active == True)
+        query = query.where(MenuCategory.is_active == True)
+
+    page = None
+    if cursor is not None:
+        position = decode_cursor(cursor, 2)
+        total = None
+        if include_total:
+            total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        seen = 0
+        if position:
+            last_order, last_id = position["keys"]
+            query = query.where(or_(
+                MenuCategory.display_order > last_order,
+                and_(MenuCategory.display_order == last_order, MenuCategory.id > last_id)
+            ))
+            seen = position["seen"]
+        query = query.order_by(MenuCategory.display_order, MenuCategory.id).limit(limit + 1)
+        rows = [category_node(row) for row in (await db.execute(query)).mappings()]
+        page = build_page(rows, limit, seen, lambda c: [c["display_order"], c["id"]], total)
+        categories = page["items"]
+    else:
+        query = query.order_by(MenuCategory.display_order).offset(skip).limit(limit)
+        categories = [category_node(row) for row in (await db.execute(query)).mappings()]
 
-    query = query.order_by(MenuCategory.display_order)
-    categories = query.offset(skip).limit(limit).all()
+    if field_set is None or "subcategories" in field_set:
+        await attach_subcategories(db, categories, MAX_CATEGORY_DEPTH, lang, include_translations, field_set)
 
-    # Handle translations
-    if lang and lang != "en":
-        for category in categories:
-            if lang in category.translations:
-                category.name = category.translations[lang]
+    body = page if page is not None else categories
+    headers = {"ETag": etag, "Vary": "Accept-Language"}
+    if field_set is not None:
+        categories = [project(category, field_set, Category) for category in categories]
+        if page is not None:
+            page["items"] = categories
+        return sparse_response(page if page is not None else categories, headers)
+    if settings.FAST_SERIALIZATION or not include_translations:
+        adapters = category_page_adapters if page is not None else category_list_adapters
+        return adapter_response(adapters[include_translations], body, headers)
+    response.headers.update(headers)
+    return body
 
-    return categories
+
+@router.get("/tree", response_model=List[Category])
+async def get_category_tree(
+        request: Request,
+        response: Response,
+        merchant_id: int,
+        max_depth: Optional[int] = Query(None, ge=1),
+        lang: Optional[str] = None,
+        include_inactive: bool = False,
+        include_translations: bool = True,
+        accept_language: Optional[str] = Header(None),
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Full category hierarchy for a merchant with ``items_count`` and ``stats``
+    on every node, built from a single query.
+    """
+    lang = negotiate_language(lang, accept_language)
+    etag = await _categories_etag(db, request, merchant_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+
+    tree = await build_category_tree(db, merchant_id, include_inactive, max_depth, lang, include_translations)
+    headers = {"ETag": etag, "Vary": "Accept-Language"}
+    if settings.FAST_SERIALIZATION or not include_translations:
+        return adapter_response(category_list_adapters[include_translations], tree, headers)
+    response.headers.update(headers)
+    return tree
 
 
 @router.get("/{category_id}", response_model=Category)
-def get_category(
+async def get_category(
         category_id: int,
+        request: Request,
+        response: Response,
         lang: Optional[str] = None,
-        db: Session = Depends(get_db)
+        include_translations: bool = True,
+        accept_language: Optional[str] = Header(None),
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
 ):
-    category = db.query(MenuCategory).filter(MenuCategory.id == category_id).first()
-    if not category:
-        raise HTTPException(status_code=404, detail="Category not found")
+    lang = negotiate_language(lang, accept_language)
+    merchant_id = (
+        select(MenuCategory.merchant_id)
+        .where(MenuCategory.id == category_id)
+        .scalar_subquery()
+    )
+    etag = await _categories_etag(db, request, merchant_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
 
-    if lang and lang != "en" and lang in category.translations:
-        category.name = category.translations[lang]
+    query = category_query(lang, include_translations).where(MenuCategory.id == category_id)
+    row = (await db.execute(query)).mappings().first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    category = category_node(row)
+    await attach_subcategories(db, [category], MAX_CATEGORY_DEPTH, lang, include_translations)
 
+    headers = {"ETag": etag, "Vary": "Accept-Language"}
+    if settings.FAST_SERIALIZATION or not include_translations:
+        return adapter_response(category_adapters[include_translations], category, headers)
+    response.headers.update(headers)
     return category
 
 
 @router.put("/{category_id}", response_model=Category)
-def update_category(
+async def update_category(
         category_id: int,
         category: CategoryCreate,
         current_user=Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    db_category = db.query(MenuCategory).filter(MenuCategory.id == category_id).first()
+    db_category = await db.get(MenuCategory, category_id)
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
 
     # Check slug uniqueness if changed
     if category.slug != db_category.slug:
-        if db.query(MenuCategory).filter(MenuCategory.slug == category.slug).first():
+        if await _slug_exists(db, category.slug):
             raise HTTPException(status_code=400, detail="Category slug already exists")
 
+    previous_merchant_id = db_category.merchant_id
     for key, value in category.model_dump(exclude_unset=True).items():
         setattr(db_category, key, value)
 
-    db.commit()
-    db.refresh(db_category)
-    return db_category
+    await db.commit()
+    await invalidate_merchant_menu(previous_merchant_id, db_category.merchant_id)
+    return await _get_category(db, category_id)
 
 
 @router.delete("/{category_id}")
-def delete_category(
+async def delete_category(
         category_id: int,
         current_user=Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    db_category = db.query(MenuCategory).filter(MenuCategory.id == category_id).first()
+    db_category = await db.get(MenuCategory, category_id)
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
 
-    # Check if category has items
-    if db_category.items:
+    # The items themselves, not the stats row, decide (an index lookup on category_id)
+    if await db.scalar(select(exists().where(MenuItem.category_id == category_id))):
         raise HTTPException(
             status_code=400,
             detail="Cannot delete category with existing items. Move or delete items first."
         )
 
-    db.delete(db_category)
-    db.commit()
+    await db.delete(db_category)
+    await db.commit()
+    await invalidate_merchant_menu(db_category.merchant_id)
     return {"message": "Category deleted successfully"}
@@ -1,102 +1,546 @@
-from typing import List, Optional
+from typing import List, Optional, Set, Union
 
 from app.api.deps import get_current_user
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.core.config import settings
+from app.core.menu_cache import (
+    MenuSnapshot,
+    cached_snapshot,
+    invalidate_merchant_menu,
+    snapshot_key,
+    snapshot_response,
+)
+from app.db.change_feed import change_event, record_changes
+from app.db.session import AsyncSessionLocal, get_async_db
 from app.models.menu import MenuItem as MenuItemModel
-from app.schemas.menu import MenuItem, MenuItemCreate
+from app.schemas.bulk import BulkResult
+from app.schemas.facets import FacetCounts
+from app.schemas.menu import (
+    LocalizedMenuItem,
+    LocalizedMenuItemResponse,
+    MenuItem,
+    MenuItemBulkDelete,
+    MenuItemBulkUpdate,
+    MenuItemCreate,
+    MenuItemResponse,
+)
+from app.utils.bulk import BulkReport, chunked, column_values, dialect_insert
+from app.utils.category_stats import ItemStats, adjust_category_stats, refresh_category_stats
+from app.utils.etag import etag_matches, not_modified_response, query_etag
+from app.utils.export import export_response
+from app.utils.facets import facet_counts
+from app.utils.fieldsets import parse_fields, project, sparse_response, trim_columns
+from app.utils.i18n import localized_columns, negotiate_language
+from app.utils.pagination import MAX_PAGE_SIZE, build_page, decode_cursor
+from app.utils.serialization import adapter_response, dump_json, render_json
+from app.utils.streaming import iter_json_records
 
 router = APIRouter()
 
+# Serializers keyed by include_translations, used for snapshots, the fast
+# path and when the translations map is left out
+menu_item_adapters = {True: TypeAdapter(MenuItem), False: TypeAdapter(LocalizedMenuItem)}
+menu_item_list_adapters = {True: TypeAdapter(List[MenuItem]), False: TypeAdapter(List[LocalizedMenuItem])}
+menu_item_page_adapters = {True: TypeAdapter(MenuItemResponse), False: TypeAdapter(LocalizedMenuItemResponse)}
+
+# Columns an upsert may overwrite when (merchant_id, external_id) already exists
+UPSERT_COLUMNS = (
+    "name", "price_usd", "price_khr", "is_active", "translations", "image_url",
+    "item_type", "attributes", "category_id", "updated_at",
+)
+
+
+def _menu_items_criteria(merchant_id: Optional[int], category_id: Optional[int]) -> list:
+    criteria = []
+    if merchant_id:
+        criteria.append(MenuItemModel.merchant_id == merchant_id)
+    if category_id:
+        criteria.append(MenuItemModel.category_id == category_id)
+    return criteria
+
+
+def _menu_items_query(
+        merchant_id: Optional[int],
+        category_id: Optional[int],
+        lang: Optional[str] = None,
+        include_translations: bool = True,
+        fields: Optional[Set[str]] = None
+):
+    columns = trim_columns(localized_columns(MenuItemModel, lang, include_translations), fields, keep=("id",))
+    return select(*columns).where(*_menu_items_criteria(merchant_id, category_id))
+
+
+async def _list_menu_items(
+        db: AsyncSession,
+        skip: int,
+        limit: int,
+        merchant_id: Optional[int],
+        category_id: Optional[int],
+        lang: Optional[str],
+        include_translations: bool,
+        fields: Optional[Set[str]] = None
+) -> list:
+    query = _menu_items_query(merchant_id, category_id, lang, include_translations, fields)
+    return [dict(row) for row in (await db.execute(query.offset(skip).limit(limit))).mappings()]
+
 
 @router.post("/", response_model=MenuItem)
-def create_menu_item(
+async def create_menu_item(
         item: MenuItemCreate,
         current_user=Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    db_item = MenuItemModel(**item.model_dump())
+    db_item = MenuItemModel(**column_values(MenuItemModel, item.model_dump()))
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    await db.flush()
+    await adjust_category_stats(db, added=[ItemStats.of(db_item)])
+    await db.commit()
+    await db.refresh(db_item)
+    await invalidate_merchant_menu(db_item.merchant_id)
     return db_item
 
 
-@router.get("/", response_model=List[MenuItem])
-def get_menu_items(
-        skip: int = 0,
-        limit: int = 100,
+async def _bulk_rows(request: Request, schema, report: BulkReport):
+    """Yield ``(index, validated row)`` pairs, recording invalid rows on ``report``"""
+    records = iter_json_records(
+        request,
+        max_records=settings.BULK_MAX_ROWS,
+        max_body_bytes=settings.BULK_MAX_BODY_BYTES,
+        max_line_bytes=settings.BULK_MAX_LINE_BYTES,
+    )
+    async for index, record in records:
+        report.processed += 1
+        if isinstance(record, Exception):
+            report.add_error(index, f"Invalid JSON: {record}")
+            continue
+        try:
+            yield index, schema.model_validate(record)
+        except ValidationError as exc:
+            report.add_error(index, exc.errors(include_url=False, include_context=False))
+
+
+async def _run_chunk(db: AsyncSession, chunk, report: BulkReport, write, atomic: bool) -> None:
+    """
+    Write one chunk inside a savepoint. If the database rejects it, the
+    chunk's rows are reported as failed and the rest of the request goes on.
+    An atomic request that already has errors will be rolled back, so its
+    remaining rows are only validated.
+    """
+    if atomic and report.error_count:
+        return
+    try:
+        async with db.begin_nested():
+            await write(chunk)
+    except DBAPIError as exc:
+        detail = str(exc.orig).strip() or "Database rejected the batch"
+        for index, _ in chunk:
+            report.add_error(index, detail)
+
+
+async def _finish_bulk(
+        db: AsyncSession,
+        report: BulkReport,
+        atomic: bool,
+        merchant_ids,
+        category_ids
+) -> BulkResult:
+    if atomic and report.error_count:
+        await db.rollback()
+        report.succeeded = 0
+        report.ids = []
+        raise HTTPException(status_code=400, detail=report.result().model_dump())
+    await refresh_category_stats(db, category_ids)
+    await db.commit()
+    await invalidate_merchant_menu(*merchant_ids)
+    return report.result()
+
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_menu_items(
+        request: Request,
+        upsert: bool = False,
+        atomic: bool = True,
+        current_user=Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create menu items from a JSON array of ``MenuItemCreate`` objects, or from
+    an ``application/x-ndjson`` stream for large batches.
+
+    Rows are validated one by one and written in chunks with multi-row
+    ``INSERT ... RETURNING`` inside a single transaction. With ``upsert`` set,
+    rows whose ``(merchant_id, external_id)`` already exist are updated
+    instead. Invalid rows are reported per index. By default any error
+    rolls back the whole request with ``400``; ``atomic=false`` commits the
+    rows that succeeded instead.
+    """
+    report = BulkReport(settings.BULK_MAX_REPORTED_ERRORS)
+    merchant_ids = set()
+    category_ids = set()
+    table = MenuItemModel.__table__
+
+    async def write(chunk):
+        if upsert:
+            # Rows moved to another category leave their old one's stats to refresh too
+            keys = {(row["merchant_id"], row["external_id"]) for _, row in chunk if row["external_id"] is not None}
+            if keys:
+                existing = await db.execute(
+                    select(MenuItemModel.merchant_id, MenuItemModel.external_id, MenuItemModel.category_id)
+                    .where(
+                        MenuItemModel.merchant_id.in_({merchant_id for merchant_id, _ in keys}),
+                        MenuItemModel.external_id.in_({external_id for _, external_id in keys})
+                    )
+                )
+                category_ids.update(
+                    category_id for merchant_id, external_id, category_id in existing
+                    if (merchant_id, external_id) in keys
+                )
+        stmt = dialect_insert(db, table)
+        if upsert:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["merchant_id", "external_id"],
+                set_={name: stmt.excluded[name] for name in UPSERT_COLUMNS}
+            )
+        stmt = stmt.returning(table.c.id, sort_by_parameter_order=True).execution_options(changes_recorded=True)
+        result = await db.execute(stmt, [row for _, row in chunk])
+        ids = result.scalars().all()
+        record_changes(db, [
+            change_event("menu_items", item_id, row["merchant_id"], report.timestamp)
+            for item_id, (_, row) in zip(ids, chunk)
+        ])
+        report.ids.extend(ids)
+        report.succeeded += len(chunk)
+        merchant_ids.update(row["merchant_id"] for _, row in chunk)
+        category_ids.update(row["category_id"] for _, row in chunk)
+
+    chunk = []
+    keys = {}
+    async for index, item in _bulk_rows(request, MenuItemCreate, report):
+        row = column_values(MenuItemModel, item.model_dump())
+        row.update(created_at=report.timestamp, updated_at=report.timestamp)
+        # One statement cannot upsert the same key twice, so the last row wins
+        key = (row["merchant_id"], row["external_id"])
+        if upsert and row["external_id"] is not None and key in keys:
+            report.add_error(keys[key], "Superseded by a later row with the same external_id")
+            chunk = [entry for entry in chunk if entry[0] != keys[key]]
+        keys[key] = index
+        chunk.append((index, row))
+        if len(chunk) >= settings.BULK_CHUNK_SIZE:
+            await _run_chunk(db, chunk, report, write, atomic)
+            chunk, keys = [], {}
+    if chunk:
+        await _run_chunk(db, chunk, report, write, atomic)
+
+    return await _finish_bulk(db, report, atomic, merchant_ids, category_ids)
+
+
+@router.put("/bulk", response_model=BulkResult)
+async def bulk_update_menu_items(
+        request: Request,
+        atomic: bool = True,
+        current_user=Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Update menu items from a JSON array (or NDJSON stream) of
+    ``MenuItemBulkUpdate`` objects. Only the fields present in a row are
+    changed; unknown ids are reported per row. As with bulk create, any
+    error rolls back the whole request unless ``atomic=false``.
+    """
+    report = BulkReport(settings.BULK_MAX_REPORTED_ERRORS)
+    merchant_ids = set()
+    category_ids = set()
+
+    async def write(chunk):
+        ids = {row["id"] for _, row in chunk}
+        existing = {
+            item_id: (merchant_id, category_id)
+            for item_id, merchant_id, category_id in (await db.execute(
+                select(MenuItemModel.id, MenuItemModel.merchant_id, MenuItemModel.category_id)
+                .where(MenuItemModel.id.in_(ids))
+            )).all()
+        }
+        rows = []
+        for index, row in chunk:
+            if row["id"] not in existing:
+                report.add_error(index, "Menu item not found", id=row["id"])
+                continue
+            rows.append(row)
+        if rows:
+            await db.execute(update(MenuItemModel).execution_options(changes_recorded=True), rows)
+            record_changes(db, [
+                change_event("menu_items", row["id"], merchant_id, report.timestamp)
+                for row in rows
+                for merchant_id in {existing[row["id"]][0], row.get("merchant_id", existing[row["id"]][0])}
+            ])
+        report.ids.extend(row["id"] for row in rows)
+        report.succeeded += len(rows)
+        merchant_ids.update(existing[row["id"]][0] for row in rows)
+        category_ids.update(existing[row["id"]][1] for row in rows)
+        category_ids.update(row["category_id"] for row in rows if "category_id" in row)
+
+    chunk = []
+    async for index, item in _bulk_rows(request, MenuItemBulkUpdate, report):
+        row = column_values(MenuItemModel, item.model_dump(exclude_unset=True))
+        row.update(id=item.id, updated_at=report.timestamp)
+        chunk.append((index, row))
+        if len(chunk) >= settings.BULK_CHUNK_SIZE:
+            await _run_chunk(db, chunk, report, write, atomic)
+            chunk = []
+    if chunk:
+        await _run_chunk(db, chunk, report, write, atomic)
+
+    return await _finish_bulk(db, report, atomic, merchant_ids, category_ids)
+
+
+@router.delete("/bulk", response_model=BulkResult)
+async def bulk_delete_menu_items(
+        payload: MenuItemBulkDelete,
+        current_user=Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Delete menu items by id in chunks; unknown ids are reported per row"""
+    if len(payload.ids) > settings.BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ROWS} rows per request")
+
+    report = BulkReport(settings.BULK_MAX_REPORTED_ERRORS)
+    report.processed = len(payload.ids)
+    merchant_ids = set()
+    category_ids = set()
+    deleted = set()
+    for ids in chunked(payload.ids, settings.BULK_CHUNK_SIZE):
+        result = await db.execute(
+            delete(MenuItemModel)
+            .where(MenuItemModel.id.in_(ids))
+            .returning(MenuItemModel.id, MenuItemModel.merchant_id, MenuItemModel.category_id)
+            .execution_options(synchronize_session=False, changes_recorded=True)
+        )
+        for item_id, merchant_id, category_id in result.all():
+            record_changes(db, [change_event("menu_items", item_id, merchant_id, report.timestamp)])
+            deleted.add(item_id)
+            merchant_ids.add(merchant_id)
+            category_ids.add(category_id)
+
+    for index, item_id in enumerate(payload.ids):
+        if item_id in deleted:
+            report.ids.append(item_id)
+            deleted.discard(item_id)
+        else:
+            report.add_error(index, "Menu item not found", id=item_id)
+    report.succeeded = len(report.ids)
+
+    return await _finish_bulk(db, report, False, merchant_ids, category_ids)
+
+
+
+@router.get("/", response_model=Union[List[MenuItem], MenuItemResponse])
+async def get_menu_items(
+        request: Request,
+        response: Response,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
         merchant_id: Optional[int] = None,
         category_id: Optional[int] = None,
         lang: Optional[str] = None,
-        db: Session = Depends(get_db)
+        include_translations: bool = True,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+        fields: Optional[str] = None,
+        accept_language: Optional[str] = Header(None),
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(MenuItemModel)
+    """
+    List menu items.
 
-    if merchant_id:
-        query = query.filter(MenuItemModel.merchant_id == merchant_id)
-    if category_id:
-        query = query.filter(MenuItemModel.category_id == category_id)
+    Without ``cursor`` this pages with ``skip``/``limit`` and returns a plain
+    list, served from a pre-rendered snapshot per (merchant, lang, category,
+    page). Concurrent misses render the snapshot once, and an expired one is
+    served for MENU_CACHE_STALE_SECONDS more while it is re-rendered in the
+    background. Responses carry an ETag derived from ``max(updated_at)`` and
+    the row count, and a matching ``If-None-Match`` gets ``304 Not
+    Modified``. Passing ``cursor`` (empty for the first page,
+    then the returned ``next_cursor``) switches to keyset pagination on ``id``
+    and returns a ``MenuItemResponse`` envelope; ``total`` is only counted
+    exactly when ``include_total`` is set.
+
+    Names and descriptions are localized in SQL for ``lang`` (or the
+    negotiated Accept-Language); ``include_translations=false`` leaves the
+    translations map out of the response. ``fields`` (e.g.
+    ``fields=name,price_usd``) returns only those fields plus ``id``, and
+    only those columns are selected.
+    """
+    lang = negotiate_language(lang, accept_language)
+    field_set = parse_fields(fields, MenuItem)
+    if cursor is None:
+        key = snapshot_key(merchant_id, lang, category_id, skip, limit, include_translations, field_set)
+
+        async def render() -> MenuSnapshot:
+            # Own session: a background refresh outlives this request's
+            async with AsyncSessionLocal() as session:
+                etag = await query_etag(
+                    session, MenuItemModel, _menu_items_criteria(merchant_id, category_id), request
+                )
+                items = await _list_menu_items(
+                    session, skip, limit, merchant_id, category_id, lang, include_translations, field_set
+                )
+            if field_set is not None:
+                body = render_json([project(item, field_set, MenuItem) for item in items])
+            else:
+                body = dump_json(menu_item_list_adapters[include_translations], items)
+            return MenuSnapshot(body=body, etag=etag)
 
-    items = query.offset(skip).limit(limit).all()
+        snapshot = await cached_snapshot(key, merchant_id, render)
+        return snapshot_response(snapshot, if_none_match)
 
-    # Handle translations if language is specified
-    if lang and lang != "en":
-        for item in items:
-            if lang in item.translations:
-                item.name = item.translations[lang]
+    etag = await query_etag(db, MenuItemModel, _menu_items_criteria(merchant_id, category_id), request)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
 
-    return items
+    query = _menu_items_query(merchant_id, category_id, lang, include_translations, field_set)
+    position = decode_cursor(cursor, 1)
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    seen = 0
+    if position:
+        query = query.where(MenuItemModel.id > position["keys"][0])
+        seen = position["seen"]
+    rows = [dict(row) for row in (await db.execute(query.order_by(MenuItemModel.id).limit(limit + 1))).mappings()]
+    page = build_page(rows, limit, seen, lambda item: [item["id"]], total)
+    headers = {"ETag": etag, "Vary": "Accept-Language"}
+    if field_set is not None:
+        page["items"] = [project(item, field_set, MenuItem) for item in page["items"]]
+        return sparse_response(page, headers)
+    if settings.FAST_SERIALIZATION or not include_translations:
+        return adapter_response(menu_item_page_adapters[include_translations], page, headers)
+    response.headers.update(headers)
+    return page
+
+
+@router.get("/export")
+async def export_menu_items(
+        merchant_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        export_format: str = Query("ndjson", alias="format"),
+        compress: bool = False,
+        current_user=Depends(get_current_user)
+):
+    """
+    Stream every matching menu item as NDJSON or CSV from a server-side
+    cursor, so memory stays flat regardless of catalog size. Set
+    ``compress`` for a gzip-encoded body.
+    """
+    statement = (
+        select(*MenuItemModel.__table__.columns)
+        .where(*_menu_items_criteria(merchant_id, category_id))
+        .order_by(MenuItemModel.id)
+    )
+    filename = f"menu-{merchant_id}" if merchant_id else "menu"
+    return export_response(statement, export_format, filename, compress, settings.EXPORT_BATCH_SIZE)
+
+
+@router.get("/facets", response_model=FacetCounts)
+async def get_menu_facets(
+        request: Request,
+        response: Response,
+        merchant_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Counts per item type, category, USD price bucket and attribute value
+    for the matching menu items.
+    """
+    criteria = _menu_items_criteria(merchant_id, category_id)
+
+    etag = await query_etag(db, MenuItemModel, criteria, request)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+
+    return await facet_counts(
+        db,
+        MenuItemModel,
+        criteria,
+        MenuItemModel.item_type,
+        MenuItemModel.category_id,
+        MenuItemModel.price_usd,
+        settings.MENU_PRICE_BUCKETS_USD,
+        MenuItemModel.attributes
+    )
 
 
 @router.get("/{item_id}", response_model=MenuItem)
-def get_menu_item(
+async def get_menu_item(
         item_id: int,
+        request: Request,
+        response: Response,
         lang: Optional[str] = None,
-        db: Session = Depends(get_db)
+        include_translations: bool = True,
+        accept_language: Optional[str] = Header(None),
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
 ):
-    item = db.query(MenuItemModel).filter(MenuItemModel.id == item_id).first()
-    if not item:
-        raise HTTPException(status_code=404, detail="Menu item not found")
+    lang = negotiate_language(lang, accept_language)
+    etag = await query_etag(db, MenuItemModel, [MenuItemModel.id == item_id], request)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
 
-    # Handle translation if language is specified
-    if lang and lang != "en" and lang in item.translations:
-        item.name = item.translations[lang]
+    query = select(*localized_columns(MenuItemModel, lang, include_translations)).where(MenuItemModel.id == item_id)
+    row = (await db.execute(query)).mappings().first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    item = dict(row)
 
+    headers = {"ETag": etag, "Vary": "Accept-Language"}
+    if settings.FAST_SERIALIZATION or not include_translations:
+        return adapter_response(menu_item_adapters[include_translations], item, headers)
+    response.headers.update(headers)
     return item
 
 
 @router.put("/{item_id}", response_model=MenuItem)
-def update_menu_item(
+async def update_menu_item(
         item_id: int,
         item: MenuItemCreate,
         current_user=Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    db_item = db.query(MenuItemModel).filter(MenuItemModel.id == item_id).first()
+    db_item = await db.get(MenuItemModel, item_id)
     if not db_item:
         raise HTTPException(status_code=404, detail="Menu item not found")
 
-    for key, value in item.model_dump(exclude_unset=True).items():
+    previous_merchant_id = db_item.merchant_id
+    previous = ItemStats.of(db_item)
+    for key, value in column_values(MenuItemModel, item.model_dump(exclude_unset=True)).items():
         setattr(db_item, key, value)
 
-    db.commit()
-    db.refresh(db_item)
+    await adjust_category_stats(db, removed=[previous], added=[ItemStats.of(db_item)])
+    await db.commit()
+    await db.refresh(db_item)
+    await invalidate_merchant_menu(previous_merchant_id, db_item.merchant_id)
     return db_item
 
 
 @router.delete("/{item_id}")
-def delete_menu_item(
+async def delete_menu_item(
         item_id: int,
         current_user=Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    db_item = db.query(MenuItemModel).filter(MenuItemModel.id == item_id).first()
+    db_item = await db.get(MenuItemModel, item_id)
     if not db_item:
         raise HTTPException(status_code=404, detail="Menu item not found")
 
-    db.delete(db_item)
-    db.commit()
+    await db.delete(db_item)
+    await adjust_category_stats(db, removed=[ItemStats.of(db_item)])
+    await db.commit()
+    await invalidate_merchant_menu(db_item.merchant_id)
     return {"message": "Item deleted successfully"}
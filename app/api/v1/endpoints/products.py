@@ -1,18 +1,55 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, async_engine, get_async_db
 from app.models.products import Product, ProductType
-from app.schemas.products import ProductCreate, ProductBase
-from app.utils.validation import validate_product_attributes
+from app.schemas.facets import FacetCounts
+from app.schemas.products import (
+    ProductBase,
+    ProductCreate,
+    ProductImportRejection,
+    ProductImportResult,
+)
+from app.utils.attribute_filters import attribute_criteria, parse_attribute_filters
+from app.utils.etag import etag_matches, not_modified_response, query_etag
+from app.utils.export import export_response
+from app.utils.facets import facet_counts
+from app.utils.fieldsets import parse_fields, project, sparse_response, trim_columns
+from app.utils.product_import import IMPORT_FORMATS, import_products, iter_records
+from app.utils.serialization import adapter_response
+from app.utils.streaming import is_ndjson, iter_lines
+from app.utils.validation import filterable_attributes, validate_product_attributes
 
 router = APIRouter()
 
+product_adapter = TypeAdapter(ProductBase)
+product_list_adapter = TypeAdapter(List[ProductBase])
+
+
+def _product_criteria(
+        product_type: Optional[ProductType],
+        category_id: Optional[int],
+        request: Optional[Request] = None
+) -> list:
+    criteria = []
+    if product_type:
+        criteria.append(Product.type == product_type)
+    if category_id:
+        criteria.append(Product.category_id == category_id)
+    if request is not None:
+        filters = parse_attribute_filters(request.query_params.multi_items(), filterable_attributes(product_type))
+        criteria.extend(attribute_criteria(Product.attributes, filters, async_engine.dialect.name))
+    return criteria
+
 
 @router.post("/", response_model=ProductBase)
-def create_product(product: ProductCreate, db: Session = Depends(get_db)):
+async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_async_db)):
     # Validate attributes based on product type
     validate_product_attributes(product.type, product.attributes)
 
@@ -26,30 +63,184 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
         category_id=product.category_id
     )
     db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    await db.commit()
+    await db.refresh(db_product)
     return db_product
 
 
+@router.post("/import", response_model=ProductImportResult)
+async def import_product_catalog(
+        request: Request,
+        import_format: Optional[str] = Query(None, alias="format"),
+        chunk_size: int = Query(settings.IMPORT_CHUNK_SIZE, ge=1, le=10000),
+        resume_from: int = Query(0, ge=0),
+        current_user=Depends(get_current_user)
+):
+    """
+    Import products from a streamed CSV or NDJSON body.
+
+    Records are validated against the per-type attribute rules and inserted
+    in chunks that commit independently. Rejected records are reported by
+    index; if the import stops part-way, ``next_record`` in the response (or
+    in the error detail) can be passed as ``resume_from`` to continue.
+    """
+    if import_format is None:
+        content_type = request.headers.get("content-type", "")
+        import_format = "ndjson" if is_ndjson(request) else "csv" if "csv" in content_type else None
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Specify the import format, one of: {', '.join(IMPORT_FORMATS)}"
+        )
+
+    rejections = []
+    counts = {"rejected": 0, "next_record": resume_from}
+
+    async def on_reject(index, record, reason):
+        counts["rejected"] += 1
+        if len(rejections) < settings.BULK_MAX_REPORTED_ERRORS:
+            rejections.append(ProductImportRejection(index=index, detail=reason))
+
+    async def on_checkpoint(next_record):
+        counts["next_record"] = next_record
+
+    records = iter_records(iter_lines(request, settings.BULK_MAX_LINE_BYTES), import_format)
+    try:
+        stats = await import_products(
+            AsyncSessionLocal,
+            records,
+            import_format,
+            chunk_size,
+            on_reject,
+            on_checkpoint=on_checkpoint,
+            start_at=resume_from
+        )
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail={"message": f"Import interrupted: {exc}", "next_record": counts["next_record"]}
+        )
+
+    return ProductImportResult(
+        processed=stats.processed,
+        imported=stats.imported,
+        rejected=stats.rejected,
+        next_record=stats.next_record,
+        rejections=rejections,
+        rejections_truncated=counts["rejected"] > len(rejections)
+    )
+
+
+@router.get("/export")
+async def export_products(
+        request: Request,
+        product_type: Optional[ProductType] = None,
+        category_id: Optional[int] = None,
+        export_format: str = Query("ndjson", alias="format"),
+        compress: bool = False,
+        current_user=Depends(get_current_user)
+):
+    """
+    Stream the product catalog as NDJSON or CSV from a server-side cursor.
+    Set ``compress`` for a gzip-encoded body. Accepts the same ``attr.*``
+    filters as the product list.
+    """
+    statement = (
+        select(*Product.__table__.columns)
+        .where(*_product_criteria(product_type, category_id, request))
+        .order_by(Product.id)
+    )
+    return export_response(statement, export_format, "products", compress, settings.EXPORT_BATCH_SIZE)
+
+
+@router.get("/facets", response_model=FacetCounts)
+async def get_product_facets(
+        request: Request,
+        response: Response,
+        product_type: Optional[ProductType] = None,
+        category_id: Optional[int] = None,
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Counts per type, category, price bucket and string attribute value for
+    the products matching the given filters (including ``attr.*`` filters).
+    """
+    criteria = _product_criteria(product_type, category_id, request)
+
+    etag = await query_etag(db, Product, criteria, request)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+
+    attribute_keys = [key for key, kind in filterable_attributes(product_type).items() if kind == "string"]
+    return await facet_counts(
+        db,
+        Product,
+        criteria,
+        Product.type,
+        Product.category_id,
+        Product.price,
+        settings.PRODUCT_PRICE_BUCKETS,
+        Product.attributes,
+        attribute_keys
+    )
+
+
 @router.get("/{product_id}", response_model=ProductBase)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+async def get_product(
+        product_id: int,
+        request: Request,
+        response: Response,
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
+):
+    etag = await query_etag(db, Product, [Product.id == product_id], request)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+
+    row = (await db.execute(select(*Product.__table__.columns).where(Product.id == product_id))).mappings().first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    if settings.FAST_SERIALIZATION:
+        return adapter_response(product_adapter, dict(row), {"ETag": etag})
+    response.headers["ETag"] = etag
+    return dict(row)
 
 
 @router.get("/", response_model=List[ProductBase])
-def get_products(
+async def get_products(
+        request: Request,
+        response: Response,
         skip: int = 0,
         limit: int = 100,
         product_type: Optional[ProductType] = None,
         category_id: Optional[int] = None,
-        db: Session = Depends(get_db)
+        fields: Optional[str] = None,
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Product)
-    if product_type:
-        query = query.filter(Product.type == product_type)
-    if category_id:
-        query = query.filter(Product.category_id == category_id)
-    return query.offset(skip).limit(limit).all()
+    """
+    List products, optionally filtered on attributes with ``attr.<key>``
+    query parameters: ``attr.brand=Acme``, ``attr.size=in:M,L``,
+    ``attr.year>=2015``, ``attr.year<2020``. The keys allowed are those
+    registered for ``product_type`` (or for any type when it is omitted).
+    ``fields=name,price`` selects and returns only those fields.
+    """
+    criteria = _product_criteria(product_type, category_id, request)
+    field_set = parse_fields(fields, ProductBase)
+
+    etag = await query_etag(db, Product, criteria, request)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+
+    query = select(*trim_columns(Product.__table__.columns, field_set)).where(*criteria)
+    products = [dict(row) for row in (await db.execute(query.offset(skip).limit(limit))).mappings()]
+    if field_set is not None:
+        return sparse_response([project(product, field_set, ProductBase) for product in products], {"ETag": etag})
+    if settings.FAST_SERIALIZATION:
+        return adapter_response(product_list_adapter, products, {"ETag": etag})
+    response.headers["ETag"] = etag
+    return products
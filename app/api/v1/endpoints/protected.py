@@ -1,37 +1,12 @@
 # app/api/v1/endpoints/protected.py
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from app.core.security import SECRET_KEY, ALGORITHM
-from app.models.user import User as UserModel
+from fastapi import APIRouter, Depends
+from app.api.deps import get_current_user
+from app.core.security import Principal
 from app.schemas.user import User as UserSchema
-from app.db.session import get_db
 
 router = APIRouter()
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=401,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = db.query(UserModel).filter(UserModel.username == username).first()
-    if user is None:
-        raise credentials_exception
-    return user
-
 
 @router.get("/users/me/", response_model=UserSchema)
-def read_users_me(current_user: UserSchema = Depends(get_current_user)):
+def read_users_me(current_user: Principal = Depends(get_current_user)):
     return current_user
@@ -0,0 +1,28 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_async_db
+from app.schemas.search import SearchResult
+from app.utils.search import search_catalog
+
+router = APIRouter()
+
+
+@router.get("", response_model=SearchResult)
+async def search(
+        q: str = Query(..., min_length=1, max_length=200),
+        lang: Optional[str] = None,
+        merchant_id: Optional[int] = None,
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Search menu items, categories and products by name, description and
+    any translation. Terms match as prefixes and tolerate small typos;
+    ``lang`` picks the translated name returned for each hit. Products have
+    no merchant, so they are only searched when ``merchant_id`` is omitted.
+    """
+    hits = await search_catalog(db, q, merchant_id, lang, limit)
+    return SearchResult(query=q, hits=hits)
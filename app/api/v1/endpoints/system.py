@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response
+
+from app.api.deps import get_current_user, get_profiler_user
+from app.core.profiling import profile_reports
+from app.db.pool import worker_pool_size
+from app.db.session import async_pool_stats, sync_pool_stats
+
+router = APIRouter()
+
+
+@router.get("/pool")
+def get_pool_stats(current_user=Depends(get_current_user)):
+    """Connection pool counters for this worker process"""
+    return {
+        "worker_pool_size": worker_pool_size(),
+        "pools": [async_pool_stats.snapshot(), sync_pool_stats.snapshot()],
+    }
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+        profile_id: str,
+        report_format: str = Query("json", alias="format"),
+        current_user=Depends(get_profiler_user)
+):
+    """
+    A stored request profile: ``json`` (summary, SQL executed and text
+    report), ``text``, ``html`` (pyinstrument) or ``pstats`` (cProfile, for
+    ``python -m pstats`` or snakeviz).
+    """
+    report = profile_reports.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if report_format == "json":
+        return report.summary()
+    if report_format not in report.artifacts:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No {report_format} output for this profile; available: {', '.join(sorted(report.artifacts))}"
+        )
+
+    artifact = report.artifacts[report_format]
+    if report_format == "html":
+        return HTMLResponse(artifact)
+    if report_format == "pstats":
+        return Response(
+            artifact,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'}
+        )
+    return PlainTextResponse(artifact)
@@ -0,0 +1,105 @@
+"""
+Import a product catalog from a CSV or NDJSON file.
+
+    python -m app.cli.import_products catalog.csv --chunk-size 2000
+
+Progress is checkpointed to ``<file>.checkpoint`` after every committed
+chunk; re-running the same command resumes from there. Rejected records are
+appended to ``<file>.rejects.ndjson`` with their record number and reason.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from typing import AsyncIterator
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, async_engine
+from app.utils.product_import import IMPORT_FORMATS, import_products, iter_records
+
+logger = logging.getLogger("import_products")
+
+
+async def read_lines(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as source:
+        for line in source:
+            yield line.rstrip(b"\n")
+
+
+def read_checkpoint(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path) as checkpoint:
+        return int(json.load(checkpoint)["next_record"])
+
+
+def write_checkpoint(path: str, next_record: int) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as checkpoint:
+        json.dump({"next_record": next_record}, checkpoint)
+    os.replace(tmp_path, path)
+
+
+async def run(args: argparse.Namespace) -> int:
+    import_format = args.format or os.path.splitext(args.path)[1].lstrip(".").lower()
+    if import_format in ("jsonl", "json"):
+        import_format = "ndjson"
+    if import_format not in IMPORT_FORMATS:
+        logger.error("Cannot infer the format of %s, pass --format", args.path)
+        return 2
+
+    checkpoint_path = args.checkpoint or f"{args.path}.checkpoint"
+    rejects_path = args.rejects or f"{args.path}.rejects.ndjson"
+    start_at = 0 if args.restart else read_checkpoint(checkpoint_path)
+    if start_at:
+        logger.info("Resuming %s from record %d", args.path, start_at)
+
+    with open(rejects_path, "a" if start_at else "w", encoding="utf-8") as rejects:
+        async def on_reject(index, record, reason):
+            if isinstance(record, Exception):
+                record = str(record)
+            rejects.write(json.dumps({"index": index, "reason": reason, "record": record}, ensure_ascii=False) + "\n")
+
+        async def on_checkpoint(next_record):
+            rejects.flush()
+            write_checkpoint(checkpoint_path, next_record)
+            logger.info("Committed through record %d", next_record)
+
+        try:
+            stats = await import_products(
+                AsyncSessionLocal,
+                iter_records(read_lines(args.path), import_format),
+                import_format,
+                args.chunk_size,
+                on_reject,
+                on_checkpoint=on_checkpoint,
+                start_at=start_at
+            )
+        finally:
+            await async_engine.dispose()
+
+    os.remove(checkpoint_path)
+    logger.info(
+        "Processed %d records: %d imported, %d rejected (see %s)",
+        stats.processed, stats.imported, stats.rejected, rejects_path
+    )
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import products from CSV or NDJSON")
+    parser.add_argument("path", help="CSV or NDJSON file to import")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=settings.IMPORT_CHUNK_SIZE)
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <path>.checkpoint)")
+    parser.add_argument("--rejects", help="rejection report (default: <path>.rejects.ndjson)")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Recompute every row of menu_category_stats from the menu_items table.
+
+    python -m app.cli.rebuild_category_stats
+
+Run once after deploying the stats table, and whenever items were written
+outside the API (manual SQL, restores).
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import select
+
+from app.db.session import AsyncSessionLocal, async_engine
+from app.models.menu import MenuCategory
+from app.utils.bulk import chunked
+from app.utils.category_stats import refresh_category_stats
+
+logger = logging.getLogger("rebuild_category_stats")
+
+
+async def run(batch_size: int) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            category_ids = (await db.scalars(select(MenuCategory.id).order_by(MenuCategory.id))).all()
+            for batch in chunked(list(category_ids), batch_size):
+                await refresh_category_stats(db, batch)
+                await db.commit()
+            logger.info("Rebuilt stats for %d categories", len(category_ids))
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild per-category menu item stats")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
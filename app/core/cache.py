@@ -0,0 +1,419 @@
+"""
+Caching in two tiers.
+
+``TTLCache`` is the bounded in-process LRU tier. ``Cache`` adds to it:
+- an optional shared tier on a Redis-protocol server (``CACHE_BACKEND=redis``)
+- invalidation by tag, such as ``("merchant", 5)``
+- single-flight loading: concurrent misses on one key run one loader
+- stale-while-revalidate: an expired entry keeps being served for
+  ``stale_ttl`` seconds while a single background task refreshes it
+
+Entries in the shared tier are JSON, encoded with a ``TypeAdapter`` for
+the cache's ``value_type``.
+
+Each worker's local tier only learns about invalidations made elsewhere
+through ``evict_changed`` (called by change feed subscribers) or when its
+own copies expire. With a shared tier, local copies are therefore capped
+at CACHE_LOCAL_TTL_SECONDS.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from pydantic import ConfigDict, TypeAdapter, ValidationError
+
+from app.core.config import settings
+from app.utils.serialization import dump_json
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional dependency, local tier only without it
+    aioredis = None
+
+logger = logging.getLogger("app.cache")
+
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU cache whose entries expire at an absolute
+    (wall-clock) timestamp.
+
+    Entries can be grouped under tags so that everything derived from the
+    same record can be evicted at once.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(
+            self,
+            key: Hashable,
+            value: Any,
+            expires_at: Optional[float] = None,
+            tags: Iterable[Hashable] = ()
+    ) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.max_entries:
+                self._remove(next(iter(self._data)))
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_tag(self, tag: Hashable) -> None:
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+    tags: Tuple[Hashable, ...] = ()
+
+
+def _redis_key(value: Hashable) -> str:
+    # Keys and tags are tuples of primitives, whose repr is stable
+    text = repr(value)
+    return text if len(text) <= 200 else hashlib.sha1(text.encode()).hexdigest()
+
+
+def _hashable(value: Any) -> Hashable:
+    # JSON turns the tag tuples into lists
+    return tuple(_hashable(item) for item in value) if isinstance(value, list) else value
+
+
+class RedisCacheBackend:
+    """
+    Shared tier on a Redis-protocol server, storing encoded entries. Each
+    tag is a set of the keys stored under it, per namespace. Server errors
+    are logged and treated as misses, so an outage degrades to the local
+    tier.
+    """
+
+    # Store the entry and add it to its tag sets; a tag set lives as long as its longest-lived member
+    SET_SCRIPT = """
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    local ttl = tonumber(ARGV[2])
+    for i = 2, #KEYS do
+        redis.call('SADD', KEYS[i], KEYS[1])
+        if redis.call('PTTL', KEYS[i]) < ttl then
+            redis.call('PEXPIRE', KEYS[i], ttl)
+        end
+    end
+    """
+
+    # Delete every entry of the given tag sets, and the sets
+    INVALIDATE_SCRIPT = """
+    for i = 1, #KEYS do
+        for _, name in ipairs(redis.call('SMEMBERS', KEYS[i])) do
+            redis.call('DEL', name)
+        end
+        redis.call('DEL', KEYS[i])
+    end
+    """
+
+    def __init__(self, url: str, prefix: str = "cache:"):
+        if aioredis is None:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package")
+        self.prefix = prefix
+        self._client = aioredis.from_url(url)
+        self._set = self._client.register_script(self.SET_SCRIPT)
+        self._invalidate = self._client.register_script(self.INVALIDATE_SCRIPT)
+
+    def _key(self, namespace: str, key: Hashable) -> str:
+        return f"{self.prefix}{namespace}:{_redis_key(key)}"
+
+    def _tag(self, namespace: str, tag: Hashable) -> str:
+        return f"{self.prefix}{namespace}:tag:{_redis_key(tag)}"
+
+    def _namespace_tag(self, namespace: str) -> str:
+        # Every entry is also filed under its namespace, so the namespace can be cleared
+        return f"{self.prefix}{namespace}:all"
+
+    async def get(self, namespace: str, key: Hashable) -> Optional[bytes]:
+        try:
+            return await self._client.get(self._key(namespace, key))
+        except aioredis.RedisError as exc:
+            logger.warning("Shared cache unavailable: %s", exc)
+            return None
+
+    async def set(
+            self,
+            namespace: str,
+            key: Hashable,
+            data: bytes,
+            expires_at: float,
+            tags: Iterable[Hashable] = ()
+    ) -> None:
+        ttl_ms = max(1, int((expires_at - time.time()) * 1000))
+        keys = [
+            self._key(namespace, key),
+            self._namespace_tag(namespace),
+            *(self._tag(namespace, tag) for tag in tags),
+        ]
+        try:
+            await self._set(keys=keys, args=[data, ttl_ms])
+        except aioredis.RedisError as exc:
+            logger.warning("Shared cache unavailable: %s", exc)
+
+    async def delete(self, namespace: str, key: Hashable) -> None:
+        try:
+            await self._client.delete(self._key(namespace, key))
+        except aioredis.RedisError as exc:
+            logger.warning("Shared cache unavailable: %s", exc)
+
+    async def invalidate_tags(self, namespace: str, tags: Iterable[Hashable]) -> None:
+        try:
+            await self._invalidate(keys=[self._tag(namespace, tag) for tag in tags])
+        except aioredis.RedisError as exc:
+            logger.warning("Shared cache unavailable: %s", exc)
+
+    async def clear(self, namespace: str) -> None:
+        try:
+            await self._invalidate(keys=[self._namespace_tag(namespace)])
+        except aioredis.RedisError as exc:
+            logger.warning("Shared cache unavailable: %s", exc)
+
+
+_shared_backend: Optional[RedisCacheBackend] = None
+
+
+def shared_backend() -> Optional[RedisCacheBackend]:
+    """The configured shared tier, created on first use"""
+    global _shared_backend
+    if settings.CACHE_BACKEND != "redis":
+        return None
+    if _shared_backend is None:
+        _shared_backend = RedisCacheBackend(settings.REDIS_URL)
+    return _shared_backend
+
+
+class Cache:
+    """
+    A named cache: local LRU tier, optional shared tier, single-flight
+    loads. ``value_type`` is what the shared tier decodes entries to.
+    """
+
+    def __init__(
+            self,
+            namespace: str,
+            max_entries: int,
+            shared: Optional[RedisCacheBackend] = None,
+            value_type: Any = Any
+    ):
+        self.namespace = namespace
+        self.shared = shared
+        # (value, fresh_until, stale_until, tags), with bytes as base64
+        self._codec = TypeAdapter(
+            Tuple[value_type, float, float, List[Any]],
+            config=ConfigDict(ser_json_bytes="base64", val_json_bytes="base64")
+        )
+        self._local = TTLCache(max_entries=max_entries)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+        self._generation = 0
+
+    def _store_local(self, key: Hashable, entry: CacheEntry) -> None:
+        expires_at = entry.stale_until
+        if self.shared is not None:
+            expires_at = min(expires_at, time.time() + settings.CACHE_LOCAL_TTL_SECONDS)
+        self._local.set(key, entry, expires_at=expires_at, tags=entry.tags)
+
+    def _encode(self, entry: CacheEntry) -> bytes:
+        return dump_json(self._codec, (entry.value, entry.fresh_until, entry.stale_until, list(entry.tags)))
+
+    def _decode(self, data: bytes) -> Optional[CacheEntry]:
+        try:
+            value, fresh_until, stale_until, tags = self._codec.validate_json(data)
+        except ValidationError as exc:
+            # Written by a release storing another format; treated as a miss
+            logger.warning("Undecodable %s cache entry: %s", self.namespace, exc)
+            return None
+        return CacheEntry(value, fresh_until, stale_until, tuple(_hashable(tag) for tag in tags))
+
+    async def _entry(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._local.get(key)
+        if self.shared is not None and (entry is None or entry.fresh_until <= time.time()):
+            data = await self.shared.get(self.namespace, key)
+            shared = self._decode(data) if data is not None else None
+            if shared is not None and (entry is None or shared.fresh_until > entry.fresh_until):
+                self._store_local(key, shared)
+                entry = shared
+        return entry
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        """The cached value, fresh or stale, without loading"""
+        entry = await self._entry(key)
+        return entry.value if entry is not None and entry.stale_until > time.time() else None
+
+    async def set(
+            self,
+            key: Hashable,
+            value: Any,
+            ttl: float,
+            stale_ttl: float = 0,
+            tags: Iterable[Hashable] = ()
+    ) -> None:
+        now = time.time()
+        entry = CacheEntry(value=value, fresh_until=now + ttl, stale_until=now + ttl + stale_ttl, tags=tuple(tags))
+        self._store_local(key, entry)
+        if self.shared is not None:
+            await self.shared.set(self.namespace, key, self._encode(entry), entry.stale_until, entry.tags)
+
+    async def delete(self, key: Hashable) -> None:
+        self._generation += 1
+        self._local.delete(key)
+        if self.shared is not None:
+            await self.shared.delete(self.namespace, key)
+
+    async def invalidate_tags(self, *tags: Hashable) -> None:
+        self._generation += 1
+        for tag in tags:
+            self._local.invalidate_tag(tag)
+        if self.shared is not None:
+            await self.shared.invalidate_tags(self.namespace, tags)
+
+    def invalidate_local(self, *tags: Hashable) -> None:
+        """Evict tagged entries from this worker's tier only"""
+        self._generation += 1
+        for tag in tags:
+            self._local.invalidate_tag(tag)
+
+    def clear_local(self) -> None:
+        self._generation += 1
+        self._local.clear()
+
+    def evict_changed(self, *tags: Hashable) -> None:
+        """
+        Evict tagged entries, or every entry when no tags are given, for
+        callers that cannot await such as change feed subscribers. The
+        local tier is evicted at once and the shared tier in the background.
+
+        Each worker does this for every change it receives, so a stale value
+        that a worker stored in the shared tier after the writer's own
+        invalidation is dropped once the change reaches that worker.
+        """
+        if tags:
+            self.invalidate_local(*tags)
+        else:
+            self.clear_local()
+        if self.shared is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Scripts writing outside an event loop; the writer invalidates the shared tier itself
+            return
+        work = self.shared.invalidate_tags(self.namespace, tags) if tags else self.shared.clear(self.namespace)
+        task = loop.create_task(work)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def get_or_set(
+            self,
+            key: Hashable,
+            loader: Callable[[], Awaitable[Any]],
+            ttl: float,
+            stale_ttl: float = 0,
+            tags: Iterable[Hashable] = ()
+    ) -> Any:
+        """
+        Return the cached value, loading it with ``loader`` on a miss.
+        Concurrent misses share one load. An entry past its ``ttl`` but
+        within ``stale_ttl`` is returned as is and refreshed in the
+        background. ``loader`` must not depend on request-scoped resources,
+        since a refresh can outlive the request that triggered it.
+        """
+        tags = tuple(tags)
+        entry = await self._entry(key)
+        now = time.time()
+        if entry is not None and now < entry.fresh_until:
+            return entry.value
+        if entry is not None and now < entry.stale_until:
+            if key not in self._inflight:
+                task = asyncio.create_task(self._refresh(key, loader, ttl, stale_ttl, tags))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            return entry.value
+        return await self._load(key, loader, ttl, stale_ttl, tags)
+
+    async def _load(self, key, loader, ttl, stale_ttl, tags) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark retrieved, so the exception isn't reported when nobody else waited
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            # An invalidation during the load may have made the value stale; serve it once, don't keep it
+            if generation == self._generation:
+                await self.set(key, value, ttl, stale_ttl, tags)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def _refresh(self, key, loader, ttl, stale_ttl, tags) -> None:
+        try:
+            await self._load(key, loader, ttl, stale_ttl, tags)
+        except Exception:
+            logger.exception("Background refresh of %s cache entry %r failed", self.namespace, key)
@@ -0,0 +1,167 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip only without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/problem+json",
+    "text/",
+)
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gzip = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._gzip.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._gzip.flush()
+
+
+def negotiate_encoding(accept_encoding: str, brotli_available: bool) -> Optional[str]:
+    """Pick "br" or "gzip" from Accept-Encoding by quality, preferring brotli on ties"""
+    offers = {}
+    for entry in accept_encoding.split(","):
+        coding, _, params = entry.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        offers[coding.strip().lower()] = quality
+
+    wildcard = offers.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli_available else ["gzip"]
+    best, best_quality = None, 0.0
+    for coding in candidates:
+        quality = offers.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON and text responses with brotli or gzip when the client
+    accepts it and the body reaches ``minimum_size``. Responses that already
+    carry a Content-Encoding (e.g. gzip exports) pass through untouched.
+    Streamed bodies are buffered up to ``minimum_size`` before deciding,
+    then compressed chunk by chunk.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            minimum_size: int = 1024,
+            gzip_level: int = 6,
+            brotli_quality: int = 4
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), brotli is not None)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start: Optional[Message] = None
+        self.buffer = b""
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        if self.start["status"] in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        if "no-transform" in headers.get("cache-control", ""):
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _prepare_headers(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        # The compressed body differs byte for byte, so a strong validator must become weak
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is not None:
+            data = self.encoder.compress(body)
+            if not more_body:
+                data += self.encoder.finish()
+            if data or not more_body:
+                await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        headers = MutableHeaders(raw=self.start["headers"])
+        if not self._compressible(headers):
+            self.passthrough = True
+            await self.downstream(self.start)
+            await self.downstream(message)
+            return
+
+        self.buffer += body
+        if more_body and len(self.buffer) < self.middleware.minimum_size:
+            return
+        if not more_body and len(self.buffer) < self.middleware.minimum_size:
+            self.passthrough = True
+            await self.downstream(self.start)
+            await self.downstream({"type": "http.response.body", "body": self.buffer, "more_body": False})
+            return
+
+        self.encoder = _Encoder(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+        data = self.encoder.compress(self.buffer)
+        self.buffer = b""
+        self._prepare_headers(headers)
+        if more_body:
+            del headers["Content-Length"]
+        else:
+            data += self.encoder.finish()
+            headers["Content-Length"] = str(len(data))
+        await self.downstream(self.start)
+        await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable, Optional, Set
+
+from starlette.responses import Response
+
+from app.core.cache import Cache, shared_backend
+from app.core.config import settings
+from app.utils.etag import etag_matches
+
+
+@dataclass(frozen=True)
+class MenuSnapshot:
+    """Fully serialized public menu page"""
+    body: bytes
+    etag: str
+
+
+MENU_TABLES = {"menu_items", "menu_categories"}
+
+# Pre-rendered GET /menu/ responses keyed by (merchant, lang, category, page, translations)
+menu_snapshots = Cache("menu", settings.MENU_CACHE_MAX_ENTRIES, shared_backend(), MenuSnapshot)
+
+
+def snapshot_key(
+        merchant_id: Optional[int],
+        lang: Optional[str],
+        category_id: Optional[int],
+        skip: int,
+        limit: int,
+        include_translations: bool = True,
+        fields: Optional[Set[str]] = None
+) -> Hashable:
+    fieldset = tuple(sorted(fields)) if fields is not None else None
+    return merchant_id, lang or "en", category_id, skip, limit, include_translations, fieldset
+
+
+async def cached_snapshot(
+        key: Hashable,
+        merchant_id: Optional[int],
+        render: Callable[[], Awaitable[MenuSnapshot]]
+) -> MenuSnapshot:
+    """
+    The snapshot for ``key``, rendered once however many requests miss at
+    the same time. ``render`` may run after the request that triggered it
+    has finished (stale-while-revalidate), so it must open its own session.
+    """
+    return await menu_snapshots.get_or_set(
+        key,
+        render,
+        ttl=settings.MENU_CACHE_TTL_SECONDS,
+        stale_ttl=settings.MENU_CACHE_STALE_SECONDS,
+        tags=[("merchant", merchant_id)]
+    )
+
+
+def merchant_menu_tags(*merchant_ids: Optional[int]) -> list:
+    """Tags of the menu pages of the given merchants, plus the unfiltered listings"""
+    return [("merchant", None), *(("merchant", merchant_id) for merchant_id in merchant_ids if merchant_id is not None)]
+
+
+async def invalidate_merchant_menu(*merchant_ids: Optional[int]) -> None:
+    """
+    Evict every cached menu page for the given merchants, plus the
+    unfiltered listings that include all merchants.
+    """
+    await menu_snapshots.invalidate_tags(*merchant_menu_tags(*merchant_ids))
+
+
+def evict_menu_changes(events: list) -> None:
+    """
+    Change feed subscriber: drop the menu pages of merchants changed by any
+    worker, from this worker's tier and the shared tier. The writer already
+    invalidated the shared tier, but a worker rendering at that moment may
+    have stored a page read before the write.
+    """
+    events = [change for change in events if change.table in MENU_TABLES]
+    if any(change.whole_table for change in events):
+        menu_snapshots.evict_changed()
+    elif events:
+        menu_snapshots.evict_changed(*merchant_menu_tags(*{change.merchant_id for change in events}))
+
+
+def snapshot_response(snapshot: MenuSnapshot, if_none_match: Optional[str]) -> Response:
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": f"public, max-age={settings.MENU_CACHE_MAX_AGE}",
+        "Vary": "Accept-Language",
+    }
+    if etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
@@ -0,0 +1,305 @@
+"""
+Per-request performance instrumentation.
+
+``MetricsMiddleware`` opens a ``RequestStats`` for every HTTP request and
+makes it current through a context variable. The SQLAlchemy cursor hooks
+(``instrument_engine``), the timed connection pool and the response
+serializers add to it while the request runs. When the response starts,
+the totals go into a ``Server-Timing`` header. When the request ends they
+are observed into the histograms rendered at ``/metrics`` in the
+Prometheus text format.
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import Counter as StatementCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("app.metrics")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Thread-safe histogram with fixed buckets, one series per label tuple"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (not cumulative)..., overflow, sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                bucket_labels = _labels(self.label_names, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {values[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {values[-1]}")
+        return lines
+
+
+class Counter:
+    """Thread-safe monotonic counter, one series per label tuple"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._series: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for labels, value in sorted(series.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time to complete a request", ("method", "route", "status"), LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("route",), QUERY_COUNT_BUCKETS
+)
+request_db_time = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request", ("route",), LATENCY_BUCKETS
+)
+request_pool_wait = Histogram(
+    "http_request_pool_wait_seconds", "Time spent waiting for pool connections per request", ("route",),
+    LATENCY_BUCKETS
+)
+request_serialization = Histogram(
+    "http_request_serialization_seconds", "Time spent encoding the response per request", ("route",),
+    LATENCY_BUCKETS
+)
+n_plus_one_requests = Counter(
+    "http_requests_n_plus_one_total", "Requests that went over the SQL statement threshold", ("route",)
+)
+METRICS = (request_duration, request_queries, request_db_time, request_pool_wait, request_serialization,
+           n_plus_one_requests)
+
+
+class RequestStats:
+    """What one request spent its time on so far"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.statements: StatementCounter = StatementCounter()
+        # Set to a list to keep every statement with its parameters (profiling)
+        self.queries: Optional[List[Dict[str, Any]]] = None
+
+    def record_query(self, statement: str, seconds: float, parameters: Any = None) -> None:
+        self.query_count += 1
+        self.query_seconds += seconds
+        self.statements[statement] += 1
+        if self.queries is not None:
+            self.queries.append({
+                "sql": statement,
+                "parameters": repr(parameters)[:1000],
+                "ms": round(seconds * 1000, 3),
+            })
+
+    def server_timing(self) -> str:
+        total = time.perf_counter() - self.started
+        return ", ".join([
+            f'db;dur={self.query_seconds * 1000:.2f};desc="{self.query_count} queries"',
+            f"pool;dur={self.pool_wait_seconds * 1000:.2f}",
+            f"ser;dur={self.serialization_seconds * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ])
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def record_pool_wait(seconds: float) -> None:
+    stats = current_request.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+@contextmanager
+def serialization_timer() -> Iterator[None]:
+    """Count the time spent in the block as response serialization"""
+    stats = current_request.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialization_seconds += time.perf_counter() - started
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every cursor execution on ``engine`` into the current request"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request.get()
+        started = getattr(context, "_metrics_started", None)
+        if stats is not None and started is not None:
+            stats.record_query(statement, time.perf_counter() - started, parameters)
+
+
+PATH_PARAM = re.compile(r"{(\w+)(:\w+)?}")
+
+
+def _route_label(scope: Scope) -> str:
+    """
+    The matched route's full path template, which keeps the label set
+    bounded (no ids in paths). Routes of included routers may only know the
+    template below the router's prefix, so the prefix is taken from the
+    request path, in front of the part the route matched.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return "unmatched"
+    params = scope.get("path_params", {})
+    matched = PATH_PARAM.sub(lambda match: str(params.get(match.group(1), match.group(0))), template)
+    path = scope["path"]
+    if path.endswith(matched):
+        return path[:len(path) - len(matched)] + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Time each HTTP request and attribute its SQL, pool wait and
+    serialization cost to the matched route. Requests executing more than
+    ``n_plus_one_threshold`` statements are logged with their most repeated
+    statement.
+    """
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int = 25, server_timing: bool = True):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            self._observe(scope, stats, status)
+
+    def _observe(self, scope: Scope, stats: RequestStats, status: int) -> None:
+        route = _route_label(scope)
+        request_duration.observe(time.perf_counter() - stats.started, scope["method"], route, str(status))
+        request_queries.observe(stats.query_count, route)
+        request_db_time.observe(stats.query_seconds, route)
+        request_pool_wait.observe(stats.pool_wait_seconds, route)
+        request_serialization.observe(stats.serialization_seconds, route)
+
+        if stats.query_count > self.n_plus_one_threshold:
+            n_plus_one_requests.inc(route)
+            statement, repeats = stats.statements.most_common(1)[0]
+            logger.warning(
+                "Possible N+1: %s %s ran %d SQL statements (%.1f ms); repeated %d times: %s",
+                scope["method"], route, stats.query_count, stats.query_seconds * 1000, repeats,
+                " ".join(statement.split())[:300]
+            )
+
+
+def _pool_metrics(snapshots: List[Dict[str, Any]]) -> List[str]:
+    gauges = {
+        "db_pool_checked_out": ("Connections currently checked out", "checked_out"),
+        "db_pool_size": ("Configured pool size", "size"),
+        "db_pool_overflow": ("Overflow connections open", "overflow"),
+    }
+    counters = {
+        "db_pool_checkouts_total": ("Connection checkouts", "checkouts"),
+        "db_pool_timeouts_total": ("Checkouts that timed out", "timeouts"),
+        "db_pool_wait_seconds_total": ("Time spent waiting for connections", "wait_seconds_total"),
+    }
+    lines = []
+    for kind, metrics in (("gauge", gauges), ("counter", counters)):
+        for name, (documentation, key) in metrics.items():
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+            lines += [
+                f'{name}{{pool="{snapshot["name"]}"}} {snapshot[key]}'
+                for snapshot in snapshots if key in snapshot
+            ]
+    return lines
+
+
+def render_metrics(pool_snapshots: Iterable[Dict[str, Any]] = ()) -> str:
+    """All metrics in the Prometheus text format, plus ``PoolStats.snapshot()`` values"""
+    lines: List[str] = []
+    for metric in METRICS:
+        lines += metric.render()
+    lines += _pool_metrics(list(pool_snapshots))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,197 @@
+"""
+Opt-in profiling of single live requests.
+
+A request sent with ``X-Profile: 1`` (or ``?profile=1``) by a user listed
+in PROFILER_USERS runs under pyinstrument when it is installed, otherwise
+under cProfile. Every SQL statement it executes is recorded with its
+parameters and duration. The response carries an ``X-Profile-Id`` header,
+and the report stays in this worker's memory for PROFILER_TTL_SECONDS at
+``/system/profiles/{id}``.
+
+Profiled requests run one at a time, on the event loop thread. cProfile
+also sees any other request the loop serves in the meantime. Work handed
+to the threadpool (sync endpoints) is not traced.
+"""
+import asyncio
+import cProfile
+import io
+import marshal
+import pstats
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+from fastapi import HTTPException, status
+from fastapi.security.utils import get_authorization_scheme_param
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.deps import check_profiler_user, resolve_principal
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import RequestStats, current_request
+from app.db.session import AsyncSessionLocal
+
+try:
+    import pyinstrument
+except ImportError:  # optional dependency, cProfile without it
+    pyinstrument = None
+
+PROFILE_FLAGS = {"1", "true", "yes"}
+
+
+@dataclass
+class ProfileReport:
+    id: str
+    method: str
+    path: str
+    query_string: str
+    username: str
+    profiler: str
+    created_at: float = field(default_factory=time.time)
+    status: Optional[int] = None
+    duration_ms: float = 0.0
+    queries: List[Dict[str, Any]] = field(default_factory=list)
+    # "text" always; "html" from pyinstrument, "pstats" (marshalled stats) from cProfile
+    artifacts: Dict[str, Union[str, bytes]] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query_string": self.query_string,
+            "username": self.username,
+            "profiler": self.profiler,
+            "created_at": self.created_at,
+            "status": self.status,
+            "duration_ms": self.duration_ms,
+            "query_count": len(self.queries),
+            "query_ms": round(sum(query["ms"] for query in self.queries), 3),
+            "queries": self.queries,
+            "formats": sorted(self.artifacts),
+            "report": self.artifacts.get("text"),
+        }
+
+
+class _PyinstrumentProfiler:
+    name = "pyinstrument"
+
+    def __init__(self):
+        self._profiler = pyinstrument.Profiler(async_mode="enabled")
+
+    def start(self) -> None:
+        self._profiler.start()
+
+    def stop(self) -> None:
+        self._profiler.stop()
+
+    def artifacts(self) -> Dict[str, Union[str, bytes]]:
+        return {"text": self._profiler.output_text(unicode=True), "html": self._profiler.output_html()}
+
+
+class _CProfileProfiler:
+    name = "cprofile"
+
+    def __init__(self):
+        self._profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        self._profiler.enable()
+
+    def stop(self) -> None:
+        self._profiler.disable()
+
+    def artifacts(self) -> Dict[str, Union[str, bytes]]:
+        text = io.StringIO()
+        # Stats takes the profiler's stats over, leaving the profiler's own dict empty
+        stats = pstats.Stats(self._profiler, stream=text)
+        stats.sort_stats("cumulative").print_stats(80)
+        # Same bytes as Stats.dump_stats writes, loadable by pstats/snakeviz
+        return {"text": text.getvalue(), "pstats": marshal.dumps(stats.stats)}
+
+
+def new_profiler():
+    return _PyinstrumentProfiler() if pyinstrument is not None else _CProfileProfiler()
+
+
+profile_reports = TTLCache(max_entries=settings.PROFILER_MAX_REPORTS)
+
+# cProfile and pyinstrument both trace the whole event loop thread
+_profile_lock = asyncio.Lock()
+
+
+def profile_requested(scope: Scope) -> bool:
+    flag = Headers(scope=scope).get("x-profile") or QueryParams(scope.get("query_string", b"")).get("profile")
+    return flag is not None and flag.lower() in PROFILE_FLAGS
+
+
+async def _authorize(scope: Scope):
+    scheme, token = get_authorization_scheme_param(Headers(scope=scope).get("authorization"))
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    async with AsyncSessionLocal() as db:
+        principal = await resolve_principal(db, token)
+    check_profiler_user(principal)
+    return principal
+
+
+class ProfilingMiddleware:
+    """Profile requests flagged with ``X-Profile``/``?profile`` by a profiler user"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.PROFILER_USERS or not profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+        try:
+            principal = await _authorize(scope)
+        except HTTPException as exc:
+            response = JSONResponse({"message": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+            await response(scope, receive, send)
+            return
+
+        profiler = new_profiler()
+        report = ProfileReport(
+            id=uuid.uuid4().hex,
+            method=scope["method"],
+            path=scope["path"],
+            query_string=scope.get("query_string", b"").decode("latin-1"),
+            username=principal.username,
+            profiler=profiler.name,
+        )
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                report.status = message["status"]
+                MutableHeaders(scope=message)["X-Profile-Id"] = report.id
+            await send(message)
+
+        stats = current_request.get()
+        token = None
+        if stats is None:
+            stats = RequestStats()
+            token = current_request.set(stats)
+        stats.queries = []
+
+        async with _profile_lock:
+            started = time.perf_counter()
+            profiler.start()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                profiler.stop()
+                report.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+                report.queries, stats.queries = stats.queries, None
+                if token is not None:
+                    current_request.reset(token)
+                report.artifacts = profiler.artifacts()
+                profile_reports.set(report.id, report, expires_at=time.time() + settings.PROFILER_TTL_SECONDS)
@@ -0,0 +1,271 @@
+"""
+Per-tenant rate limiting and concurrency caps.
+
+Every API request takes a token from its caller's bucket and, when the
+merchant buckets are enabled, from the bucket of the merchant it targets
+(``merchant_id``). Public menu pages served from snapshots are exempt from
+the merchant bucket. The caller is the bearer token once it has been
+verified (it is in the principal cache), otherwise the client address,
+taken from ``X-Forwarded-For`` when the request came through one of
+TRUSTED_PROXIES. A request finding a bucket empty gets ``429`` with
+``Retry-After``.
+
+Expensive endpoints (exports, bulk writes, imports) also need a free slot,
+per merchant (or caller) and per worker. The slot is held until the
+response has been sent, which for an export means the end of the stream.
+
+Buckets live in process memory by default. With
+``RATE_LIMIT_BACKEND=redis`` they are kept in Redis and shared by every
+worker. Concurrency slots are always per worker.
+"""
+import ipaddress
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from fastapi.security.utils import get_authorization_scheme_param
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.security import principal_cache, token_digest
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional dependency, memory backend only without it
+    aioredis = None
+
+logger = logging.getLogger("app.rate_limit")
+
+EXPENSIVE_PATH = re.compile(r"/(export|bulk|import)/?$")
+
+# GET /menu/ is answered from pre-rendered snapshots, so it is not charged to the merchant
+SNAPSHOT_PATH = re.compile(r"/menu/?$")
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+class MemoryRateLimitBackend:
+    """Token buckets in process memory, the least recently used dropped past ``max_keys``"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens; return 0 if allowed, else the seconds until they are available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            retry_after = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+# Refill, take and store atomically on the server clock
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Token buckets shared through Redis (or any server speaking its
+    protocol and Lua scripting). If the server cannot be reached, requests
+    are allowed rather than failed.
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        if aioredis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the redis package")
+        self.prefix = prefix
+        self._client = aioredis.from_url(url)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+        try:
+            return float(await self._take(keys=[self.prefix + key], args=[rate, burst, cost]))
+        except aioredis.RedisError as exc:
+            logger.warning("Rate limit backend unavailable, allowing request: %s", exc)
+            return 0.0
+
+
+def rate_limit_backend():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend(settings.REDIS_URL)
+    return MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+
+
+class ConcurrencyLimiter:
+    """At most ``per_key`` requests in flight per key, and ``total`` overall"""
+
+    def __init__(self, per_key: int, total: int):
+        self.per_key = per_key
+        self.total = total
+        self._active: Dict[str, int] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> bool:
+        with self._lock:
+            if self._count >= self.total or self._active.get(key, 0) >= self.per_key:
+                return False
+            self._active[key] = self._active.get(key, 0) + 1
+            self._count += 1
+            return True
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            remaining = self._active.get(key, 0) - 1
+            if remaining > 0:
+                self._active[key] = remaining
+            else:
+                self._active.pop(key, None)
+            self._count -= 1
+
+
+def trusted_networks(entries: Iterable[str]) -> List[Network]:
+    return [ipaddress.ip_network(entry, strict=False) for entry in entries]
+
+
+def _is_trusted(address: str, trusted: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def client_address(scope: Scope, trusted: List[Network]) -> str:
+    """
+    The address of the client. Behind trusted proxies it is the last
+    ``X-Forwarded-For`` entry that is not itself a trusted proxy; the
+    entries before it could have been sent by the client.
+    """
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if not trusted or not _is_trusted(address, trusted):
+        return address
+    forwarded = Headers(scope=scope).get("x-forwarded-for", "")
+    for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+        address = hop
+        if not _is_trusted(hop, trusted):
+            break
+    return address
+
+
+async def request_keys(scope: Scope, trusted: Optional[List[Network]] = None) -> Tuple[str, Optional[str]]:
+    """The caller's bucket key and, when the request names one, the merchant's"""
+    headers = Headers(scope=scope)
+    scheme, token = get_authorization_scheme_param(headers.get("authorization"))
+    caller = None
+    if scheme.lower() == "bearer" and token:
+        digest = token_digest(token)
+        # Only verified tokens get their own bucket; made-up ones share the client's
+        if await principal_cache.get(digest) is not None:
+            caller = f"token:{digest}"
+    if caller is None:
+        caller = f"ip:{client_address(scope, trusted or [])}"
+
+    merchant_id = QueryParams(scope.get("query_string", b"")).get("merchant_id")
+    merchant = f"merchant:{merchant_id}" if merchant_id and merchant_id.isdigit() else None
+    return caller, merchant
+
+
+class RateLimitMiddleware:
+    """
+    Apply the token buckets and concurrency caps to requests under
+    ``prefix`` while RATE_LIMIT_ENABLED is set
+    """
+
+    def __init__(self, app: ASGIApp, prefix: str = ""):
+        self.app = app
+        self.prefix = prefix
+        self.trusted = trusted_networks(settings.TRUSTED_PROXIES)
+        self._backend = None
+        self.concurrency = ConcurrencyLimiter(
+            settings.EXPENSIVE_MAX_CONCURRENT_PER_MERCHANT, settings.EXPENSIVE_MAX_CONCURRENT
+        )
+
+    @property
+    def backend(self):
+        # Created on first use, so a disabled limiter needs no Redis
+        if self._backend is None:
+            self._backend = rate_limit_backend()
+        return self._backend
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+                not settings.RATE_LIMIT_ENABLED
+                or scope["type"] != "http"
+                or scope["method"] == "OPTIONS"
+                or not scope["path"].startswith(self.prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        caller, merchant = await request_keys(scope, self.trusted)
+        charge_merchant = merchant is not None and settings.RATE_LIMIT_PER_MERCHANT and not (
+                scope["method"] in ("GET", "HEAD") and SNAPSHOT_PATH.search(scope["path"])
+        )
+        retry_after = await self.backend.take(caller, settings.RATE_LIMIT_PER_CALLER, settings.RATE_LIMIT_CALLER_BURST)
+        if not retry_after and charge_merchant:
+            retry_after = await self.backend.take(
+                merchant, settings.RATE_LIMIT_PER_MERCHANT, settings.RATE_LIMIT_MERCHANT_BURST
+            )
+        if retry_after:
+            await self._reject(scope, receive, send, "Rate limit exceeded", retry_after)
+            return
+
+        if not EXPENSIVE_PATH.search(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        slot = merchant or caller
+        if not self.concurrency.acquire(slot):
+            await self._reject(
+                scope, receive, send, "Too many concurrent requests for this endpoint",
+                settings.EXPENSIVE_RETRY_AFTER_SECONDS
+            )
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.concurrency.release(slot)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, message: str, retry_after: float) -> None:
+        response = JSONResponse(
+            {"message": message},
+            status_code=429,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+        await response(scope, receive, send)
@@ -1,9 +1,16 @@
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Union, Any
 
+from fastapi import HTTPException
 from jose import jwt
 from passlib.context import CryptContext
 
+from app.core.cache import Cache, shared_backend
 from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -11,6 +18,37 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 
+# bcrypt releases the GIL, so a small dedicated thread pool keeps hashing off
+# the event loop without competing with FastAPI's default threadpool.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_hash_capacity = settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE
+_hash_in_flight = 0
+_hash_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated user as resolved from a verified access token"""
+    id: int
+    username: str
+    is_active: bool = True
+
+
+# Verified principals keyed by token digest, each expiring with its token
+principal_cache = Cache("principal", settings.AUTH_CACHE_MAX_ENTRIES, shared_backend(), Principal)
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def invalidate_user(username: str) -> None:
+    """Drop every cached token for a user, e.g. after the user changes"""
+    await principal_cache.invalidate_tags(("user", username))
+
 
 def create_access_token(
         subject: Union[str, Any], expires_delta: timedelta = None
@@ -34,3 +72,45 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+def _hash_job_done(_future=None) -> None:
+    global _hash_in_flight
+    with _hash_lock:
+        _hash_in_flight -= 1
+
+
+async def _run_hash_job(func, *args):
+    """
+    Run a bcrypt call on the hashing pool. When every worker is busy and the
+    queue is full, fail fast with 503 instead of piling up more work.
+    """
+    global _hash_in_flight
+    with _hash_lock:
+        if _hash_in_flight >= _hash_capacity:
+            raise HTTPException(
+                status_code=503,
+                detail="Authentication service is busy, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        _hash_in_flight += 1
+    try:
+        future = _hash_executor.submit(func, *args)
+    except BaseException:
+        _hash_job_done()
+        raise
+    # Released when the job ends, not the waiter: a cancelled request leaves a started job running
+    future.add_done_callback(_hash_job_done)
+    return await asyncio.wrap_future(future)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hash_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hash_job(get_password_hash, password)
+
+
+def shutdown_password_hasher() -> None:
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
@@ -1,10 +1,14 @@
 # app/db/base.py
 from datetime import datetime
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, DateTime, Integer
+from sqlalchemy import JSON, Column, DateTime, Integer
+from sqlalchemy.dialects.postgresql import JSONB
 
 Base = declarative_base()
 
+# JSON documents are stored as JSONB on Postgres so they can be GIN-indexed
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
 
 class TimeStampedBase(Base):
     """Abstract base class that provides id and timestamp columns"""
@@ -0,0 +1,289 @@
+"""
+Change-data feed for cross-worker cache invalidation.
+
+Every committed write to a feed table produces a ``ChangeEvent`` (table,
+id, merchant_id, updated_at). Unit-of-work writes are collected from the
+session's flushes. Statement-level writes (bulk INSERT/UPDATE/DELETE) either
+record their rows with ``record_changes`` and set the ``changes_recorded``
+execution option, or count as a change to the whole table.
+
+On Postgres the events are sent with ``pg_notify`` in the writing
+transaction, so they are delivered only if it commits, to every worker
+listening on CHANGE_FEED_CHANNEL. Otherwise (SQLite, tests) they go to the
+in-process ``change_bus`` after the commit. Either way, subscribers of
+``change_bus`` see them and evict their local caches.
+"""
+import asyncio
+import json
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from itertools import chain
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+try:
+    import asyncpg
+except ImportError:  # optional dependency, only needed to listen on Postgres
+    asyncpg = None
+
+logger = logging.getLogger("app.change_feed")
+
+FEED_TABLES = {"menu_items", "menu_categories", "products"}
+
+# pg_notify payloads must stay under 8000 bytes
+MAX_PAYLOAD_BYTES = 7900
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """
+    A committed write. ``id`` is None when only the merchant is known, and
+    both are None when any row of the table may have changed.
+    """
+    table: str
+    id: Optional[int] = None
+    merchant_id: Optional[int] = None
+    updated_at: Optional[str] = None
+
+    @property
+    def whole_table(self) -> bool:
+        return self.id is None and self.merchant_id is None
+
+
+def change_event(
+        table: str,
+        id: Optional[int],
+        merchant_id: Optional[int],
+        updated_at: Optional[datetime] = None
+) -> ChangeEvent:
+    return ChangeEvent(table, id, merchant_id, updated_at.isoformat() if updated_at is not None else None)
+
+
+Subscriber = Callable[[List[ChangeEvent]], None]
+
+
+class ChangeBus:
+    """In-process fan-out of committed changes to subscribers"""
+
+    def __init__(self):
+        self._subscribers: List[Subscriber] = []
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        if subscriber not in self._subscribers:
+            self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    def publish(self, events: List[ChangeEvent]) -> None:
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber(events)
+            except Exception:
+                logger.exception("Change feed subscriber %r failed", subscriber)
+
+
+change_bus = ChangeBus()
+
+
+def _uses_notify() -> bool:
+    backend = settings.CHANGE_FEED_BACKEND
+    if backend == "auto":
+        return make_url(settings.DATABASE_URL).get_backend_name() == "postgresql"
+    return backend == "postgres"
+
+
+USES_NOTIFY = _uses_notify()
+
+
+def coalesce(events: Iterable[ChangeEvent], max_events: int) -> List[ChangeEvent]:
+    """
+    Drop duplicates; past ``max_events``, keep one event per (table,
+    merchant) so a bulk write stays a handful of notifications.
+    """
+    unique: Dict[Tuple, ChangeEvent] = {}
+    for change in events:
+        unique[(change.table, change.id, change.merchant_id)] = change
+    if len(unique) <= max_events:
+        return list(unique.values())
+    merged: Dict[Tuple, ChangeEvent] = {}
+    for change in unique.values():
+        key = (change.table, change.merchant_id)
+        latest = merged.get(key)
+        updated_at = max(filter(None, (change.updated_at, latest and latest.updated_at)), default=None)
+        merged[key] = ChangeEvent(change.table, None, change.merchant_id, updated_at)
+    return list(merged.values())
+
+
+def encode_payloads(events: List[ChangeEvent]) -> Iterator[str]:
+    """JSON arrays of events, each small enough for one notification"""
+    chunk: List[str] = []
+    size = 2
+    for change in events:
+        item = json.dumps(asdict(change), separators=(",", ":"))
+        if chunk and size + len(item) + 1 > MAX_PAYLOAD_BYTES:
+            yield "[" + ",".join(chunk) + "]"
+            chunk, size = [], 2
+        chunk.append(item)
+        size += len(item) + 1
+    if chunk:
+        yield "[" + ",".join(chunk) + "]"
+
+
+def decode_payload(payload: str) -> List[ChangeEvent]:
+    return [ChangeEvent(**item) for item in json.loads(payload)]
+
+
+def record_changes(db: Union[Session, AsyncSession], events: Iterable[ChangeEvent]) -> None:
+    """Add changes made by statements to the session's pending events"""
+    session = getattr(db, "sync_session", db)
+    session.info.setdefault("change_events", []).extend(events)
+
+
+def _instance_changes(instance) -> List[ChangeEvent]:
+    state = inspect(instance)
+    values = state.dict
+    merchant_ids = {values.get("merchant_id")}
+    if "merchant_id" in state.mapper.attrs:
+        # A row moved to another merchant changes both merchants' menus
+        merchant_ids.update(state.attrs.merchant_id.history.deleted or ())
+    return [
+        change_event(instance.__tablename__, values.get("id"), merchant_id, values.get("updated_at"))
+        for merchant_id in merchant_ids
+    ]
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement_writes(state):
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    table = getattr(getattr(state.statement, "table", None), "name", None)
+    if table in FEED_TABLES and not state.execution_options.get("changes_recorded"):
+        record_changes(state.session, [ChangeEvent(table)])
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_writes(session, flush_context):
+    # new/dirty/deleted and attribute history still describe the flush here
+    changes = [
+        change
+        for instance in chain(session.new, session.dirty, session.deleted)
+        if getattr(instance, "__tablename__", None) in FEED_TABLES
+        for change in _instance_changes(instance)
+    ]
+    if changes:
+        record_changes(session, changes)
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_before_commit(session):
+    if not USES_NOTIFY:
+        return
+    # Flush first: commit's own flush would come after this hook
+    session.flush()
+    events = session.info.pop("change_events", None)
+    if not events:
+        return
+    connection = session.connection()
+    for payload in encode_payloads(coalesce(events, settings.CHANGE_FEED_MAX_EVENTS)):
+        connection.execute(select(func.pg_notify(settings.CHANGE_FEED_CHANNEL, payload)))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session):
+    events = session.info.pop("change_events", None)
+    if events:
+        change_bus.publish(coalesce(events, settings.CHANGE_FEED_MAX_EVENTS))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_after_rollback(session, transaction):
+    # Runs after after_commit; events still pending here belong to a rolled back transaction
+    if transaction.parent is None:
+        session.info.pop("change_events", None)
+
+
+class PostgresChangeListener:
+    """
+    Relay notifications on ``channel`` to ``bus`` over a dedicated
+    connection, reconnecting with backoff. Notifications sent while it was
+    disconnected are lost, so every (re)connect publishes a whole-table
+    change for each feed table.
+    """
+
+    def __init__(self, dsn: str, channel: str, bus: ChangeBus):
+        if asyncpg is None:
+            raise RuntimeError("The Postgres change feed needs the asyncpg package")
+        self.dsn = dsn
+        self.channel = channel
+        self.bus = bus
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        try:
+            events = decode_payload(payload)
+        except (ValueError, TypeError):
+            logger.warning("Ignoring malformed change notification: %.200s", payload)
+            return
+        self.bus.publish(events)
+
+    async def _run(self) -> None:
+        delay = 1.0
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                self.bus.publish([ChangeEvent(table) for table in sorted(FEED_TABLES)])
+                delay = 1.0
+                await closed.wait()
+                logger.warning("Change feed connection lost, reconnecting")
+            except (OSError, asyncpg.PostgresError) as exc:
+                logger.warning("Change feed unavailable, retrying in %.0fs: %s", delay, exc)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+_listener: Optional[PostgresChangeListener] = None
+
+
+def start_change_listener() -> None:
+    """Receive other workers' changes; nothing to do for the in-process bus"""
+    global _listener
+    if USES_NOTIFY and _listener is None:
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        _listener = PostgresChangeListener(dsn, settings.CHANGE_FEED_CHANNEL, change_bus)
+        _listener.start()
+
+
+async def stop_change_listener() -> None:
+    global _listener
+    if _listener is not None:
+        await _listener.stop()
+        _listener = None
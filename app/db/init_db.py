@@ -0,0 +1,17 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.models.user import User
+
+
+def init_db(db: Session) -> None:
+    """Create the FIRST_SUPERUSER account if it is configured and missing"""
+    username = getattr(settings, "FIRST_SUPERUSER", None)
+    password = getattr(settings, "FIRST_SUPERUSER_PASSWORD", None)
+    if not username or not password:
+        return
+    if db.scalar(select(User.id).where(User.username == username)) is not None:
+        return
+    db.add(User(username=username, hashed_password=get_password_hash(password)))
+    db.commit()
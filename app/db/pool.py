@@ -0,0 +1,127 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Type
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+from app.core.metrics import record_pool_wait
+
+
+class PoolStats:
+    """Checkout counters for one engine's connection pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Engine = None
+        # Configured by engine_options; QueuePool keeps it private
+        self.max_overflow: Optional[int] = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            if timed_out:
+                self.timeouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = {
+            "name": self.name,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+        }
+        pool = self.engine.pool if self.engine is not None else None
+        if isinstance(pool, QueuePool):
+            data.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=self.max_overflow,
+            )
+        return data
+
+
+def timed_pool_class(base: Type[QueuePool], stats: PoolStats) -> Type[QueuePool]:
+    """
+    Subclass a queue pool so every checkout records how long the caller waited
+    (including connect time for new connections) into ``stats`` and into the
+    current request's metrics.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except exc.TimeoutError:
+            waited = time.perf_counter() - start
+            stats.record_wait(waited, timed_out=True)
+            record_pool_wait(waited)
+            raise
+        waited = time.perf_counter() - start
+        stats.record_wait(waited)
+        record_pool_wait(waited)
+        return connection
+
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+# The sync engine only serves startup tasks and scripts
+SYNC_POOL_SIZE = 1
+
+
+def worker_pool_size() -> int:
+    """
+    Per-process size of the async (request) pool. With DB_POOL_TOTAL set,
+    the connection budget is split across WEB_CONCURRENCY uvicorn/gunicorn
+    workers, and each worker's share also covers its sync engine.
+    """
+    if settings.DB_POOL_TOTAL:
+        share = settings.DB_POOL_TOTAL // max(1, settings.WEB_CONCURRENCY)
+        return max(1, share - SYNC_POOL_SIZE)
+    return settings.DB_POOL_SIZE
+
+
+def engine_options(url: str, stats: PoolStats, is_async: bool = False) -> Dict[str, Any]:
+    """Keyword arguments for create_engine/create_async_engine built from Settings"""
+    options: Dict[str, Any] = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        return options
+
+    if is_async:
+        size = worker_pool_size()
+        # Overflow connections would break the DB_POOL_TOTAL budget
+        max_overflow = 0 if settings.DB_POOL_TOTAL else settings.DB_MAX_OVERFLOW
+    else:
+        size, max_overflow = SYNC_POOL_SIZE, 0
+    stats.max_overflow = max_overflow
+    options.update(
+        poolclass=timed_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, stats),
+        pool_size=size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+
+    if backend == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
@@ -0,0 +1,53 @@
+"""
+Full-text search expressions shared by the models, migrations and the
+search endpoint. Index definitions and queries must build the exact same
+expression for Postgres to use the expression indexes.
+"""
+from sqlalchemy import DDL, Index, Text, cast, event, func, literal_column, null
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.db.base import Base
+
+# The "simple" configuration lowercases without stemming, which suits mixed
+# English/Khmer text where no single-language stemmer applies
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+SEARCH_TEXT_FUNCTION = """
+CREATE OR REPLACE FUNCTION catalog_search_text(name text, description text, translations jsonb)
+RETURNS text LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT concat_ws(' ', name, description, (
+        SELECT string_agg(value, ' ')
+        FROM jsonb_each_text(CASE WHEN jsonb_typeof(translations) = 'object' THEN translations END)
+    ))
+$$
+"""
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+event.listen(Base.metadata, "before_create", DDL(SEARCH_TEXT_FUNCTION).execute_if(dialect="postgresql"))
+
+
+def search_document(name, description=None, translations=None):
+    """Name, description and every translation value as one text document"""
+    return func.catalog_search_text(
+        name,
+        description if description is not None else cast(null(), Text),
+        translations if translations is not None else cast(null(), JSONB),
+    )
+
+
+def search_vector(document):
+    return func.to_tsvector(SEARCH_CONFIG, document)
+
+
+def search_indexes(table_name: str, document) -> tuple:
+    """GIN indexes over the tsvector and the trigrams of ``document`` (Postgres only)"""
+    return (
+        Index(f"ix_{table_name}_search_tsv", search_vector(document),
+              postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index(f"ix_{table_name}_search_trgm", document.label("search_text"),
+              postgresql_using="gin", postgresql_ops={"search_text": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
@@ -1,21 +1,99 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.db.pool import PoolStats, engine_options
 
-# Create engine with the correct URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# Drivers for URLs that name only the backend; SQLAlchemy 2.1 would pick
+# psycopg (v3) for postgresql://, and requirements.txt ships psycopg2
+SYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg2",
+}
+
+
+def get_sync_database_url(url: str) -> str:
+    """DATABASE_URL with the installed driver filled in when it names none"""
+    parsed = make_url(url)
+    if parsed.drivername in SYNC_DRIVERS:
+        parsed = parsed.set(drivername=SYNC_DRIVERS[parsed.drivername])
+    return parsed.render_as_string(hide_password=False)
+
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching asyncio driver"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def begin_before_savepoints(engine) -> None:
+    """
+    The sqlite3 driver only begins a transaction before a write, not before
+    a SAVEPOINT. A savepoint opened first (``begin_nested``) thus ran in
+    autocommit and its release committed for good, so begin one there.
+    """
+    @event.listens_for(engine, "savepoint")
+    def savepoint(connection, name):
+        if not connection.connection.driver_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN")
+
+
+SYNC_DATABASE_URL = get_sync_database_url(settings.DATABASE_URL)
+ASYNC_DATABASE_URL = get_async_database_url(settings.DATABASE_URL)
+
+sync_pool_stats = PoolStats("sync")
+async_pool_stats = PoolStats("async")
+
+# Create engine with the correct URL; pool sizing and echo come from Settings
 engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=True  # Set to False in production
+    SYNC_DATABASE_URL,
+    **engine_options(SYNC_DATABASE_URL, sync_pool_stats)
 )
+sync_pool_stats.engine = engine
+instrument_engine(engine)
+if engine.dialect.name == "sqlite":
+    begin_before_savepoints(engine)
 
 # Create SessionLocal class with the configured engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the request path; the sync engine above remains for
+# startup tasks and scripts.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **engine_options(ASYNC_DATABASE_URL, async_pool_stats, is_async=True)
+)
+async_pool_stats.engine = async_engine.sync_engine
+instrument_engine(async_engine.sync_engine)
+if async_engine.dialect.name == "sqlite":
+    begin_before_savepoints(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 def get_db():
     """Dependency for getting DB session"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """Dependency for getting an async DB session"""
+    async with AsyncSessionLocal() as db:
+        yield db
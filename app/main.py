@@ -1,12 +1,22 @@
 import logging
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import JSONResponse
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
 from app.api.v1.api import api_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.menu_cache import evict_menu_changes
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.profiling import ProfilingMiddleware
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.security import shutdown_password_hasher
 from app.db.base import Base
-from app.db.session import engine
+from app.db.change_feed import change_bus, start_change_listener, stop_change_listener
+from app.db.session import async_engine, async_pool_stats, engine, sync_pool_stats
 from app.models.products import ProductType
+from app.utils.search_index import evict_search_changes
+from app.utils.serialization import default_response_class
 from app.db.init_db import init_db
 from app.db.session import SessionLocal
 
@@ -14,8 +24,11 @@ from app.db.session import SessionLocal
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=default_response_class()
 )
+# Inside CORS, so rejected requests still carry the CORS headers
+app.add_middleware(RateLimitMiddleware, prefix=settings.API_V1_STR)
 # Set up CORS
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +37,22 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+# Inside the metrics middleware, so profiled requests reuse its SQL capture
+app.add_middleware(ProfilingMiddleware)
+# Outermost, so its timings cover the other middleware and reach the final headers
+if settings.METRICS_ENABLED:
+    app.add_middleware(
+        MetricsMiddleware,
+        n_plus_one_threshold=settings.METRICS_N_PLUS_ONE_THRESHOLD,
+        server_timing=settings.METRICS_SERVER_TIMING,
+    )
 
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -31,12 +60,17 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Evict this worker's caches on writes committed by any worker
+change_bus.subscribe(evict_menu_changes)
+change_bus.subscribe(evict_search_changes)
+
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Application startup complete.")
     # Create tables
-    Base.metadata.create_all(bind=engine)
+    if settings.DB_AUTO_CREATE_TABLES:
+        Base.metadata.create_all(bind=engine)
 
     # Initialize default data if needed
     db = SessionLocal()
@@ -45,22 +79,37 @@ async def startup_event():
     finally:
         db.close()
 
+    start_change_listener()
+
 
 @app.get("/")
 def root():
     return {"message": "Welcome to Menu API"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint for this worker process"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    content = render_metrics([async_pool_stats.snapshot(), sync_pool_stats.snapshot()])
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4")
+
+
 @app.on_event("shutdown")
 async def shutdown_event():
+    shutdown_password_hasher()
+    await stop_change_listener()
+    await async_engine.dispose()
     logger.info("Application shutdown complete.")
 
 
 @app.exception_handler(HTTPException)
-async def http_exception_handler(exc: HTTPException):
+async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"message": exc.detail},
+        headers=exc.headers,
     )
 
 
@@ -0,0 +1,13 @@
+"""
+Importing any model module runs this package first, which imports every
+model. Relationships that name a class in another module then always
+resolve, and ``Base`` imported from here has every table in its metadata
+(for Alembic and ``create_all``).
+"""
+from app.db.base import Base
+from app.models.menu import MenuCategory, MenuCategoryStats, MenuItem
+from app.models.merchant import Merchant
+from app.models.products import Category, Product
+from app.models.user import User
+
+__all__ = ["Base", "Category", "MenuCategory", "MenuCategoryStats", "MenuItem", "Merchant", "Product", "User"]
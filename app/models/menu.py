@@ -1,7 +1,9 @@
 from enum import Enum
-from sqlalchemy import Column, String, Float, Integer, ForeignKey, Boolean, JSON, Enum as SQLEnum
-from sqlalchemy.orm import relationship
-from app.db.base import TimeStampedBase
+from datetime import datetime
+from sqlalchemy import Column, String, Float, Integer, ForeignKey, Boolean, JSON, DateTime, Enum as SQLEnum, Index, UniqueConstraint, text
+from sqlalchemy.orm import backref, relationship
+from app.db.base import Base, JSONDocument, TimeStampedBase
+from app.db.search import search_document, search_indexes
 
 
 class MenuItemType(str, Enum):
@@ -19,18 +21,30 @@ class BeverageType(str, Enum):
 
 class MenuItem(TimeStampedBase):
     __tablename__ = "menu_items"
+    __table_args__ = (
+        UniqueConstraint("merchant_id", "external_id", name="uq_menu_items_merchant_external_id"),
+        Index("ix_menu_items_merchant_category", "merchant_id", "category_id", "id"),
+        Index("ix_menu_items_category_id", "category_id"),
+        Index("ix_menu_items_active_merchant_category", "merchant_id", "category_id",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+        Index("ix_menu_items_translations_gin", "translations",
+              postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_menu_items_attributes_gin", "attributes",
+              postgresql_using="gin", postgresql_ops={"attributes": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     price_usd = Column(Float)
     price_khr = Column(Float)
     is_active = Column(Boolean, default=True)
-    translations = Column(JSON)
+    translations = Column(JSONDocument)
     image_url = Column(String)
     item_type = Column(SQLEnum(MenuItemType))
-    attributes = Column(JSON)  # Store type-specific attributes
+    attributes = Column(JSONDocument)  # Store type-specific attributes
     merchant_id = Column(Integer, ForeignKey("merchants.id"))
     category_id = Column(Integer, ForeignKey("menu_categories.id"))
+    external_id = Column(String, nullable=True)  # Merchant-scoped id used for bulk upserts
 
     merchant = relationship("Merchant", back_populates="menu_items")
     category = relationship("MenuCategory", back_populates="items")
@@ -38,11 +52,20 @@ class MenuItem(TimeStampedBase):
 
 class MenuCategory(TimeStampedBase):
     __tablename__ = "menu_categories"
+    __table_args__ = (
+        Index("ix_menu_categories_merchant_parent_active_order",
+              "merchant_id", "parent_id", "is_active", "display_order"),
+        Index("ix_menu_categories_active_merchant_parent_order",
+              "merchant_id", "parent_id", "display_order", "id",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+        Index("ix_menu_categories_translations_gin", "translations",
+              postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     slug = Column(String, unique=True, index=True)
-    translations = Column(JSON)
+    translations = Column(JSONDocument)
     description = Column(String, nullable=True)
     image_url = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
@@ -52,5 +75,36 @@ class MenuCategory(TimeStampedBase):
 
     items = relationship("MenuItem", back_populates="category")
     merchant = relationship("Merchant", back_populates="categories")
-    subcategories = relationship("MenuCategory",
-                                 backref=relationship("MenuCategory", remote_side=[id]))
+    subcategories = relationship("MenuCategory", backref=backref("parent", remote_side=[id]))
+    stats = relationship("MenuCategoryStats", uselist=False, lazy="joined",
+                         cascade="all, delete-orphan", passive_deletes=True)
+
+    @property
+    def items_count(self):
+        return self.stats.items_total if self.stats is not None else 0
+
+
+class MenuCategoryStats(Base):
+    """Per-category item aggregates, kept current by every write to the category's items"""
+    __tablename__ = "menu_category_stats"
+
+    category_id = Column(Integer, ForeignKey("menu_categories.id", ondelete="CASCADE"), primary_key=True)
+    items_total = Column(Integer, nullable=False, default=0)
+    items_active = Column(Integer, nullable=False, default=0)
+    items_by_type = Column(JSON, nullable=False, default=dict)
+    min_price_usd = Column(Float, nullable=True)
+    max_price_usd = Column(Float, nullable=True)
+    min_price_khr = Column(Float, nullable=True)
+    max_price_khr = Column(Float, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+# Documents matched by GET /search; the indexes attach to the tables on creation
+MENU_ITEM_SEARCH_DOCUMENT = search_document(MenuItem.__table__.c.name, translations=MenuItem.__table__.c.translations)
+MENU_CATEGORY_SEARCH_DOCUMENT = search_document(
+    MenuCategory.__table__.c.name,
+    MenuCategory.__table__.c.description,
+    MenuCategory.__table__.c.translations
+)
+search_indexes("menu_items", MENU_ITEM_SEARCH_DOCUMENT)
+search_indexes("menu_categories", MENU_CATEGORY_SEARCH_DOCUMENT)
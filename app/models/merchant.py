@@ -0,0 +1,15 @@
+from sqlalchemy import Boolean, Column, Integer, String
+from sqlalchemy.orm import relationship
+
+from app.db.base import TimeStampedBase
+
+
+class Merchant(TimeStampedBase):
+    __tablename__ = "merchants"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    is_active = Column(Boolean, default=True)
+
+    menu_items = relationship("MenuItem", back_populates="merchant")
+    categories = relationship("MenuCategory", back_populates="merchant")
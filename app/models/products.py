@@ -1,9 +1,10 @@
 import enum
 
-from sqlalchemy import Column, String, Float, Integer, JSON, ForeignKey, Enum
+from sqlalchemy import Column, String, Float, Integer, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 
-from app.db.base import TimeStampedBase
+from app.db.base import JSONDocument, TimeStampedBase
+from app.db.search import search_document, search_indexes
 
 
 class ProductType(str, enum.Enum):
@@ -16,6 +17,12 @@ class ProductType(str, enum.Enum):
 
 class Product(TimeStampedBase):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_type_category", "type", "category_id"),
+        Index("ix_products_category_id", "category_id"),
+        Index("ix_products_attributes_gin", "attributes",
+              postgresql_using="gin", postgresql_ops={"attributes": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -23,11 +30,10 @@ class Product(TimeStampedBase):
     price = Column(Float)
     stock = Column(Integer)
     type = Column(Enum(ProductType))
-    attributes = Column(JSON)  # Store type-specific attributes
+    attributes = Column(JSONDocument)  # Store type-specific attributes
     category_id = Column(Integer, ForeignKey("categories.id"))
 
     category = relationship("Category", back_populates="products")
-    images = relationship("ProductImage", back_populates="product")
 
 
 class Category(TimeStampedBase):
@@ -39,3 +45,8 @@ class Category(TimeStampedBase):
 
     products = relationship("Product", back_populates="category")
     children = relationship("Category")
+
+
+# Documents matched by GET /search; the indexes attach to the table on creation
+PRODUCT_SEARCH_DOCUMENT = search_document(Product.__table__.c.name, Product.__table__.c.description)
+search_indexes("products", PRODUCT_SEARCH_DOCUMENT)
@@ -0,0 +1,19 @@
+from typing import Any, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class BulkRowError(BaseModel):
+    """A rejected row of a bulk request"""
+    index: int = Field(..., description="Zero-based position of the row in the request")
+    id: Optional[int] = None
+    detail: Any
+
+
+class BulkResult(BaseModel):
+    """Outcome of a bulk create/update/delete request"""
+    processed: int
+    succeeded: int
+    ids: List[int] = Field(default_factory=list, description="IDs written, in request order")
+    errors: List[BulkRowError] = Field(default_factory=list)
+    errors_truncated: bool = False
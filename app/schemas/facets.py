@@ -0,0 +1,16 @@
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
+
+class FacetCounts(BaseModel):
+    total: int
+    type: List[FacetValue] = []
+    category: List[FacetValue] = []
+    price: List[FacetValue] = []
+    attributes: Dict[str, List[FacetValue]] = {}
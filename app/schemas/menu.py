@@ -58,6 +58,20 @@ class CategoryCreate(CategoryBase):
         }
 
 
+class CategoryStats(BaseModel):
+    """Item aggregates maintained per category"""
+    items_total: int = 0
+    items_active: int = 0
+    items_by_type: Dict[str, int] = Field(default_factory=dict)
+    min_price_usd: Optional[float] = None
+    max_price_usd: Optional[float] = None
+    min_price_khr: Optional[float] = None
+    max_price_khr: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
 class Category(CategoryBase):
     """Schema for retrieving menu categories"""
     id: int
@@ -66,6 +80,7 @@ class Category(CategoryBase):
     updated_at: datetime
     subcategories: Optional[List['Category']] = []
     items_count: Optional[int] = None
+    stats: Optional[CategoryStats] = None
 
     class Config:
         from_attributes = True
@@ -110,6 +125,11 @@ class MenuItemBase(BaseModel):
     )
     category_id: int = Field(..., description="ID of the category this item belongs to")
     merchant_id: int = Field(..., description="ID of the merchant this item belongs to")
+    external_id: Optional[str] = Field(
+        None,
+        max_length=100,
+        description="Merchant-scoped external identifier, used as the bulk upsert key"
+    )
 
     @validator('price_usd', 'price_khr')
     def validate_price(cls, v):
@@ -188,6 +208,16 @@ class MenuItemUpdate(BaseModel):
         return v
 
 
+class MenuItemBulkUpdate(MenuItemUpdate):
+    """Schema for one row of a bulk menu item update"""
+    id: int = Field(..., description="ID of the menu item to update")
+
+
+class MenuItemBulkDelete(BaseModel):
+    """Schema for bulk menu item deletion"""
+    ids: List[int] = Field(..., min_length=1, description="IDs of the menu items to delete")
+
+
 class MenuItemResponse(BaseModel):
     """Schema for menu item list responses"""
     items: List[MenuItem]
@@ -195,6 +225,7 @@ class MenuItemResponse(BaseModel):
     page: int
     size: int
     has_more: bool
+    next_cursor: Optional[str] = None
 
     class Config:
         json_schema_extra = {
@@ -211,6 +242,38 @@ class MenuItemResponse(BaseModel):
                 "total": 1,
                 "page": 1,
                 "size": 10,
-                "has_more": False
+                "has_more": False,
+                "next_cursor": None
             }
         }
+
+
+class CategoryListResponse(BaseModel):
+    """Schema for cursor-paginated category list responses"""
+    items: List[Category]
+    total: int
+    page: int
+    size: int
+    has_more: bool
+    next_cursor: Optional[str] = None
+
+
+# Variants used when a client asks for a single language without the
+# translations map (``include_translations=false``)
+class LocalizedCategory(Category):
+    """Category without its translations map"""
+    translations: Dict[str, str] = Field(default_factory=dict, exclude=True)
+    subcategories: Optional[List['LocalizedCategory']] = []
+
+
+class LocalizedMenuItem(MenuItem):
+    """Menu item without its translations map"""
+    translations: Dict[str, str] = Field(default_factory=dict, exclude=True)
+
+
+class LocalizedMenuItemResponse(MenuItemResponse):
+    items: List[LocalizedMenuItem]
+
+
+class LocalizedCategoryListResponse(CategoryListResponse):
+    items: List[LocalizedCategory]
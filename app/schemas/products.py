@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional, List, Dict, Union
+from typing import Any, Optional, List, Dict, Union
 
 from pydantic import BaseModel, Field
 
@@ -29,3 +29,17 @@ class ProductUpdate(BaseModel):
     price: Optional[float] = Field(gt=0)
     stock: Optional[int] = Field(ge=0)
     attributes: Optional[Dict[str, Union[str, int, float, List[str]]]] = None
+
+
+class ProductImportRejection(BaseModel):
+    index: int = Field(description="Zero-based record number in the uploaded file")
+    detail: Any
+
+
+class ProductImportResult(BaseModel):
+    processed: int
+    imported: int
+    rejected: int
+    next_record: int = Field(description="Pass as resume_from to continue after this point")
+    rejections: List[ProductImportRejection] = []
+    rejections_truncated: bool = False
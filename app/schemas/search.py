@@ -0,0 +1,16 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    kind: str  # menu_item, category or product
+    id: int
+    name: str
+    merchant_id: Optional[int] = None
+    score: float
+
+
+class SearchResult(BaseModel):
+    query: str
+    hits: List[SearchHit]
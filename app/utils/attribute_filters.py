@@ -0,0 +1,129 @@
+import json
+import operator
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Float, and_, cast, exists, func, or_, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+
+FILTER_PREFIX = "attr."
+
+# Operators accepted as a value prefix, e.g. ``attr.size=in:M,L``
+VALUE_OPERATORS = ("in", "gt", "gte", "lt", "lte")
+
+RANGE_OPERATORS = {
+    "gt": (">", operator.gt),
+    "gte": (">=", operator.ge),
+    "lt": ("<", operator.lt),
+    "lte": ("<=", operator.le),
+}
+
+_EXPRESSION = re.compile(r"(?P<key>[\w-]+)(?:(?P<op>[<>])(?P<rest>.*))?")
+
+
+@dataclass(frozen=True)
+class AttributeFilter:
+    key: str
+    kind: str
+    op: str
+    values: Tuple[Any, ...]
+    raw: Tuple[str, ...]
+
+
+def _number(key: str, text: str) -> Any:
+    try:
+        value = float(text)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Attribute '{key}' must be compared with a number, got '{text}'")
+    return int(value) if value.is_integer() else value
+
+
+def parse_attribute_filters(params: Iterable[Tuple[str, str]], attributes: Dict[str, str]) -> List[AttributeFilter]:
+    """
+    Parse ``attr.*`` query parameters against the filterable ``attributes``.
+
+    Supported forms: ``attr.brand=X``, ``attr.size=in:M,L``,
+    ``attr.year>=2015`` / ``attr.year<=2015`` (split by the query string
+    parser into key ``attr.year>`` and value ``2015``), ``attr.year>2015``
+    and the spelled out ``attr.year=gte:2015``.
+    """
+    filters = []
+    for name, value in params:
+        if not name.startswith(FILTER_PREFIX):
+            continue
+        match = _EXPRESSION.fullmatch(name[len(FILTER_PREFIX):])
+        if not match:
+            raise HTTPException(status_code=400, detail=f"Invalid attribute filter '{name}'")
+        key = match.group("key")
+        if key not in attributes:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot filter on attribute '{key}', use one of: {', '.join(sorted(attributes))}"
+            )
+
+        if match.group("op"):
+            strict = bool(match.group("rest"))
+            op = ("gt" if match.group("op") == ">" else "lt") + ("" if strict else "e")
+            value = match.group("rest") if strict else value
+        else:
+            prefix, separator, rest = value.partition(":")
+            op, value = (prefix, rest) if separator and prefix in VALUE_OPERATORS else ("eq", value)
+
+        raw = tuple(part.strip() for part in value.split(",") if part.strip()) if op == "in" else (value,) * bool(value)
+        if not raw:
+            raise HTTPException(status_code=400, detail=f"Attribute filter '{name}' has no value")
+
+        kind = attributes[key]
+        if op in RANGE_OPERATORS and kind != "number":
+            raise HTTPException(status_code=400, detail=f"Attribute '{key}' only supports equality filters")
+        values = tuple(_number(key, part) for part in raw) if kind == "number" else raw
+        filters.append(AttributeFilter(key=key, kind=kind, op=op, values=values, raw=raw))
+    return filters
+
+
+def _candidates(attribute_filter: AttributeFilter) -> List[Any]:
+    # Numbers may be stored as JSON numbers or, e.g. after a CSV import, as strings
+    if attribute_filter.kind == "number":
+        return list(attribute_filter.values) + list(attribute_filter.raw)
+    return list(attribute_filter.values)
+
+
+def _postgres_criterion(column, attribute_filter: AttributeFilter):
+    document = type_coerce(column, JSONB)
+    key = attribute_filter.key
+    if attribute_filter.op in RANGE_OPERATORS:
+        # jsonpath predicates swallow type errors, so non-numeric values just don't match
+        symbol = RANGE_OPERATORS[attribute_filter.op][0]
+        return document.path_match(f"$.{json.dumps(key)}.double() {symbol} {attribute_filter.values[0]!r}")
+    # Containment is answered by the jsonb_path_ops GIN index; list-valued
+    # attributes match when they contain the value
+    return or_(*(
+        document.contains(fragment)
+        for value in _candidates(attribute_filter)
+        for fragment in ({key: value}, {key: [value]})
+    ))
+
+
+def _portable_criterion(column, attribute_filter: AttributeFilter):
+    path = f"$.{json.dumps(attribute_filter.key)}"
+    if attribute_filter.op in RANGE_OPERATORS:
+        compare = RANGE_OPERATORS[attribute_filter.op][1]
+        return and_(
+            func.json_type(column, path).in_(("integer", "real", "text")),
+            compare(cast(func.json_extract(column, path), Float), attribute_filter.values[0]),
+        )
+    # json_each yields the value itself for scalars and each element for lists
+    elements = func.json_each(column, path).table_valued("value")
+    return exists(select(1).select_from(elements).where(elements.c.value.in_(_candidates(attribute_filter))))
+
+
+def attribute_criteria(column, filters: List[AttributeFilter], dialect: str) -> list:
+    """
+    Compile parsed filters on the JSON ``column`` into WHERE criteria: JSONB
+    containment and jsonpath operators on Postgres, ``json_each`` /
+    ``json_extract`` elsewhere (SQLite).
+    """
+    build = _postgres_criterion if dialect == "postgresql" else _portable_criterion
+    return [build(column, attribute_filter) for attribute_filter in filters]
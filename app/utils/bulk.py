@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.bulk import BulkResult, BulkRowError
+
+DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def dialect_insert(db: AsyncSession, table):
+    """INSERT construct supporting ON CONFLICT for the session's database"""
+    dialect = db.get_bind().dialect.name
+    if dialect not in DIALECT_INSERTS:
+        raise ValueError(f"Bulk upserts are not supported on '{dialect}'")
+    return DIALECT_INSERTS[dialect](table)
+
+
+def column_values(model, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the keys of ``data`` that are columns of ``model``'s table"""
+    columns = model.__table__.columns
+    return {key: value for key, value in data.items() if key in columns}
+
+
+def chunked(values: List[Any], size: int):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class BulkReport:
+    """Accumulates the outcome of a bulk request, keeping at most ``max_errors`` errors"""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.processed = 0
+        self.succeeded = 0
+        self.ids: List[int] = []
+        self.errors: List[BulkRowError] = []
+        self.error_count = 0
+        self.timestamp = datetime.utcnow()
+
+    def add_error(self, index: int, detail: Any, id: Optional[int] = None) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(BulkRowError(index=index, id=id, detail=detail))
+
+    def result(self) -> BulkResult:
+        return BulkResult(
+            processed=self.processed,
+            succeeded=self.succeeded,
+            ids=self.ids,
+            errors=self.errors,
+            errors_truncated=self.error_count > len(self.errors),
+        )
@@ -0,0 +1,199 @@
+"""
+Maintenance of the per-category ``menu_category_stats`` rows.
+
+Writers lock the stats rows they change (``SELECT ... FOR UPDATE``) after
+writing their items, so concurrent writers to one category take turns and
+each one sees the others' committed items. Single-item writes apply deltas
+to the row; bulk writes and the rebuild command recompute it.
+"""
+from dataclasses import dataclass
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.menu import MenuCategory, MenuCategoryStats, MenuItem
+from app.utils.bulk import dialect_insert
+
+
+EMPTY_STATS = {
+    "items_total": 0,
+    "items_active": 0,
+    "items_by_type": {},
+    "min_price_usd": None,
+    "max_price_usd": None,
+    "min_price_khr": None,
+    "max_price_khr": None,
+}
+
+
+@dataclass(frozen=True)
+class ItemStats:
+    """What one menu item contributes to its category's stats row"""
+    category_id: Optional[int]
+    is_active: bool
+    item_type: str
+    price_usd: Optional[float]
+    price_khr: Optional[float]
+
+    @classmethod
+    def of(cls, item: MenuItem) -> "ItemStats":
+        item_type = getattr(item.item_type, "value", item.item_type) or "unknown"
+        return cls(item.category_id, bool(item.is_active), item_type, item.price_usd, item.price_khr)
+
+
+async def _lock_stats(db: AsyncSession, ids: Set[int]) -> Dict[int, MenuCategoryStats]:
+    """The existing stats rows of ``ids``, locked until the transaction ends (SQLite locks the database)"""
+    query = (
+        select(MenuCategoryStats)
+        .where(MenuCategoryStats.category_id.in_(ids))
+        .order_by(MenuCategoryStats.category_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return {row.category_id: row for row in (await db.scalars(query)).all()}
+
+
+def _holds_bound(row: MenuCategoryStats, item: ItemStats) -> bool:
+    """Whether removing ``item`` may change the row's min or max price"""
+    return any(
+        price is not None and (low is None or high is None or price <= low or price >= high)
+        for price, low, high in (
+            (item.price_usd, row.min_price_usd, row.max_price_usd),
+            (item.price_khr, row.min_price_khr, row.max_price_khr),
+        )
+    )
+
+
+def _widen(low: Optional[float], high: Optional[float], price: Optional[float]):
+    if price is None:
+        return low, high
+    return (price if low is None else min(low, price)), (price if high is None else max(high, price))
+
+
+async def adjust_category_stats(
+        db: AsyncSession,
+        removed: Iterable[ItemStats] = (),
+        added: Iterable[ItemStats] = ()
+) -> None:
+    """
+    Apply single-item writes to the stats rows as deltas: ``removed`` are
+    items as they were before the write, ``added`` as they are after it. A
+    category is recomputed instead when its row is missing or a removed item
+    held its min or max price.
+    """
+    removed = [item for item in removed if item.category_id is not None]
+    added = [item for item in added if item.category_id is not None]
+    # An update that left the counted fields alone changes nothing
+    for item in list(removed):
+        if item in added:
+            removed.remove(item)
+            added.remove(item)
+    ids = {item.category_id for item in chain(removed, added)}
+    if not ids:
+        return
+    await db.flush()
+
+    rows = await _lock_stats(db, ids)
+    recompute = (ids - rows.keys()) | {
+        item.category_id for item in removed
+        if item.category_id in rows and _holds_bound(rows[item.category_id], item)
+    }
+    for category_id, row in rows.items():
+        if category_id in recompute:
+            continue
+        by_type = dict(row.items_by_type or {})
+        changes: List = [(item, -1) for item in removed if item.category_id == category_id]
+        changes += [(item, 1) for item in added if item.category_id == category_id]
+        for item, sign in changes:
+            row.items_total += sign
+            row.items_active += sign * item.is_active
+            count = by_type.get(item.item_type, 0) + sign
+            if count:
+                by_type[item.item_type] = count
+            else:
+                by_type.pop(item.item_type, None)
+            if sign > 0:
+                row.min_price_usd, row.max_price_usd = _widen(row.min_price_usd, row.max_price_usd, item.price_usd)
+                row.min_price_khr, row.max_price_khr = _widen(row.min_price_khr, row.max_price_khr, item.price_khr)
+        # Reassigned, since in-place changes to a JSON column are not tracked
+        row.items_by_type = by_type
+    if recompute:
+        await refresh_category_stats(db, recompute)
+
+
+async def refresh_category_stats(db: AsyncSession, category_ids: Iterable[Optional[int]]) -> None:
+    """
+    Recompute the stats rows of the given categories inside the caller's
+    transaction, holding their row locks. Only the touched categories are
+    aggregated, using two grouped queries, and the results are upserted.
+    """
+    ids = {category_id for category_id in category_ids if category_id is not None}
+    if not ids:
+        return
+    await db.flush()
+
+    # Categories may have been deleted in this transaction
+    ids = set((await db.scalars(select(MenuCategory.id).where(MenuCategory.id.in_(ids)))).all())
+    if not ids:
+        return
+
+    # Create missing rows so that every category's row can be locked
+    missing = ids - (await _lock_stats(db, ids)).keys()
+    if missing:
+        stmt = dialect_insert(db, MenuCategoryStats.__table__).on_conflict_do_nothing(index_elements=["category_id"])
+        await db.execute(stmt, [{"category_id": category_id, **EMPTY_STATS} for category_id in missing])
+        await _lock_stats(db, missing)
+
+    totals = await db.execute(
+        select(
+            MenuItem.category_id,
+            func.count(),
+            func.sum(case((MenuItem.is_active == True, 1), else_=0)),
+            func.min(MenuItem.price_usd),
+            func.max(MenuItem.price_usd),
+            func.min(MenuItem.price_khr),
+            func.max(MenuItem.price_khr),
+        )
+        .where(MenuItem.category_id.in_(ids))
+        .group_by(MenuItem.category_id)
+    )
+    rows = {
+        category_id: {
+            "category_id": category_id,
+            "items_total": total,
+            "items_active": active or 0,
+            "items_by_type": {},
+            "min_price_usd": min_usd,
+            "max_price_usd": max_usd,
+            "min_price_khr": min_khr,
+            "max_price_khr": max_khr,
+        }
+        for category_id, total, active, min_usd, max_usd, min_khr, max_khr in totals.all()
+    }
+
+    by_type = await db.execute(
+        select(MenuItem.category_id, MenuItem.item_type, func.count())
+        .where(MenuItem.category_id.in_(ids))
+        .group_by(MenuItem.category_id, MenuItem.item_type)
+    )
+    for category_id, item_type, count in by_type.all():
+        key = item_type.value if item_type is not None else "unknown"
+        rows[category_id]["items_by_type"][key] = count
+
+    for category_id in ids - rows.keys():
+        rows[category_id] = {"category_id": category_id, **EMPTY_STATS}
+
+    stmt = dialect_insert(db, MenuCategoryStats.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["category_id"],
+        set_={
+            column: stmt.excluded[column]
+            for column in (
+                "items_total", "items_active", "items_by_type", "min_price_usd",
+                "max_price_usd", "min_price_khr", "max_price_khr", "updated_at",
+            )
+        }
+    )
+    await db.execute(stmt, list(rows.values()))
@@ -0,0 +1,115 @@
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.menu import MenuCategory, MenuCategoryStats
+from app.utils.fieldsets import trim_columns
+from app.utils.i18n import localized_columns
+
+STATS_COLUMNS = [
+    column for column in MenuCategoryStats.__table__.columns
+    if column.key not in ("category_id", "updated_at")
+]
+
+
+def category_query(
+        lang: Optional[str] = None,
+        include_translations: bool = True,
+        fields: Optional[Set[str]] = None
+) -> Select:
+    """
+    Category rows with localized name/description and the maintained stats
+    columns (prefixed ``stats_``), ready for ``category_node``. A sparse
+    ``fields`` set trims the column list, and skips the stats join unless
+    ``stats`` or ``items_count`` is requested.
+    """
+    columns = trim_columns(
+        localized_columns(MenuCategory, lang, include_translations),
+        fields,
+        keep=("id", "parent_id", "display_order")
+    )
+    if fields is not None and not fields & {"stats", "items_count"}:
+        return select(*columns)
+    return (
+        select(*columns, *[column.label(f"stats_{column.key}") for column in STATS_COLUMNS])
+        .outerjoin(MenuCategoryStats, MenuCategoryStats.category_id == MenuCategory.id)
+    )
+
+
+def category_node(row) -> Dict[str, Any]:
+    node = {key: value for key, value in row.items() if not key.startswith("stats_")}
+    if "stats_items_total" in row:
+        stats = {column.key: row[f"stats_{column.key}"] for column in STATS_COLUMNS}
+        node["stats"] = stats if stats["items_total"] is not None else None
+        node["items_count"] = stats["items_total"] or 0
+    node["subcategories"] = []
+    return node
+
+
+async def attach_subcategories(
+        db: AsyncSession,
+        nodes: List[Dict[str, Any]],
+        max_depth: int,
+        lang: Optional[str] = None,
+        include_translations: bool = True,
+        fields: Optional[Set[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fill in ``subcategories`` below ``nodes`` with one query per level, down
+    to ``max_depth`` levels.
+    """
+    level = nodes
+    for _ in range(max_depth):
+        parents: Dict[int, List[Dict[str, Any]]] = {}
+        for node in level:
+            parents.setdefault(node["id"], []).append(node)
+        if not parents:
+            break
+        query = (
+            category_query(lang, include_translations, fields)
+            .where(MenuCategory.parent_id.in_(parents))
+            .order_by(MenuCategory.display_order, MenuCategory.id)
+        )
+        level = []
+        for row in (await db.execute(query)).mappings():
+            for parent in parents[row["parent_id"]]:
+                child = category_node(row)
+                parent["subcategories"].append(child)
+                level.append(child)
+    return nodes
+
+
+async def build_category_tree(
+        db: AsyncSession,
+        merchant_id: int,
+        include_inactive: bool = False,
+        max_depth: Optional[int] = None,
+        lang: Optional[str] = None,
+        include_translations: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Build a merchant's category hierarchy from a single flat fetch, joined to
+    the maintained per-category stats, and assemble it in memory.
+
+    Categories whose parent is hidden (inactive or missing) are dropped along
+    with their subtree. ``max_depth`` of 1 returns only the top level.
+    """
+    query = category_query(lang, include_translations).where(MenuCategory.merchant_id == merchant_id)
+    if not include_inactive:
+        query = query.where(MenuCategory.is_active == True)
+    query = query.order_by(MenuCategory.display_order, MenuCategory.id)
+
+    children: Dict[Optional[int], List[Dict[str, Any]]] = {}
+    for row in (await db.execute(query)).mappings():
+        node = category_node(row)
+        children.setdefault(node["parent_id"], []).append(node)
+
+    def attach(node: Dict[str, Any], depth: int, path: set) -> Dict[str, Any]:
+        if max_depth is None or depth < max_depth:
+            for child in children.get(node["id"], []):
+                if child["id"] not in path:
+                    node["subcategories"].append(attach(child, depth + 1, path | {child["id"]}))
+        return node
+
+    return [attach(root, 1, {root["id"]}) for root in children.get(None, [])]
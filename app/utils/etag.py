@@ -0,0 +1,60 @@
+import hashlib
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return 'W/"' + digest + '"'
+
+
+async def query_etag(
+        db: AsyncSession,
+        model,
+        criteria: Iterable[Any],
+        request: Request
+) -> str:
+    """
+    Weak ETag for the rows of ``model`` matching ``criteria``, derived from a
+    single ``max(updated_at), count(*)`` aggregate plus the request's query
+    parameters and Accept-Language. Any insert, update or delete among those
+    rows changes it.
+    """
+    aggregate = select(func.max(model.updated_at), func.count()).select_from(model)
+    for criterion in criteria:
+        aggregate = aggregate.where(criterion)
+    last_modified, count = (await db.execute(aggregate)).one()
+    params = sorted(request.query_params.multi_items())
+    language = request.headers.get("accept-language")
+    return weak_etag(model.__tablename__, last_modified, count, params, language)
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against an ETag using the weak
+    comparison required for GET/HEAD.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
@@ -0,0 +1,101 @@
+import csv
+import enum
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi import HTTPException
+from sqlalchemy import Select
+from starlette.responses import StreamingResponse
+
+from app.db.session import AsyncSessionLocal
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=_json_default)
+    return _json_default(value) if isinstance(value, (datetime, date, enum.Enum)) else value
+
+
+async def stream_rows(statement: Select, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Yield batches of row mappings from a server-side cursor. The export runs
+    on its own session because the response outlives request dependencies.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(statement.execution_options(yield_per=batch_size))
+        async for partition in result.mappings().partitions():
+            yield [dict(row) for row in partition]
+
+
+async def encode_ndjson(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield "".join(
+            json.dumps(row, ensure_ascii=False, default=_json_default) + "\n" for row in batch
+        ).encode()
+
+
+async def encode_csv(batches: AsyncIterator[List[Dict[str, Any]]], columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    async for batch in batches:
+        writer.writerows({key: _csv_value(value) for key, value in row.items()} for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_response(
+        statement: Select,
+        export_format: str,
+        filename: str,
+        compress: bool,
+        batch_size: int
+) -> StreamingResponse:
+    """Stream ``statement`` as NDJSON or CSV, optionally gzip-encoded"""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported export format, use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    batches = stream_rows(statement, batch_size)
+    if export_format == "csv":
+        chunks = encode_csv(batches, [column.key for column in statement.selected_columns])
+    else:
+        chunks = encode_ndjson(batches)
+
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    if compress:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[export_format], headers=headers)
@@ -0,0 +1,110 @@
+from typing import List, Optional, Sequence
+
+from sqlalchemy import String, case, cast, func, literal_column, select, true, type_coerce, union_all
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.facets import FacetCounts, FacetValue
+
+# Attribute facets are tagged with this prefix so keys can't collide with the fixed facets
+ATTRIBUTE_FACET_PREFIX = "attr."
+
+
+def price_bucket_labels(buckets: Sequence[float]) -> List[str]:
+    bounds = [0, *buckets]
+    return [f"{low:g}-{high:g}" for low, high in zip(bounds, bounds[1:])] + [f"{bounds[-1]:g}+"]
+
+
+def _price_bucket(column, buckets: Sequence[float]):
+    labels = price_bucket_labels(buckets)
+    return case(*((column < bound, label) for bound, label in zip(buckets, labels)), else_=labels[-1])
+
+
+def _grouped(model, facet: str, value, criteria):
+    return (
+        select(literal_column(f"'{facet}'").label("facet"), cast(value, String).label("value"), func.count().label("count"))
+        .select_from(model)
+        .where(*criteria)
+        .group_by(value)
+    )
+
+
+def _attribute_values(model, column, criteria, keys: Optional[Sequence[str]], dialect: str):
+    """
+    Count (key, value) pairs of a JSON attributes column. List values are
+    counted per element; nested objects and nulls are skipped.
+    """
+    if dialect == "postgresql":
+        pairs = func.jsonb_each(type_coerce(column, JSONB)).table_valued("key", "value", name="kv")
+        value_type = func.jsonb_typeof(pairs.c.value)
+        as_array = case((value_type == "array", pairs.c.value), else_=func.jsonb_build_array(pairs.c.value))
+        elements = func.jsonb_array_elements_text(as_array).table_valued("value", name="element")
+    else:
+        pairs = func.json_each(column).table_valued("key", "value", "type", name="kv")
+        value_type = pairs.c.type
+        as_array = case((value_type == "array", pairs.c.value), else_=func.json_array(pairs.c.value))
+        elements = func.json_each(as_array).table_valued("value", name="element")
+
+    query = (
+        select((literal_column(f"'{ATTRIBUTE_FACET_PREFIX}'", String) + pairs.c.key).label("facet"), cast(elements.c.value, String).label("value"), func.count().label("count"))
+        .select_from(model)
+        .join(pairs, true())
+        .join(elements, true())
+        .where(*criteria, value_type.not_in(("object", "null")))
+        .group_by(pairs.c.key, cast(elements.c.value, String))
+    )
+    if keys is not None:
+        query = query.where(pairs.c.key.in_(keys))
+    return query
+
+
+async def facet_counts(
+        db: AsyncSession,
+        model,
+        criteria: list,
+        type_column,
+        category_column,
+        price_column,
+        price_buckets: Sequence[float],
+        attributes_column,
+        attribute_keys: Optional[Sequence[str]] = None
+) -> FacetCounts:
+    """
+    Count the rows matching ``criteria`` per type, category, price bucket
+    and attribute value. Every facet is computed in one UNION ALL of grouped
+    aggregates, so the table is read in a single round trip.
+
+    ``attribute_keys`` limits the attribute facets; None reports every key.
+    """
+    dialect = db.get_bind().dialect.name
+    statement = union_all(
+        select(literal_column("'total'").label("facet"), literal_column("''").label("value"), func.count().label("count"))
+        .select_from(model)
+        .where(*criteria),
+        _grouped(model, "type", type_column, criteria),
+        _grouped(model, "category", category_column, criteria),
+        _grouped(model, "price", _price_bucket(price_column, price_buckets), [*criteria, price_column.is_not(None)]),
+        _attribute_values(model, attributes_column, criteria, attribute_keys, dialect),
+    )
+
+    facets = FacetCounts(total=0)
+    enum_class = getattr(type_column.type, "enum_class", None)
+    for facet, value, count in (await db.execute(statement)).all():
+        if facet == "total":
+            facets.total = count
+        elif value is None:
+            continue
+        elif facet == "type":
+            label = enum_class[value].value if enum_class is not None and value in enum_class.__members__ else value
+            facets.type.append(FacetValue(value=label, count=count))
+        elif facet.startswith(ATTRIBUTE_FACET_PREFIX):
+            key = facet[len(ATTRIBUTE_FACET_PREFIX):]
+            facets.attributes.setdefault(key, []).append(FacetValue(value=value, count=count))
+        else:
+            getattr(facets, facet).append(FacetValue(value=value, count=count))
+
+    order = {label: position for position, label in enumerate(price_bucket_labels(price_buckets))}
+    facets.price.sort(key=lambda bucket: order[bucket.value])
+    for values in (facets.type, facets.category, *facets.attributes.values()):
+        values.sort(key=lambda facet_value: (-facet_value.count, facet_value.value))
+    return facets
@@ -0,0 +1,63 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from app.utils.serialization import render_json
+
+# Always returned, whatever the fieldset
+ALWAYS_INCLUDED = ("id",)
+
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[Set[str]]:
+    """
+    Parse a ``fields=name,price_usd`` sparse fieldset against the fields of
+    ``schema``. None (parameter absent) means every field.
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(schema.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}; available: {', '.join(schema.model_fields)}"
+        )
+    return requested | {name for name in ALWAYS_INCLUDED if name in schema.model_fields}
+
+
+def trim_columns(columns: Iterable, fields: Optional[Set[str]], keep: Iterable[str] = ()) -> List:
+    """
+    Drop selected columns that are not in ``fields``; ``keep`` names columns
+    needed by the query itself, such as sort keys.
+    """
+    columns = list(columns)
+    if fields is None:
+        return columns
+    wanted = fields | set(keep)
+    return [column for column in columns if column.key in wanted]
+
+
+def project(row: Dict[str, Any], fields: Set[str], schema: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Reduce a row to ``fields`` in schema order. Fields the row lacks take the
+    schema default; nested lists of rows (subcategories) are reduced too.
+    """
+    node = {}
+    for name, info in schema.model_fields.items():
+        if name not in fields:
+            continue
+        if name in row:
+            value = row[name]
+            if isinstance(value, list) and value and isinstance(value[0], dict):
+                value = [project(child, fields, schema) for child in value]
+        else:
+            value = info.get_default(call_default_factory=True)
+        node[name] = value
+    return node
+
+
+def sparse_response(body: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Already-projected rows (or a page of them) as JSON, bypassing response_model"""
+    return Response(content=render_json(body), media_type="application/json", headers=headers)
@@ -0,0 +1,90 @@
+from typing import List, Optional, Sequence
+
+from sqlalchemy import func, null
+
+from app.core.config import settings
+
+DEFAULT_LANGUAGE = "en"
+
+# Fields localized from ``translations``: the name under "<lang>", the
+# description under "<lang>.description"
+LOCALIZED_FIELDS = ("name", "description")
+
+
+def negotiate_language(lang: Optional[str], accept_language: Optional[str]) -> Optional[str]:
+    """
+    Language to localize into, or None for the base fields. An explicit
+    ``lang`` wins; otherwise the Accept-Language entry with the highest
+    quality whose tag or primary subtag is in SUPPORTED_LANGUAGES is used.
+    """
+    if lang:
+        return None if lang == DEFAULT_LANGUAGE else lang
+    if not accept_language:
+        return None
+
+    candidates = []
+    for position, entry in enumerate(accept_language.split(",")):
+        tag, _, params = entry.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        tag = tag.strip().lower()
+        if tag and quality > 0:
+            candidates.append((-quality, position, tag))
+
+    supported = {code.lower() for code in settings.SUPPORTED_LANGUAGES}
+    for _, _, tag in sorted(candidates):
+        if tag == "*":
+            return None
+        for code in (tag, tag.split("-")[0]):
+            if code in supported:
+                return None if code == DEFAULT_LANGUAGE else code
+    return None
+
+
+def translation_key(lang: str, field: str) -> str:
+    return lang if field == "name" else f"{lang}.{field}"
+
+
+def localized_column(translations, base, lang: Optional[str], field: str):
+    """
+    ``coalesce(translations ->> key, base)`` labelled ``field``, so only the
+    requested language leaves the database. ``base`` may be None for fields
+    that exist only as translations.
+    """
+    base = base if base is not None else null()
+    if not lang:
+        return base.label(field)
+    return func.coalesce(translations[translation_key(lang, field)].as_string(), base).label(field)
+
+
+def localized_columns(
+        model,
+        lang: Optional[str],
+        include_translations: bool = True,
+        fields: Sequence[str] = LOCALIZED_FIELDS
+) -> List:
+    """
+    The columns of ``model`` with ``fields`` replaced by their localized
+    expressions. Without ``include_translations`` the translations map is
+    not selected at all.
+    """
+    table = model.__table__
+    translations = table.c.translations
+    columns = []
+    for column in table.columns:
+        if column.key in fields:
+            columns.append(localized_column(translations, column, lang, column.key))
+        elif column.key != "translations" or include_translations:
+            columns.append(column)
+    if lang:
+        columns.extend(
+            localized_column(translations, None, lang, field) for field in fields if field not in table.columns
+        )
+    return columns
+
@@ -0,0 +1,66 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException
+
+# Upper bound on ``limit`` for the paginated list endpoints
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(keys: Sequence[Any], seen: int) -> str:
+    """
+    Encode the sort keys of the last row on a page, plus the number of rows
+    already returned, into an opaque URL-safe cursor.
+    """
+    payload = json.dumps({"k": list(keys), "n": seen}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], key_count: int) -> Optional[Dict[str, Any]]:
+    """
+    Decode a cursor produced by encode_cursor. An empty cursor means
+    "first page" and returns None.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        keys = data["k"]
+        seen = int(data["n"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(keys, list) or len(keys) != key_count or seen < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"keys": keys, "seen": seen}
+
+
+def build_page(
+        rows: List[Any],
+        limit: int,
+        seen: int,
+        sort_keys,
+        total: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Build a page envelope from rows fetched with ``limit + 1``.
+
+    When no exact total is supplied, ``total`` is the number of rows known
+    to exist so far: exact on the last page, a lower bound before that.
+    """
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(sort_keys(items[-1]), seen + len(items))
+    if total is None:
+        total = seen + len(items) + (1 if has_more else 0)
+    return {
+        "items": items,
+        "total": total,
+        "page": seen // limit + 1 if limit else 1,
+        "size": limit,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+    }
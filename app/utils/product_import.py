@@ -0,0 +1,200 @@
+import csv
+import json
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+
+from app.models.products import Product, ProductType
+from app.schemas.products import ProductCreate
+from app.utils.validation import missing_product_attributes
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# CSV columns mapped onto Product fields; any other column becomes an attribute
+PRODUCT_COLUMNS = ("name", "description", "price", "stock", "type", "category_id")
+
+Rejection = Callable[[int, Any, Any], Awaitable[None]]
+Checkpoint = Callable[[int], Awaitable[None]]
+
+
+@dataclass
+class ImportStats:
+    processed: int = 0
+    imported: int = 0
+    rejected: int = 0
+    next_record: int = 0
+
+
+async def iter_ndjson_records(lines: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    index = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield index, json.loads(line)
+        except ValueError as exc:
+            yield index, exc
+        index += 1
+
+
+async def iter_csv_records(lines: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Parse CSV incrementally. A physical line with an unbalanced quote is
+    joined with the following ones, so quoted fields may contain newlines.
+    """
+    header: Optional[List[str]] = None
+    pending = ""
+    index = 0
+    async for line in lines:
+        pending += line.decode("utf-8-sig" if header is None and not pending else "utf-8")
+        if pending.count('"') % 2:
+            pending += "\n"
+            continue
+        text, pending = pending.rstrip("\r"), ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield index, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+        else:
+            yield index, dict(zip(header, values))
+        index += 1
+
+
+def iter_records(lines: AsyncIterator[bytes], import_format: str) -> AsyncIterator[Tuple[int, Any]]:
+    if import_format == "csv":
+        return iter_csv_records(lines)
+    if import_format == "ndjson":
+        return iter_ndjson_records(lines)
+    raise ValueError(f"Unsupported import format '{import_format}', use one of: {', '.join(IMPORT_FORMATS)}")
+
+
+def normalize_csv_record(record: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Map a flat CSV row onto ProductCreate: an ``attributes`` column holds a
+    JSON object, and every other non-product column becomes an attribute.
+    """
+    product: Dict[str, Any] = {}
+    attributes: Dict[str, Any] = {}
+    for key, value in record.items():
+        if key in PRODUCT_COLUMNS:
+            if value != "" or key == "name":
+                product[key] = value
+        elif key == "attributes":
+            if value:
+                parsed = json.loads(value)
+                if not isinstance(parsed, dict):
+                    raise ValueError("expected a JSON object")
+                attributes.update(parsed)
+        elif value != "":
+            attributes[key] = value
+    product["attributes"] = attributes
+    return product
+
+
+def validate_record(record: Any, import_format: str) -> Dict[str, Any]:
+    """
+    Validate one record with ProductCreate and the per-type attribute rules,
+    returning the column values to insert. Raises ValueError with a
+    JSON-serializable reason on rejection.
+    """
+    if isinstance(record, Exception):
+        raise ValueError(f"Unreadable record: {record}")
+    if import_format == "csv":
+        try:
+            record = normalize_csv_record(record)
+        except ValueError as exc:
+            raise ValueError(f"Invalid attributes JSON: {exc}")
+    try:
+        product = ProductCreate.model_validate(record)
+    except ValidationError as exc:
+        raise ValueError(exc.errors(include_url=False, include_context=False))
+    missing = missing_product_attributes(product.type, product.attributes)
+    if missing:
+        raise ValueError(f"Missing required attributes for {product.type.value}: {', '.join(sorted(missing))}")
+    row = product.model_dump()
+    row["type"] = ProductType(product.type.value)
+    return row
+
+
+async def _write_chunk(session_factory, chunk: List[Tuple[int, Any, Dict[str, Any]]], on_reject: Rejection) -> int:
+    """
+    Insert a chunk with one multi-row INSERT. If the database rejects it, retry
+    row by row inside savepoints so only the offending rows are rejected.
+    """
+    table = Product.__table__
+    async with session_factory() as db:
+        try:
+            await db.execute(insert(table), [row for _, _, row in chunk])
+            await db.commit()
+            return len(chunk)
+        except DBAPIError:
+            await db.rollback()
+
+        written = 0
+        for index, record, row in chunk:
+            try:
+                async with db.begin_nested():
+                    await db.execute(insert(table), [row])
+                written += 1
+            except DBAPIError as exc:
+                await on_reject(index, record, str(exc.orig).strip())
+        await db.commit()
+        return written
+
+
+async def import_products(
+        session_factory,
+        records: AsyncIterator[Tuple[int, Any]],
+        import_format: str,
+        chunk_size: int,
+        on_reject: Rejection,
+        on_checkpoint: Optional[Checkpoint] = None,
+        start_at: int = 0
+) -> ImportStats:
+    """
+    Validate and insert product records in chunks of ``chunk_size``.
+
+    Each chunk commits on its own; after it commits ``on_checkpoint`` receives
+    the index of the next unprocessed record, which can be passed back as
+    ``start_at`` to resume after a failure.
+    """
+    stats = ImportStats(next_record=start_at)
+    chunk: List[Tuple[int, Any, Dict[str, Any]]] = []
+
+    async def flush(next_record: int) -> None:
+        if chunk:
+            written = await _write_chunk(session_factory, chunk, on_reject)
+            stats.imported += written
+            stats.rejected += len(chunk) - written
+            chunk.clear()
+        stats.next_record = next_record
+        if on_checkpoint is not None:
+            await on_checkpoint(next_record)
+
+    pending_since_checkpoint = 0
+    next_record = start_at
+    async for index, record in records:
+        if index < start_at:
+            continue
+        stats.processed += 1
+        pending_since_checkpoint += 1
+        next_record = index + 1
+        try:
+            chunk.append((index, record, validate_record(record, import_format)))
+        except ValueError as exc:
+            stats.rejected += 1
+            await on_reject(index, record, exc.args[0])
+        if pending_since_checkpoint >= chunk_size:
+            await flush(next_record)
+            pending_since_checkpoint = 0
+
+    if pending_since_checkpoint:
+        await flush(next_record)
+    return stats
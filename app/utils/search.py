@@ -0,0 +1,103 @@
+from typing import List, Optional
+
+from sqlalchemy import Integer, Text, cast, func, literal, literal_column, null, or_, select, union_all
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.search import SEARCH_CONFIG, search_vector
+from app.models.menu import MENU_CATEGORY_SEARCH_DOCUMENT, MENU_ITEM_SEARCH_DOCUMENT, MenuCategory, MenuItem
+from app.models.products import PRODUCT_SEARCH_DOCUMENT, Product
+from app.schemas.search import SearchHit
+from app.utils.search_index import search_index, tokenize
+
+
+def prefix_tsquery(query: str) -> str:
+    """``coffee ice`` -> ``'coffee':* & 'ice':*``, with every term quoted"""
+    return " & ".join("'" + term.replace("\\", "\\\\").replace("'", "''") + "':*" for term in tokenize(query))
+
+
+def localized_name(name: str, translations, lang: Optional[str]) -> str:
+    if lang and lang != "en" and isinstance(translations, dict) and isinstance(translations.get(lang), str):
+        return translations[lang]
+    return name
+
+
+def _postgres_branch(kind: str, model, document, query: str, tsquery: str, criteria: list):
+    vector = search_vector(document)
+    ts_query = func.to_tsquery(SEARCH_CONFIG, tsquery)
+    text = literal(query, Text)
+    translations = model.translations if hasattr(model, "translations") else cast(null(), JSONB)
+    merchant = model.merchant_id if hasattr(model, "merchant_id") else cast(null(), Integer)
+    score = func.ts_rank_cd(vector, ts_query) + func.word_similarity(text, document)
+    return (
+        select(
+            literal_column(f"'{kind}'").label("kind"),
+            model.id,
+            model.name,
+            merchant.label("merchant_id"),
+            translations.label("translations"),
+            score.label("score"),
+        )
+        # @@ is served by the tsvector index, <% (word similarity) by the trigram index
+        .where(or_(vector.op("@@")(ts_query), text.op("<%")(document)), *criteria)
+    )
+
+
+async def _search_postgres(db: AsyncSession, query: str, merchant_id: Optional[int], limit: int):
+    tsquery = prefix_tsquery(query)
+    if not tsquery:
+        return []
+    item_criteria = [MenuItem.is_active == True]
+    category_criteria = [MenuCategory.is_active == True]
+    if merchant_id is not None:
+        item_criteria.append(MenuItem.merchant_id == merchant_id)
+        category_criteria.append(MenuCategory.merchant_id == merchant_id)
+
+    branches = [
+        _postgres_branch("menu_item", MenuItem, MENU_ITEM_SEARCH_DOCUMENT, query, tsquery, item_criteria),
+        _postgres_branch("category", MenuCategory, MENU_CATEGORY_SEARCH_DOCUMENT, query, tsquery, category_criteria),
+    ]
+    # Products are not merchant-scoped
+    if merchant_id is None:
+        branches.append(_postgres_branch("product", Product, PRODUCT_SEARCH_DOCUMENT, query, tsquery, []))
+
+    hits = union_all(*branches).subquery()
+    rows = await db.execute(select(hits).order_by(hits.c.score.desc(), hits.c.kind, hits.c.id).limit(limit))
+    return [
+        (row.score, row.kind, row.id, row.name, row.merchant_id, row.translations)
+        for row in rows
+    ]
+
+
+async def search_catalog(
+        db: AsyncSession,
+        query: str,
+        merchant_id: Optional[int],
+        lang: Optional[str],
+        limit: int
+) -> List[SearchHit]:
+    """
+    Ranked search over active menu items and categories and, when no
+    merchant is given, products. Postgres matches prefix terms against the
+    tsvector index and falls back to trigram word similarity for typos;
+    other databases use the in-process inverted index.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        rows = await _search_postgres(db, query, merchant_id, limit)
+    else:
+        index = await search_index.get(db)
+        rows = [
+            (score, document.kind, document.id, document.name, document.merchant_id, document.translations)
+            for score, document in index.search(query, limit, merchant_id)
+        ]
+
+    return [
+        SearchHit(
+            kind=kind,
+            id=id,
+            name=localized_name(name or "", translations, lang),
+            merchant_id=merchant_id,
+            score=round(score, 4),
+        )
+        for score, kind, id, name, merchant_id, translations in rows
+    ]
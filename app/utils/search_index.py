@@ -0,0 +1,225 @@
+import asyncio
+import bisect
+import math
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.menu import MenuCategory, MenuItem
+from app.models.products import Product
+
+SEARCHABLE_TABLES = {"menu_items", "menu_categories", "products"}
+
+# Relative weight of a match in each field
+FIELD_WEIGHTS = {"name": 1.0, "translation": 0.8, "description": 0.4}
+
+# Weight of a term matching a token exactly, as a prefix, as a substring or within the typo distance
+EXACT, PREFIX, SUBSTRING, FUZZY = 1.0, 0.7, 0.5, 0.4
+
+# Whitespace, ASCII punctuation and Khmer punctuation (khan, bariyoosan, ...)
+_SEPARATORS = re.compile(r"[\s!-/:-@\[-`{-~។-៚]+")
+
+DocumentKey = Tuple[str, int]
+
+
+@dataclass
+class SearchDocument:
+    kind: str
+    id: int
+    name: str
+    merchant_id: Optional[int] = None
+    translations: Dict[str, Any] = field(default_factory=dict)
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [token for token in _SEPARATORS.split(normalize(text)) if token]
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"^{token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def within_distance(a: str, b: str, limit: int) -> bool:
+    """Levenshtein distance of ``a`` and ``b`` is at most ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+class InvertedIndex:
+    """
+    Token -> document postings with prefix lookups over the sorted vocabulary
+    and a trigram index over the vocabulary for substring and typo matches.
+    Khmer is written without spaces between words, so substring matching is
+    what finds a word inside a longer run of text.
+    """
+
+    def __init__(self):
+        self.documents: Dict[DocumentKey, SearchDocument] = {}
+        self.postings: Dict[str, Dict[DocumentKey, float]] = {}
+        self.grams: Dict[str, Set[str]] = {}
+        self.vocabulary: List[str] = []
+
+    def add(self, document: SearchDocument, fields: Iterable[Tuple[str, Optional[str]]]) -> None:
+        key = (document.kind, document.id)
+        self.documents[key] = document
+        for field_name, text in fields:
+            weight = FIELD_WEIGHTS[field_name]
+            for token in tokenize(text):
+                postings = self.postings.setdefault(token, {})
+                postings[key] = max(postings.get(key, 0.0), weight)
+
+    def freeze(self) -> "InvertedIndex":
+        self.vocabulary = sorted(self.postings)
+        for token in self.vocabulary:
+            for gram in trigrams(token):
+                self.grams.setdefault(gram, set()).add(token)
+        return self
+
+    def _expand(self, term: str) -> Dict[str, float]:
+        """Vocabulary tokens matching ``term``, with the weight of the match kind"""
+        matches = {term: EXACT} if term in self.postings else {}
+        start = bisect.bisect_left(self.vocabulary, term)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            matches.setdefault(token, PREFIX)
+
+        if len(term) < 3:
+            return matches
+        term_grams = trigrams(term)
+        shared: Dict[str, int] = {}
+        for gram in term_grams:
+            for token in self.grams.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        typo_limit = 1 if len(term) <= 5 else 2
+        for token, count in shared.items():
+            if token in matches:
+                continue
+            if term in token:
+                matches[token] = SUBSTRING
+            elif count * 2 >= len(term_grams) and within_distance(term, token, typo_limit):
+                matches[token] = FUZZY
+        return matches
+
+    def search(self, query: str, limit: int, merchant_id: Optional[int] = None) -> List[Tuple[float, SearchDocument]]:
+        """
+        Rank documents matching every query term by the sum of the best
+        match per term, weighted by field and inverse document frequency.
+        """
+        terms = tokenize(query)
+        if not terms or not self.documents:
+            return []
+        total = len(self.documents)
+        scores: Optional[Dict[DocumentKey, float]] = None
+        for term in terms:
+            term_scores: Dict[DocumentKey, float] = {}
+            for token, match_weight in self._expand(term).items():
+                postings = self.postings[token]
+                idf = math.log(1 + total / len(postings))
+                for key, field_weight in postings.items():
+                    score = match_weight * field_weight * idf
+                    if score > term_scores.get(key, 0.0):
+                        term_scores[key] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {key: scores[key] + score for key, score in term_scores.items() if key in scores}
+            if not scores:
+                return []
+
+        ranked = []
+        for key, score in scores.items():
+            document = self.documents[key]
+            if merchant_id is not None and document.merchant_id != merchant_id:
+                continue
+            ranked.append((score, document))
+        ranked.sort(key=lambda hit: (-hit[0], hit[1].kind, hit[1].id))
+        return ranked[:limit]
+
+
+def _translation_texts(translations: Optional[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    if not isinstance(translations, dict):
+        return []
+    return [("translation", value) for value in translations.values() if isinstance(value, str)]
+
+
+async def build_index(db: AsyncSession) -> InvertedIndex:
+    """Index active menu items and categories, and all products"""
+    index = InvertedIndex()
+    items = await db.execute(
+        select(MenuItem.id, MenuItem.name, MenuItem.merchant_id, MenuItem.translations)
+        .where(MenuItem.is_active == True)
+    )
+    for id, name, merchant_id, translations in items.all():
+        document = SearchDocument("menu_item", id, name or "", merchant_id, translations or {})
+        index.add(document, [("name", name), *_translation_texts(translations)])
+
+    categories = await db.execute(
+        select(MenuCategory.id, MenuCategory.name, MenuCategory.merchant_id, MenuCategory.translations,
+               MenuCategory.description)
+        .where(MenuCategory.is_active == True)
+    )
+    for id, name, merchant_id, translations, description in categories.all():
+        document = SearchDocument("category", id, name or "", merchant_id, translations or {})
+        index.add(document, [("name", name), ("description", description), *_translation_texts(translations)])
+
+    products = await db.execute(select(Product.id, Product.name, Product.description))
+    for id, name, description in products.all():
+        index.add(SearchDocument("product", id, name or ""), [("name", name), ("description", description)])
+    return index.freeze()
+
+
+class SearchIndexCache:
+    """The current index, rebuilt on the first search after a write"""
+
+    def __init__(self):
+        self._index: Optional[InvertedIndex] = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._version += 1
+        self._index = None
+
+    async def get(self, db: AsyncSession) -> InvertedIndex:
+        if self._index is not None:
+            return self._index
+        async with self._lock:
+            if self._index is not None:
+                return self._index
+            version = self._version
+            index = await build_index(db)
+            # A write committed during the build leaves the index stale; use it once, don't keep it
+            if version == self._version:
+                self._index = index
+            return index
+
+
+search_index = SearchIndexCache()
+
+
+def evict_search_changes(events: list) -> None:
+    """Change feed subscriber: rebuild after a write by any worker"""
+    if any(change.table in SEARCHABLE_TABLES for change in events):
+        search_index.invalidate()
+
@@ -0,0 +1,70 @@
+"""
+Opt-in fast response path (``FAST_SERIALIZATION``).
+
+The default path returns ORM objects or dicts and lets FastAPI validate
+them against ``response_model`` and encode the result with the standard
+JSON encoder. The fast path validates the selected rows once with a
+``TypeAdapter`` and dumps them straight to bytes with pydantic-core,
+bypassing ``response_model``. Plain JSON bodies are rendered with orjson
+when it is installed.
+
+Rendering and adapter dumps are timed as serialization in the request
+metrics.
+"""
+import json
+from typing import Any, Dict, Optional, Type
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.core.metrics import serialization_timer
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse whose rendering counts as serialization time"""
+
+    def render(self, content: Any) -> bytes:
+        with serialization_timer():
+            return super().render(content)
+
+
+class FastJSONResponse(TimedJSONResponse):
+    """JSONResponse rendered with orjson, falling back to the standard encoder"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            with serialization_timer():
+                return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return super().render(content)
+
+
+def default_response_class() -> Type[JSONResponse]:
+    return FastJSONResponse if settings.FAST_SERIALIZATION else TimedJSONResponse
+
+
+def dump_json(adapter: TypeAdapter, body: Any) -> bytes:
+    """Validate ``body`` once with ``adapter`` and encode it to JSON bytes"""
+    with serialization_timer():
+        return adapter.dump_json(adapter.validate_python(body))
+
+
+def adapter_response(adapter: TypeAdapter, body: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Validate ``body`` once with ``adapter`` and return it as pre-encoded JSON"""
+    return Response(content=dump_json(adapter, body), media_type="application/json", headers=headers)
+
+
+def render_json(content: Any) -> bytes:
+    """Encode arbitrary (dict/list) content the way the configured response class would"""
+    with serialization_timer():
+        content = jsonable_encoder(content)
+        if settings.FAST_SERIALIZATION and orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
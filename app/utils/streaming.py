@@ -0,0 +1,80 @@
+import json
+from typing import Any, AsyncIterator, Tuple
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-lines")
+
+
+def is_ndjson(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type in NDJSON_MEDIA_TYPES
+
+
+async def iter_lines(request: Request, max_line_bytes: int) -> AsyncIterator[bytes]:
+    """
+    Yield the request body line by line as it arrives, holding at most one
+    partial line in memory.
+    """
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        if b"\n" not in buffer:
+            if len(buffer) > max_line_bytes:
+                raise HTTPException(status_code=413, detail="Request line too large")
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def iter_json_records(
+        request: Request,
+        max_records: int,
+        max_body_bytes: int,
+        max_line_bytes: int
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield ``(index, record)`` pairs from an NDJSON body, streamed line by line,
+    or from a JSON array body. A line that is not valid JSON is yielded as the
+    ``ValueError`` raised while parsing it, so callers can report it per row.
+    """
+    if not is_ndjson(request):
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_body_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail="JSON array body too large, send application/x-ndjson instead"
+            )
+        body = await request.body()
+        if len(body) > max_body_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail="JSON array body too large, send application/x-ndjson instead"
+            )
+        try:
+            records = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+        if len(records) > max_records:
+            raise HTTPException(status_code=413, detail=f"At most {max_records} rows per request")
+        for index, record in enumerate(records):
+            yield index, record
+        return
+
+    index = 0
+    async for line in iter_lines(request, max_line_bytes):
+        if not line.strip():
+            continue
+        if index >= max_records:
+            raise HTTPException(status_code=413, detail=f"At most {max_records} rows per request")
+        try:
+            yield index, json.loads(line)
+        except ValueError as exc:
+            yield index, exc
+        index += 1
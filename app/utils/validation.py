@@ -1,28 +1,56 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Set
 
 from fastapi import HTTPException
 
 from app.models.products import ProductType
 
+# Attributes every product of a given type must define
+PRODUCT_ATTRIBUTE_RULES: Dict[ProductType, Set[str]] = {
+    ProductType.DIGITAL: {"download_link", "file_size"},
+    ProductType.PHYSICAL: {"weight", "dimensions"},
+    ProductType.COSMETIC: {"volume", "weight"},
+    ProductType.CAR_PART: {"weight", "dimensions"},
+    ProductType.CLOTHING: {"size", "color"},
+}
+
+# Attributes that can be filtered on with ``attr.<key>`` query parameters,
+# mapped to the kind of value they hold ("string" or "number")
+PRODUCT_FILTERABLE_ATTRIBUTES: Dict[ProductType, Dict[str, str]] = {
+    ProductType.DIGITAL: {"file_size": "number", "format": "string", "license": "string"},
+    ProductType.PHYSICAL: {"weight": "number", "brand": "string", "color": "string"},
+    ProductType.COSMETIC: {"volume": "number", "weight": "number", "brand": "string", "skin_type": "string"},
+    ProductType.CAR_PART: {
+        "weight": "number", "manufacturer": "string", "model": "string", "year": "number",
+    },
+    ProductType.CLOTHING: {"size": "string", "color": "string", "brand": "string", "material": "string"},
+}
+
+
+def filterable_attributes(product_type: Optional[ProductType] = None) -> Dict[str, str]:
+    """
+    Filterable attributes of a product type, or of every type when none is given.
+    """
+    if product_type is not None:
+        return PRODUCT_FILTERABLE_ATTRIBUTES.get(ProductType(product_type), {})
+    merged: Dict[str, str] = {}
+    for attributes in PRODUCT_FILTERABLE_ATTRIBUTES.values():
+        merged.update(attributes)
+    return merged
+
+
+def missing_product_attributes(product_type: ProductType, attributes: Dict[str, Any]) -> Set[str]:
+    """
+    Return the required attributes for a product type that are missing.
+    """
+    required_attrs = PRODUCT_ATTRIBUTE_RULES.get(ProductType(product_type), set())
+    return required_attrs - set(attributes.keys())
+
 
 def validate_product_attributes(product_type: ProductType, attributes: Dict[str, Any]) -> None:
     """
     Validate product attributes based on product type.
     """
-    if product_type == ProductType.DIGITAL:
-        required_attrs = {"download_link", "file_size"}
-    elif product_type == ProductType.PHYSICAL:
-        required_attrs = {"weight", "dimensions"}
-    elif product_type == product_type.COSMETIC:
-        required_attrs = {"volume", "weight"}
-    elif product_type == product_type.CAR_PART:
-        required_attrs = {"weight", "dimensions"}
-    elif product_type == product_type.CLOTHING:
-        required_attrs = {"size", "color"}
-    else:
-        required_attrs = set()
-
-    missing_attrs = required_attrs - set(attributes.keys())
+    missing_attrs = missing_product_attributes(product_type, attributes)
     if missing_attrs:
         raise HTTPException(
             status_code=400,
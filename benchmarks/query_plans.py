@@ -0,0 +1,140 @@
+"""
+Capture query plans and timings for the hot read paths.
+
+    python -m benchmarks.query_plans                 # current schema
+    python -m benchmarks.query_plans --compare -o plans.json
+
+``--compare`` downgrades the database to the baseline revision (0001), runs
+every query, upgrades to head and runs them again, so the plans before and
+after the index migration can be diffed. Point DATABASE_URL at a scratch
+database seeded with realistic data; on SQLite only EXPLAIN QUERY PLAN is
+available.
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.engine import Connection
+
+from app.db.session import engine
+from app.models.menu import MenuCategory, MenuItem
+from app.models.products import Product
+
+
+def _sample(conn: Connection, column, default: Any = 1) -> Any:
+    value = conn.execute(select(column).where(column.is_not(None)).limit(1)).scalar()
+    return default if value is None else value
+
+
+def hot_queries(conn: Connection) -> Dict[str, Select]:
+    merchant_id = _sample(conn, MenuItem.merchant_id)
+    category_id = _sample(conn, MenuItem.category_id)
+    product_type = _sample(conn, Product.type, None)
+    product_category_id = _sample(conn, Product.category_id)
+
+    queries = {
+        "menu_items_by_merchant": (
+            select(MenuItem).where(MenuItem.merchant_id == merchant_id).order_by(MenuItem.id).limit(50)
+        ),
+        "menu_items_by_merchant_category": (
+            select(MenuItem)
+            .where(MenuItem.merchant_id == merchant_id, MenuItem.category_id == category_id)
+            .order_by(MenuItem.id)
+            .limit(50)
+        ),
+        "menu_items_active_by_merchant_category": (
+            select(MenuItem)
+            .where(MenuItem.merchant_id == merchant_id, MenuItem.category_id == category_id, MenuItem.is_active)
+            .limit(50)
+        ),
+        "menu_items_etag": (
+            select(func.max(MenuItem.updated_at), func.count()).where(MenuItem.merchant_id == merchant_id)
+        ),
+        "categories_by_merchant": (
+            select(MenuCategory)
+            .where(MenuCategory.merchant_id == merchant_id, MenuCategory.is_active)
+            .order_by(MenuCategory.display_order, MenuCategory.id)
+        ),
+        "category_top_level": (
+            select(MenuCategory)
+            .where(MenuCategory.merchant_id == merchant_id, MenuCategory.parent_id.is_(None), MenuCategory.is_active)
+            .order_by(MenuCategory.display_order, MenuCategory.id)
+        ),
+        "products_by_category": select(Product).where(Product.category_id == product_category_id).limit(50),
+    }
+    if product_type is not None:
+        queries["products_by_type_category"] = (
+            select(Product).where(Product.type == product_type, Product.category_id == product_category_id).limit(50)
+        )
+    if conn.dialect.name == "postgresql":
+        # Containment is only index-assisted once the column is JSONB
+        queries["products_attribute_containment"] = (
+            select(Product).where(text("products.attributes::jsonb @> CAST(:filter AS jsonb)")).limit(50)
+        ).params(filter=json.dumps({"brand": "Acme"}))
+    return queries
+
+
+def explain(conn: Connection, statement: Select) -> Any:
+    sql = str(statement.compile(conn, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "postgresql":
+        return conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql).scalar()
+    return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+
+
+def time_query(conn: Connection, statement: Select, repeat: int) -> Dict[str, float]:
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(statement).all()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def capture(repeat: int) -> Dict[str, Any]:
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("ANALYZE")
+        results = {}
+        for name, statement in hot_queries(conn).items():
+            results[name] = {"plan": explain(conn, statement), "timing": time_query(conn, statement, repeat)}
+        conn.rollback()
+        return results
+
+
+def compare(repeat: int) -> Dict[str, Any]:
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config("alembic.ini")
+    command.downgrade(config, "0001")
+    before = capture(repeat)
+    command.upgrade(config, "head")
+    return {"before": before, "after": capture(repeat)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Explain and time the hot read queries")
+    parser.add_argument("--compare", action="store_true", help="run at revision 0001 and at head")
+    parser.add_argument("--repeat", type=int, default=20, help="executions per query for timing")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = {"dialect": engine.dialect.name}
+    report.update(compare(args.repeat) if args.compare else {"current": capture(args.repeat)})
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as target:
+            target.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
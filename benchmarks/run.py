@@ -0,0 +1,299 @@
+"""
+Load-test the API hot paths against a dataset seeded by ``benchmarks.seed``.
+
+    python -m benchmarks.seed --reset
+    python -m benchmarks.run --duration 15 --concurrency 16 -o results.json
+    python -m benchmarks.run --url http://127.0.0.1:8000 --scenario menu_list --scenario login
+    python -m benchmarks.run --baseline results.json --max-regression 0.15
+
+Without ``--url`` requests go straight to the ASGI app in this process
+(no network, no server), which isolates the application's own cost. Each
+scenario runs for ``--duration`` seconds after a warm-up with
+``--concurrency`` concurrent clients. The JSON report has throughput and
+p50/p95/p99 latency per scenario. With ``--baseline`` the run is compared
+to an earlier report: any scenario whose p95 grew or whose throughput fell
+by more than ``--max-regression`` is listed under ``regressions`` and the
+exit status is 1.
+
+The write scenarios insert and update menu items, so run them against a
+scratch database.
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+
+API = settings.API_V1_STR
+
+
+class Context:
+    """Dataset manifest, auth token and a random source shared by the scenarios"""
+
+    def __init__(self, manifest: Dict[str, Any], seed: int):
+        self.manifest = manifest
+        self.rng = random.Random(seed)
+        self.token: Optional[str] = None
+        self.sequence = 0
+
+    @property
+    def auth(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def merchant(self) -> int:
+        return self.rng.choice(self.manifest["merchants"])
+
+    def category(self, merchant_id: int) -> int:
+        return self.rng.choice(self.manifest["categories"][str(merchant_id)])
+
+    def menu_item_id(self) -> int:
+        low, high = self.manifest["menu_item_ids"]
+        return self.rng.randint(low, high)
+
+    def new_menu_item(self) -> Dict[str, Any]:
+        self.sequence += 1
+        merchant_id = self.merchant()
+        return {
+            "name": f"Bench item {self.sequence}",
+            "price_usd": 3.5,
+            "price_khr": 14000,
+            "item_type": "beverage",
+            "translations": {"km": "កាហ្វេទឹកដោះគោត្រជាក់"},
+            "merchant_id": merchant_id,
+            "category_id": self.category(merchant_id),
+        }
+
+
+Scenario = Callable[[httpx.AsyncClient, Context], Awaitable[httpx.Response]]
+
+
+async def menu_list(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.get(f"{API}/menu/", params={"merchant_id": ctx.merchant(), "limit": 50})
+
+
+async def menu_list_km(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.get(
+        f"{API}/menu/",
+        params={"merchant_id": ctx.merchant(), "limit": 50, "include_translations": "false"},
+        headers={"Accept-Language": "km"}
+    )
+
+
+async def menu_list_cursor(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    merchant_id = ctx.merchant()
+    params = {"merchant_id": merchant_id, "category_id": ctx.category(merchant_id), "cursor": "", "limit": 50}
+    return await client.get(f"{API}/menu/", params=params)
+
+
+async def categories_list(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.get(f"{API}/categories/", params={"merchant_id": ctx.merchant()})
+
+
+async def categories_tree(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.get(f"{API}/categories/tree", params={"merchant_id": ctx.merchant()})
+
+
+async def login(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.post(
+        f"{API}/auth/token",
+        data={"username": ctx.manifest["username"], "password": ctx.manifest["password"]}
+    )
+
+
+async def menu_create(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.post(f"{API}/menu/", json=ctx.new_menu_item(), headers=ctx.auth)
+
+
+async def menu_update(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.put(f"{API}/menu/{ctx.menu_item_id()}", json=ctx.new_menu_item(), headers=ctx.auth)
+
+
+async def menu_bulk_update(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    rows = [
+        {"id": ctx.menu_item_id(), "price_usd": round(ctx.rng.uniform(1, 20), 2), "price_khr": 8000}
+        for _ in range(100)
+    ]
+    return await client.put(f"{API}/menu/bulk", json=rows, headers=ctx.auth)
+
+
+async def menu_bulk_create(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    rows = [ctx.new_menu_item() for _ in range(100)]
+    return await client.post(f"{API}/menu/bulk", json=rows, headers=ctx.auth)
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "menu_list": menu_list,
+    "menu_list_km": menu_list_km,
+    "menu_list_cursor": menu_list_cursor,
+    "categories_list": categories_list,
+    "categories_tree": categories_tree,
+    "login": login,
+    "menu_create": menu_create,
+    "menu_update": menu_update,
+    "menu_bulk_create": menu_bulk_create,
+    "menu_bulk_update": menu_bulk_update,
+}
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted ``samples``"""
+    if not samples:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(samples)))
+    return samples[rank - 1]
+
+
+async def run_scenario(
+        client: httpx.AsyncClient,
+        ctx: Context,
+        scenario: Scenario,
+        concurrency: int,
+        duration: float,
+        warmup: float
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def worker(deadline: float, record: bool) -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = str((await scenario(client, ctx)).status_code)
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            if record:
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    if warmup:
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(worker(deadline, False) for _ in range(concurrency)))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(started + duration, True) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+    }
+
+
+def regressions(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    found = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            found.append({"scenario": name, "metric": "p95_ms", "baseline": before["p95_ms"], "current": result["p95_ms"]})
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            found.append({
+                "scenario": name, "metric": "throughput_rps",
+                "baseline": before["throughput_rps"], "current": result["throughput_rps"],
+            })
+    return found
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_client(url: Optional[str], concurrency: int) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if url:
+        return httpx.AsyncClient(base_url=url, limits=limits, timeout=30)
+    from app.main import app
+
+    # Every in-process request comes from one client address
+    settings.RATE_LIMIT_ENABLED = False
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    with open(args.manifest) as source:
+        manifest = json.load(source)
+    ctx = Context(manifest, args.seed)
+    names = args.scenario or list(SCENARIOS)
+
+    async with make_client(args.url, args.concurrency) as client:
+        response = await login(client, ctx)
+        response.raise_for_status()
+        ctx.token = response.json()["access_token"]
+
+        results = {}
+        for name in names:
+            results[name] = await run_scenario(
+                client, ctx, SCENARIOS[name], args.concurrency, args.duration, args.warmup
+            )
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "target": args.url or "in-process",
+        "database": manifest["database"],
+        "dataset": manifest["counts"],
+        "python": platform.python_version(),
+        "settings": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "fast_serialization": settings.FAST_SERIALIZATION,
+        },
+        "scenarios": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure API throughput and latency percentiles")
+    parser.add_argument("--url", help="base URL of a running server (default: the app in-process)")
+    parser.add_argument("--manifest", default="bench-dataset.json", help="written by benchmarks.seed")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="repeatable; default all")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds per scenario")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="tolerated relative change")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.baseline:
+        with open(args.baseline) as source:
+            report["regressions"] = regressions(report, json.load(source), args.max_regression)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as target:
+            target.write(output)
+    else:
+        print(output)
+    if report.get("regressions"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Seed DATABASE_URL with a synthetic catalog for the load benchmarks.
+
+    python -m benchmarks.seed --reset --merchants 20 --menu-items 100000 --products 100000
+
+Every merchant gets a nested category tree (``--categories`` per level,
+``--depth`` levels) and an even share of the menu items, spread over its
+categories. Names, translations and attributes come from a fixed random
+seed, so two runs with the same arguments produce the same dataset. The
+``bench`` user is created for the login and write scenarios, and a manifest
+describing the dataset is written for ``benchmarks.run``.
+
+The target must be empty unless ``--reset`` is given, which drops and
+recreates every table.
+"""
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Connection
+
+from app.core.security import get_password_hash
+from app.db.base import Base
+from app.db.session import engine
+from app.models.menu import MenuCategory, MenuCategoryStats, MenuItem, MenuItemType
+from app.models.merchant import Merchant
+from app.models.products import Category, Product, ProductType
+from app.models.user import User
+from app.utils.validation import PRODUCT_ATTRIBUTE_RULES, PRODUCT_FILTERABLE_ATTRIBUTES
+
+BENCH_USERNAME = "bench"
+BENCH_PASSWORD = "bench-password"
+
+WORDS = [
+    "iced", "hot", "latte", "mocha", "jasmine", "lemongrass", "mango", "coconut", "palm", "sugar",
+    "rice", "noodle", "soup", "grilled", "pork", "beef", "fish", "amok", "lok", "lak",
+    "fried", "crispy", "sweet", "sour", "spicy", "green", "tea", "coffee", "milk", "cake",
+]
+KHMER_WORDS = [
+    "កាហ្វេ", "តែ", "ទឹកដោះគោ", "ត្រជាក់", "ក្តៅ", "បាយ", "មី", "សម្ល", "អាំង", "សាច់ជ្រូក",
+    "សាច់គោ", "ត្រី", "អាម៉ុក", "ឡុកឡាក់", "ចៀន", "ផ្អែម", "ជូរ", "ហឹរ", "ស្វាយ", "ដូង",
+]
+ATTRIBUTE_VALUES = {
+    "string": ["red", "blue", "black", "M", "L", "XL", "Acme", "Angkor", "Mekong", "cotton", "silk", "pdf", "mit"],
+    "number": [1, 2, 5, 10, 25, 50, 100, 2012, 2015, 2018, 2021],
+}
+
+
+def phrase(rng: random.Random, words: List[str], length: int) -> str:
+    return " ".join(rng.choice(words) for _ in range(length))
+
+
+def chunks(rows: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def insert_returning_ids(conn: Connection, model, rows: List[Dict[str, Any]]) -> List[int]:
+    table = model.__table__
+    result = conn.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars())
+
+
+def seed_merchants(conn: Connection, rng: random.Random, count: int) -> List[int]:
+    return insert_returning_ids(conn, Merchant, [
+        {"name": f"{phrase(rng, WORDS, 2).title()} #{number}", "is_active": True}
+        for number in range(count)
+    ])
+
+
+def seed_categories(
+        conn: Connection,
+        rng: random.Random,
+        merchant_id: int,
+        per_level: int,
+        depth: int
+) -> List[int]:
+    """One category tree for a merchant, inserted level by level"""
+    category_ids: List[int] = []
+    parents: List[Any] = [None]
+    for level in range(depth):
+        rows = []
+        for parent_id in parents:
+            for position in range(per_level):
+                name = phrase(rng, WORDS, 2).title()
+                rows.append({
+                    "name": name,
+                    "slug": f"m{merchant_id}-l{level}-{len(category_ids) + len(rows)}",
+                    "description": f"{name} ({phrase(rng, WORDS, 4)})",
+                    "translations": {
+                        "km": phrase(rng, KHMER_WORDS, 2),
+                        "km.description": phrase(rng, KHMER_WORDS, 4),
+                    },
+                    "is_active": rng.random() > 0.05,
+                    "display_order": position,
+                    "merchant_id": merchant_id,
+                    "parent_id": parent_id,
+                })
+        parents = insert_returning_ids(conn, MenuCategory, rows)
+        category_ids.extend(parents)
+    return category_ids
+
+
+def menu_item_rows(
+        rng: random.Random,
+        merchant_categories: Dict[int, List[int]],
+        count: int,
+        stats: Dict[int, Dict[str, Any]]
+) -> Iterator[Dict[str, Any]]:
+    """Menu item rows, accumulating the per-category stats as they go"""
+    merchants = list(merchant_categories)
+    item_types = list(MenuItemType)
+    for number in range(count):
+        merchant_id = merchants[number % len(merchants)]
+        category_id = rng.choice(merchant_categories[merchant_id])
+        price_usd = round(rng.uniform(0.5, 25), 2)
+        item_type = rng.choice(item_types)
+        is_active = rng.random() > 0.1
+        row = {
+            "name": phrase(rng, WORDS, rng.randint(1, 3)).title(),
+            "price_usd": price_usd,
+            "price_khr": round(price_usd * 4100, -2),
+            "is_active": is_active,
+            "translations": {"km": phrase(rng, KHMER_WORDS, rng.randint(1, 3))},
+            "image_url": f"https://cdn.example.com/menu/{number}.jpg",
+            "item_type": item_type,
+            "attributes": {"size": rng.choice(["S", "M", "L"]), "spicy": rng.random() > 0.7},
+            "merchant_id": merchant_id,
+            "category_id": category_id,
+            "external_id": f"bench-{number}",
+        }
+
+        entry = stats.setdefault(category_id, {
+            "category_id": category_id, "items_total": 0, "items_active": 0, "items_by_type": {},
+            "min_price_usd": None, "max_price_usd": None, "min_price_khr": None, "max_price_khr": None,
+        })
+        entry["items_total"] += 1
+        entry["items_active"] += is_active
+        entry["items_by_type"][item_type.value] = entry["items_by_type"].get(item_type.value, 0) + 1
+        for suffix in ("usd", "khr"):
+            price = row[f"price_{suffix}"]
+            low, high = entry[f"min_price_{suffix}"], entry[f"max_price_{suffix}"]
+            entry[f"min_price_{suffix}"] = price if low is None else min(low, price)
+            entry[f"max_price_{suffix}"] = price if high is None else max(high, price)
+        yield row
+
+
+def product_rows(rng: random.Random, category_ids: List[int], count: int) -> Iterator[Dict[str, Any]]:
+    product_types = list(ProductType)
+    for number in range(count):
+        product_type = rng.choice(product_types)
+        attributes = {
+            key: rng.choice(ATTRIBUTE_VALUES[kind])
+            for key, kind in PRODUCT_FILTERABLE_ATTRIBUTES.get(product_type, {}).items()
+        }
+        for key in PRODUCT_ATTRIBUTE_RULES.get(product_type, set()) - attributes.keys():
+            attributes[key] = f"{key}-{rng.randint(1, 50)}"
+        yield {
+            "name": f"{phrase(rng, WORDS, rng.randint(1, 3)).title()} {number}",
+            "description": phrase(rng, WORDS, 8),
+            "price": round(rng.uniform(1, 600), 2),
+            "stock": rng.randint(0, 500),
+            "type": product_type,
+            "attributes": attributes,
+            "category_id": rng.choice(category_ids),
+        }
+
+
+def seed(conn: Connection, args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    merchant_ids = seed_merchants(conn, rng, args.merchants)
+    merchant_categories = {
+        merchant_id: seed_categories(conn, rng, merchant_id, args.categories, args.depth)
+        for merchant_id in merchant_ids
+    }
+
+    stats: Dict[int, Dict[str, Any]] = {}
+    for chunk in chunks(menu_item_rows(rng, merchant_categories, args.menu_items, stats), args.chunk_size):
+        conn.execute(insert(MenuItem), chunk)
+    for chunk in chunks(iter(stats.values()), args.chunk_size):
+        conn.execute(insert(MenuCategoryStats), chunk)
+
+    product_category_ids = insert_returning_ids(conn, Category, [
+        {"name": f"Product category {number}"} for number in range(args.product_categories)
+    ])
+    for chunk in chunks(product_rows(rng, product_category_ids, args.products), args.chunk_size):
+        conn.execute(insert(Product), chunk)
+
+    conn.execute(insert(User), [{"username": BENCH_USERNAME, "hashed_password": get_password_hash(BENCH_PASSWORD)}])
+    item_ids = conn.execute(select(func.min(MenuItem.id), func.max(MenuItem.id))).one()
+
+    return {
+        "database": engine.dialect.name,
+        "seed": args.seed,
+        "merchants": merchant_ids,
+        "categories": {str(merchant_id): ids for merchant_id, ids in merchant_categories.items()},
+        "menu_item_ids": list(item_ids),
+        "product_category_ids": product_category_ids,
+        "counts": {
+            "merchants": len(merchant_ids),
+            "categories": sum(len(ids) for ids in merchant_categories.values()),
+            "menu_items": args.menu_items,
+            "products": args.products,
+        },
+        "username": BENCH_USERNAME,
+        "password": BENCH_PASSWORD,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed a synthetic catalog for the benchmarks")
+    parser.add_argument("--merchants", type=int, default=20)
+    parser.add_argument("--categories", type=int, default=4, help="categories per parent, per level")
+    parser.add_argument("--depth", type=int, default=3, help="levels of nested categories")
+    parser.add_argument("--menu-items", type=int, default=100000)
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--product-categories", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate every table first")
+    parser.add_argument("--manifest", default="bench-dataset.json", help="where to write the dataset manifest")
+    args = parser.parse_args()
+
+    if args.reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if conn.scalar(select(func.count()).select_from(Merchant)):
+            raise SystemExit("The database already holds data; pass --reset to start over")
+        manifest = seed(conn, args)
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("ANALYZE")
+            conn.commit()
+
+    manifest["seconds"] = round(time.perf_counter() - started, 1)
+    with open(args.manifest, "w") as target:
+        json.dump(manifest, target, indent=2)
+    print(json.dumps({"manifest": args.manifest, "counts": manifest["counts"], "seconds": manifest["seconds"]}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Compare the default and the fast (``FAST_SERIALIZATION``) response paths
+for a menu page.
+
+    python -m benchmarks.serialization --items 500 --repeat 200
+
+Rows are loaded from an in-memory SQLite database, so the numbers include
+ORM hydration on the default path and column-tuple fetching on the fast
+path, followed by the serialization each path performs:
+
+* orm+response_model: ORM objects validated with from_attributes, made
+  JSON-able and encoded with json.dumps (what FastAPI does for
+  ``response_model=List[MenuItem]`` and JSONResponse)
+* orm+orjson: the same with orjson rendering the final body
+* columns+typeadapter: column tuples validated once by a TypeAdapter and
+  dumped to bytes by pydantic-core
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.models.menu import MenuCategory, MenuItem as MenuItemModel, MenuItemType
+from app.models.merchant import Merchant
+from app.schemas.menu import MenuItem
+from app.utils.i18n import localized_columns
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+adapter = TypeAdapter(List[MenuItem])
+
+
+def seed(session: Session, items: int) -> None:
+    now = datetime.utcnow()
+    session.execute(insert(Merchant), [{"id": 1, "name": "Bench", "created_at": now, "updated_at": now}])
+    session.execute(insert(MenuCategory), [{
+        "id": 1, "name": "Drinks", "slug": "drinks", "translations": {"km": "ភេសជ្ជៈ"},
+        "merchant_id": 1, "created_at": now, "updated_at": now,
+    }])
+    session.execute(insert(MenuItemModel), [
+        {
+            "name": f"Item {i}",
+            "price_usd": 2.5 + i % 7,
+            "price_khr": 10000 + 100 * (i % 7),
+            "is_active": True,
+            "translations": {"km": f"មុខម្ហូប {i}"},
+            "item_type": MenuItemType.BEVERAGE,
+            "attributes": {"size": "M"},
+            "merchant_id": 1,
+            "category_id": 1,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(items)
+    ])
+    session.commit()
+
+
+def default_path(session: Session) -> bytes:
+    rows = session.scalars(select(MenuItemModel)).all()
+    validated = adapter.validate_python(rows, from_attributes=True)
+    content = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+    session.expunge_all()
+    return body
+
+
+def orjson_path(session: Session) -> bytes:
+    rows = session.scalars(select(MenuItemModel)).all()
+    validated = adapter.validate_python(rows, from_attributes=True)
+    body = orjson.dumps(jsonable_encoder(adapter.dump_python(validated, mode="json")))
+    session.expunge_all()
+    return body
+
+
+def fast_path(session: Session) -> bytes:
+    rows = [dict(row) for row in session.execute(select(*localized_columns(MenuItemModel, None))).mappings()]
+    return adapter.dump_json(adapter.validate_python(rows))
+
+
+def measure(run: Callable[[Session], bytes], session: Session, repeat: int) -> Dict[str, float]:
+    run(session)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = run(session)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+        "bytes": len(body),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark menu page serialization paths")
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, args.items)
+        paths = {"orm+response_model": default_path, "columns+typeadapter": fast_path}
+        if orjson is not None:
+            paths["orm+orjson"] = orjson_path
+        report = {name: measure(run, session, args.repeat) for name, run in paths.items()}
+
+    baseline = report["orm+response_model"]["median_ms"]
+    for result in report.values():
+        result["speedup"] = round(baseline / result["median_ms"], 2)
+    print(json.dumps({"items": args.items, "repeat": args.repeat, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import itertools
+import os
+import tempfile
+
+import pytest
+
+# Settings are read when app.core.config is imported, so point the app at a
+# scratch SQLite database before any test module imports it
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+
+
+@pytest.fixture
+def database():
+    """Empty every table and the caches built from them, then add the FIRST_SUPERUSER account"""
+    from app.core.menu_cache import menu_snapshots
+    from app.core.security import principal_cache
+    from app.db.base import Base
+    from app.db.init_db import init_db
+    from app.db.session import SessionLocal, engine
+    from app.utils.search_index import search_index
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        init_db(db)
+    menu_snapshots.clear_local()
+    principal_cache.clear_local()
+    search_index.invalidate()
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    # Started once: shutdown stops the password hashing pool for good
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def client(app_client, database):
+    """The app on an empty database"""
+    return app_client
+
+
+@pytest.fixture
+def auth_headers(client):
+    from app.core.config import settings
+
+    response = client.post(
+        f"{settings.API_V1_STR}/auth/token",
+        data={"username": settings.FIRST_SUPERUSER, "password": settings.FIRST_SUPERUSER_PASSWORD}
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def merchant_id(database):
+    from app.db.session import SessionLocal
+    from app.models.merchant import Merchant
+
+    with SessionLocal() as db:
+        merchant = Merchant(name="Test merchant")
+        db.add(merchant)
+        db.commit()
+        return merchant.id
+
+
+@pytest.fixture
+def make_category(client, auth_headers, merchant_id):
+    """Create a category through the API and return its JSON"""
+    from app.core.config import settings
+
+    numbers = itertools.count(1)
+
+    def make(**fields):
+        number = next(numbers)
+        body = {"name": f"Category {number}", "slug": f"category-{number}", "merchant_id": merchant_id, **fields}
+        response = client.post(f"{settings.API_V1_STR}/categories/", json=body, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return make
+
+
+@pytest.fixture
+def make_item(client, auth_headers, merchant_id):
+    """Create a menu item in ``category_id`` through the API and return its JSON"""
+    from app.core.config import settings
+
+    def make(category_id, **fields):
+        body = {
+            "name": "Item", "price_usd": 1.0, "price_khr": 4000.0, "item_type": "food",
+            "category_id": category_id, "merchant_id": merchant_id, **fields,
+        }
+        response = client.post(f"{settings.API_V1_STR}/menu/", json=body, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return make
+
+
+@pytest.fixture
+def product_category_id(database):
+    from app.db.session import SessionLocal
+    from app.models.products import Category
+
+    with SessionLocal() as db:
+        category = Category(name="Test products")
+        db.add(category)
+        db.commit()
+        return category.id
+
+
+@pytest.fixture
+def make_product(client, product_category_id):
+    """Create a product through the API and return its JSON"""
+    from app.core.config import settings
+
+    def make(**fields):
+        body = {
+            "name": "Lipstick", "price": 10.0, "stock": 5, "type": "cosmetic",
+            "attributes": {"brand": "Acme", "volume": 5, "weight": 20, "skin_type": "dry"},
+            "category_id": product_category_id, **fields,
+        }
+        response = client.post(f"{settings.API_V1_STR}/products/", json=body)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return make
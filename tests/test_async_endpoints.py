@@ -0,0 +1,51 @@
+import asyncio
+
+import httpx
+
+from app.core.config import settings
+from app.main import app
+
+API = settings.API_V1_STR
+
+
+def test_menu_item_round_trip(client, auth_headers, make_category, make_item, merchant_id):
+    category = make_category()["id"]
+    item = make_item(category, name="Latte")
+    assert client.get(f"{API}/menu/{item['id']}").json()["name"] == "Latte"
+
+    body = {
+        "name": "Flat white", "price_usd": 3.5, "price_khr": 14000.0, "item_type": "beverage",
+        "category_id": category, "merchant_id": merchant_id,
+    }
+    response = client.put(f"{API}/menu/{item['id']}", json=body, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert client.get(f"{API}/menu/{item['id']}").json()["name"] == "Flat white"
+
+    assert client.delete(f"{API}/menu/{item['id']}", headers=auth_headers).status_code == 200
+    assert client.get(f"{API}/menu/{item['id']}").status_code == 404
+    assert client.put(f"{API}/menu/{item['id']}", json=body, headers=auth_headers).status_code == 404
+
+
+def test_products_are_created_and_listed(client, make_product):
+    product = make_product(name="Serum")
+    listed = client.get(f"{API}/products/").json()
+    assert [entry["name"] for entry in listed] == ["Serum"]
+    assert product["attributes"]["brand"] == "Acme"
+
+    response = client.post(f"{API}/products/", json={**product, "attributes": {"brand": "Acme"}, "category_id": 1})
+    assert response.status_code == 400
+
+
+def test_concurrent_requests_each_get_a_session(client, make_category, make_item):
+    category = make_category()["id"]
+    ids = [make_item(category, name=f"Item {number}")["id"] for number in range(5)]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as concurrent:
+            responses = await asyncio.gather(*(
+                concurrent.get(f"{API}/menu/{item_id}") for item_id in ids * 4
+            ))
+        return [response.json()["id"] for response in responses]
+
+    assert asyncio.run(scenario()) == ids * 4
@@ -0,0 +1,65 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.utils.attribute_filters import parse_attribute_filters
+
+API = settings.API_V1_STR
+
+ATTRIBUTES = {"brand": "string", "size": "string", "year": "number"}
+
+
+def parse(*params):
+    return [(f.key, f.op, f.values) for f in parse_attribute_filters(params, ATTRIBUTES)]
+
+
+def test_filter_forms():
+    assert parse(("attr.brand", "Acme"), ("page", "2")) == [("brand", "eq", ("Acme",))]
+    assert parse(("attr.size", "in:M, L,")) == [("size", "in", ("M", "L"))]
+    # attr.year>=2015 reaches us as key "attr.year>" and value "2015"
+    assert parse(("attr.year>", "2015")) == [("year", "gte", (2015,))]
+    assert parse(("attr.year<", "2020.5")) == [("year", "lte", (2020.5,))]
+    assert parse(("attr.year>2015", "")) == [("year", "gt", (2015,))]
+    assert parse(("attr.year", "lt:2020")) == [("year", "lt", (2020,))]
+    # An unknown prefix is part of the value
+    assert parse(("attr.brand", "tm:Acme")) == [("brand", "eq", ("tm:Acme",))]
+
+
+@pytest.mark.parametrize("param", [
+    ("attr.colour", "red"),
+    ("attr.brand>", "A"),
+    ("attr.year", "gte:soon"),
+    ("attr.size", "in:,"),
+    ("attr.brand", ""),
+    ("attr.br@nd", "x"),
+])
+def test_invalid_filters_are_rejected(param):
+    with pytest.raises(HTTPException) as rejected:
+        parse(param)
+    assert rejected.value.status_code == 400
+
+
+def test_products_are_filtered_on_attributes(client, make_product):
+    def clothing(name, **attributes):
+        make_product(name=name, type="clothing", attributes={"size": "M", "color": "red", **attributes})
+
+    clothing("Shirt", brand="Acme", material=["cotton", "linen"])
+    clothing("Coat", brand="Other", size="L", material="wool")
+    make_product(name="Cream", attributes={"brand": "Acme", "volume": 50, "weight": "120", "skin_type": "dry"})
+    make_product(name="Balm", attributes={"brand": "Acme", "volume": 15, "weight": 30, "skin_type": "oily"})
+
+    def names(**params):
+        response = client.get(f"{API}/products/", params=params)
+        assert response.status_code == 200, response.text
+        return sorted(product["name"] for product in response.json())
+
+    assert names(**{"attr.brand": "Acme"}) == ["Balm", "Cream", "Shirt"]
+    assert names(**{"attr.brand": "Acme", "product_type": "clothing"}) == ["Shirt"]
+    assert names(**{"attr.size": "in:L,XL"}) == ["Coat"]
+    # List-valued attributes match any of their elements
+    assert names(**{"attr.material": "linen"}) == ["Shirt"]
+    assert names(**{"attr.volume>": "20"}) == ["Cream"]
+    # Numbers stored as strings (e.g. imported from CSV) still compare as numbers
+    assert names(**{"attr.weight": "120"}) == ["Cream"]
+    assert names(**{"attr.weight": "lt:100"}) == ["Balm"]
+    assert client.get(f"{API}/products/", params={"attr.volume": "big"}).status_code == 400
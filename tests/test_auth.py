@@ -0,0 +1,56 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.deps import resolve_principal
+from app.core.config import settings
+from app.core.security import create_access_token, invalidate_user, principal_cache, token_digest
+from app.db.session import AsyncSessionLocal
+
+API = settings.API_V1_STR
+
+
+async def resolve(token, db=None):
+    if db is not None:
+        return await resolve_principal(db, token)
+    async with AsyncSessionLocal() as session:
+        return await resolve_principal(session, token)
+
+
+def test_verified_token_is_served_from_the_cache(database):
+    token = create_access_token(settings.FIRST_SUPERUSER)
+
+    async def scenario():
+        principal = await resolve(token)
+        assert principal.username == settings.FIRST_SUPERUSER
+        # A cache hit touches neither the token's signature nor the database
+        assert await resolve(token, db=object()) == principal
+
+        await invalidate_user(settings.FIRST_SUPERUSER)
+        assert await principal_cache.get(token_digest(token)) is None
+
+    asyncio.run(scenario())
+
+
+def test_rejected_tokens_are_not_cached(database):
+    tokens = [
+        "not-a-jwt",
+        create_access_token(settings.FIRST_SUPERUSER, expires_delta=timedelta(minutes=-1)),
+        create_access_token("nobody"),
+    ]
+
+    async def scenario():
+        for token in tokens:
+            with pytest.raises(HTTPException) as rejected:
+                await resolve(token)
+            assert rejected.value.status_code == 401
+            assert await principal_cache.get(token_digest(token)) is None
+
+    asyncio.run(scenario())
+
+
+def test_protected_endpoint_accepts_a_login_token(client, auth_headers):
+    assert client.get(f"{API}/system/pool", headers=auth_headers).status_code == 200
+    assert client.get(f"{API}/system/pool", headers={"Authorization": "Bearer nope"}).status_code == 401
@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+import json
+
+from app.core.config import settings
+from app.db.session import engine
+from benchmarks.run import percentile, regressions, run
+from benchmarks.seed import seed
+
+
+def test_percentile_is_nearest_rank():
+    samples = [float(value) for value in range(1, 101)]
+    assert percentile(samples, 0.50) == 50.0
+    assert percentile(samples, 0.95) == 95.0
+    assert percentile(samples, 0.99) == 99.0
+    assert percentile([7.0], 0.99) == 7.0
+    assert percentile([], 0.5) == 0.0
+
+
+def report(p95_ms, throughput_rps):
+    return {"scenarios": {"menu_list": {"p95_ms": p95_ms, "throughput_rps": throughput_rps}}}
+
+
+def test_changes_within_the_tolerance_are_not_regressions():
+    assert regressions(report(10.9, 91.0), report(10.0, 100.0), 0.1) == []
+
+
+def test_slower_p95_and_lower_throughput_are_regressions():
+    found = regressions(report(11.5, 80.0), report(10.0, 100.0), 0.1)
+    assert [(item["scenario"], item["metric"]) for item in found] == [
+        ("menu_list", "p95_ms"), ("menu_list", "throughput_rps")
+    ]
+
+
+def test_scenarios_missing_from_the_baseline_are_skipped():
+    assert regressions(report(50.0, 1.0), {"scenarios": {}}, 0.1) == []
+
+
+def test_in_process_run_is_not_rate_limited(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_CALLER_BURST", 1)
+    with engine.begin() as conn:
+        manifest = seed(conn, argparse.Namespace(
+            merchants=2, categories=2, depth=2, menu_items=50, products=20,
+            product_categories=2, chunk_size=100, seed=1
+        ))
+    path = tmp_path / "bench-dataset.json"
+    path.write_text(json.dumps(manifest))
+
+    report = asyncio.run(run(argparse.Namespace(
+        url=None, manifest=str(path), scenario=["menu_list", "categories_list", "menu_update"],
+        concurrency=1, duration=0.2, warmup=0, seed=7
+    )))
+    for name, result in report["scenarios"].items():
+        assert result["requests"] > 0, name
+        assert result["errors"] == 0, (name, result["statuses"])
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from app.core.config import settings
+
+API = settings.API_V1_STR
+
+
+@pytest.fixture
+def row(make_category, merchant_id):
+    category = make_category()["id"]
+
+    def make(**fields):
+        return {
+            "name": "Item", "price_usd": 1.0, "price_khr": 4000.0, "item_type": "food",
+            "category_id": category, "merchant_id": merchant_id, **fields,
+        }
+
+    return make
+
+
+def menu(client):
+    return client.get(f"{API}/menu/", params={"cursor": ""}).json()["items"]
+
+
+def test_atomic_request_with_a_bad_row_writes_nothing(client, auth_headers, row):
+    rows = [row(name="A"), row(name="B", price_usd=-1), row(name="C")]
+    response = client.post(f"{API}/menu/bulk", json=rows, headers=auth_headers)
+    assert response.status_code == 400
+    result = response.json()["message"]
+    assert result["succeeded"] == 0
+    assert [error["index"] for error in result["errors"]] == [1]
+    assert menu(client) == []
+
+
+def test_partial_request_commits_the_valid_rows(client, auth_headers, row, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_CHUNK_SIZE", 2)
+    rows = [row(name="A"), row(name="B", price_usd=-1), row(name="C"), row(name="D"), row(name="E")]
+    response = client.post(f"{API}/menu/bulk?atomic=false", json=rows, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["processed"], result["succeeded"]) == (5, 4)
+    assert [error["index"] for error in result["errors"]] == [1]
+    assert [item["name"] for item in menu(client)] == ["A", "C", "D", "E"]
+    assert [item["id"] for item in menu(client)] == result["ids"]
+
+
+def test_ndjson_stream_reports_malformed_lines(client, auth_headers, row):
+    body = "\n".join([json.dumps(row(name="A")), "{not json", json.dumps(row(name="B"))]) + "\n"
+    response = client.post(
+        f"{API}/menu/bulk?atomic=false", content=body,
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["succeeded"] == 2
+    assert [error["index"] for error in response.json()["errors"]] == [1]
+
+
+def test_upsert_updates_by_external_id_and_the_last_duplicate_wins(client, auth_headers, row):
+    created = client.post(f"{API}/menu/bulk", json=[row(name="Old", external_id="x")], headers=auth_headers)
+    assert created.status_code == 200, created.text
+
+    rows = [row(name="First", external_id="x"), row(name="Second", external_id="x"), row(name="New", external_id="y")]
+    response = client.post(f"{API}/menu/bulk?upsert=true&atomic=false", json=rows, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert [error["index"] for error in response.json()["errors"]] == [0]
+    assert response.json()["ids"][0] == created.json()["ids"][0]
+    assert sorted(item["name"] for item in menu(client)) == ["New", "Second"]
+
+
+def test_bulk_update_changes_only_the_given_fields(client, auth_headers, row):
+    ids = client.post(f"{API}/menu/bulk", json=[row(name="A"), row(name="B")], headers=auth_headers).json()["ids"]
+    updates = [{"id": ids[0], "price_usd": 9.5}, {"id": 999999, "name": "Ghost"}]
+
+    response = client.put(f"{API}/menu/bulk", json=updates, headers=auth_headers)
+    assert response.status_code == 400
+    assert menu(client)[0]["price_usd"] == 1.0
+
+    response = client.put(f"{API}/menu/bulk?atomic=false", json=updates, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["errors"] == [{"index": 1, "id": 999999, "detail": "Menu item not found"}]
+    assert [(item["name"], item["price_usd"]) for item in menu(client)] == [("A", 9.5), ("B", 1.0)]
+
+
+def test_bulk_delete_reports_unknown_ids(client, auth_headers, row):
+    ids = client.post(f"{API}/menu/bulk", json=[row(), row(), row()], headers=auth_headers).json()["ids"]
+    response = client.request(
+        "DELETE", f"{API}/menu/bulk", json={"ids": [ids[0], 999999, ids[2]]}, headers=auth_headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["ids"] == [ids[0], ids[2]]
+    assert [error["id"] for error in response.json()["errors"]] == [999999]
+    assert [item["id"] for item in menu(client)] == [ids[1]]
@@ -0,0 +1,258 @@
+import asyncio
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import Cache, RedisCacheBackend
+from app.core.menu_cache import MenuSnapshot
+
+
+class Clock:
+    """Stands in for the ``time`` module so expiry can be stepped through"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+def counting_loader(values):
+    """A loader returning ``values`` in turn, recording how often it ran"""
+    calls = []
+
+    async def loader():
+        calls.append(None)
+        await asyncio.sleep(0)
+        return values[len(calls) - 1]
+
+    return loader, calls
+
+
+async def settle():
+    # Let background refreshes and shared-tier evictions finish
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_misses_run_one_load(clock):
+    async def scenario():
+        cache = Cache("test", 16)
+        loader, calls = counting_loader(["page"])
+        results = await asyncio.gather(*(cache.get_or_set("key", loader, ttl=10) for _ in range(10)))
+        assert results == ["page"] * 10
+        assert len(calls) == 1
+        assert await cache.get("key") == "page"
+
+    asyncio.run(scenario())
+
+
+def test_failed_load_reaches_every_waiter_and_is_not_cached(clock):
+    async def scenario():
+        cache = Cache("test", 16)
+        calls = []
+
+        async def failing():
+            calls.append(None)
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *(cache.get_or_set("key", failing, ttl=10) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(calls) == 1
+        assert await cache.get("key") is None
+
+    asyncio.run(scenario())
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(clock):
+    async def scenario():
+        cache = Cache("test", 16)
+        loader, calls = counting_loader(["v1", "v2"])
+        assert await cache.get_or_set("key", loader, ttl=10, stale_ttl=30) == "v1"
+
+        clock.now += 15
+        stale = await asyncio.gather(*(cache.get_or_set("key", loader, ttl=10, stale_ttl=30) for _ in range(5)))
+        assert stale == ["v1"] * 5
+        await settle()
+        assert len(calls) == 2
+        assert await cache.get_or_set("key", loader, ttl=10, stale_ttl=30) == "v2"
+
+    asyncio.run(scenario())
+
+
+def test_entry_past_its_stale_window_is_reloaded(clock):
+    async def scenario():
+        cache = Cache("test", 16)
+        loader, calls = counting_loader(["v1", "v2"])
+        await cache.get_or_set("key", loader, ttl=10, stale_ttl=30)
+
+        clock.now += 41
+        assert await cache.get("key") is None
+        assert await cache.get_or_set("key", loader, ttl=10, stale_ttl=30) == "v2"
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_tags_evicts_only_tagged_entries(clock):
+    async def scenario():
+        cache = Cache("test", 16)
+        await cache.set("a", 1, ttl=10, tags=[("merchant", 1)])
+        await cache.set("b", 2, ttl=10, tags=[("merchant", 2)])
+        await cache.set("c", 3, ttl=10, tags=[("merchant", 1), ("merchant", 2)])
+
+        await cache.invalidate_tags(("merchant", 1))
+        assert await cache.get("a") is None
+        assert await cache.get("b") == 2
+        assert await cache.get("c") is None
+
+    asyncio.run(scenario())
+
+
+def test_value_loaded_across_an_invalidation_is_not_kept(clock):
+    async def scenario():
+        cache = Cache("test", 16)
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def slow_loader():
+            started.set()
+            await release.wait()
+            return "read before the write"
+
+        load = asyncio.create_task(cache.get_or_set("key", slow_loader, ttl=10, tags=[("merchant", 1)]))
+        await started.wait()
+        cache.invalidate_local(("merchant", 1))
+        release.set()
+
+        assert await load == "read before the write"
+        assert await cache.get("key") is None
+
+    asyncio.run(scenario())
+
+
+def test_evict_changed_without_tags_clears_the_local_tier(clock):
+    async def scenario():
+        cache = Cache("test", 16)
+        await cache.set("a", 1, ttl=10, tags=[("merchant", 1)])
+        await cache.set("b", 2, ttl=10)
+
+        cache.evict_changed()
+        assert await cache.get("a") is None
+        assert await cache.get("b") is None
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        cache_module.aioredis, "from_url", lambda url: fakeredis.FakeAsyncRedis(server=server)
+    )
+
+    def connect() -> RedisCacheBackend:
+        # One backend per simulated worker, all talking to the same server
+        return RedisCacheBackend("redis://fake")
+
+    return connect
+
+
+def test_shared_tier_is_seen_by_other_workers(shared):
+    async def scenario():
+        writer = Cache("test", 16, shared())
+        reader = Cache("test", 16, shared())
+        await writer.set("key", "page", ttl=10, tags=[("merchant", 1)])
+        assert await reader.get("key") == "page"
+
+        await writer.invalidate_tags(("merchant", 1))
+        # The reader's local copy lives until the change reaches it
+        reader.invalidate_local(("merchant", 1))
+        assert await reader.get("key") is None
+
+    asyncio.run(scenario())
+
+
+def test_change_evicts_a_stale_page_another_worker_stored(shared):
+    async def scenario():
+        renderer = Cache("test", 16, shared())
+        writer = Cache("test", 16, shared())
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def slow_loader():
+            started.set()
+            await release.wait()
+            return "read before the write"
+
+        load = asyncio.create_task(renderer.get_or_set("key", slow_loader, ttl=10, tags=[("merchant", 1)]))
+        await started.wait()
+        # The writer commits and invalidates before the renderer finishes and hears of the change
+        await writer.invalidate_tags(("merchant", 1))
+        release.set()
+        await load
+        assert await Cache("test", 16, shared()).get("key") == "read before the write"
+
+        renderer.evict_changed(("merchant", 1))
+        await settle()
+        assert await Cache("test", 16, shared()).get("key") is None
+
+    asyncio.run(scenario())
+
+
+def test_evict_changed_without_tags_clears_the_shared_namespace(shared):
+    async def scenario():
+        menus = Cache("menus", 16, shared())
+        other = Cache("other", 16, shared())
+        reader = Cache("menus", 16, shared())
+        await menus.set("a", 1, ttl=10, tags=[("merchant", 1)])
+        await menus.set("b", 2, ttl=10)
+        await other.set("a", 3, ttl=10)
+
+        menus.evict_changed()
+        await settle()
+        assert await reader.get("a") is None
+        assert await reader.get("b") is None
+        assert await other.get("a") == 3
+
+    asyncio.run(scenario())
+
+
+def test_tags_only_evict_their_own_namespace(shared):
+    async def scenario():
+        menus = Cache("menus", 16, shared())
+        principals = Cache("principals", 16, shared())
+        await menus.set("a", 1, ttl=10, tags=[("user", "admin")])
+        await principals.set("a", 2, ttl=10, tags=[("user", "admin")])
+
+        await menus.invalidate_tags(("user", "admin"))
+        assert await Cache("menus", 16, shared()).get("a") is None
+        assert await Cache("principals", 16, shared()).get("a") == 2
+
+    asyncio.run(scenario())
+
+
+def test_shared_entries_are_decoded_to_the_value_type(shared):
+    async def scenario():
+        writer = Cache("menu", 16, shared(), MenuSnapshot)
+        reader = Cache("menu", 16, shared(), MenuSnapshot)
+        snapshot = MenuSnapshot(body=b'{"items": []}\xff', etag='W/"1"')
+        await writer.set("key", snapshot, ttl=10, tags=[("merchant", 1)])
+        assert await reader.get("key") == snapshot
+
+        # Tags read back from the shared tier still evict the reader's local copy
+        reader.invalidate_local(("merchant", 1))
+        await writer.invalidate_tags(("merchant", 1))
+        assert await reader.get("key") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,49 @@
+from app.core.config import settings
+
+API = settings.API_V1_STR
+
+
+def stats(client, category_id):
+    response = client.get(f"{API}/categories/{category_id}")
+    assert response.status_code == 200, response.text
+    return response.json()["stats"] or {}
+
+
+def test_single_item_writes_apply_deltas(client, auth_headers, make_category, make_item, merchant_id):
+    drinks, food = make_category()["id"], make_category()["id"]
+    make_item(drinks, price_usd=2.0, item_type="beverage")
+    cheap = make_item(drinks, price_usd=1.0, item_type="beverage")
+    assert stats(client, drinks)["items_total"] == 2
+    assert stats(client, drinks)["min_price_usd"] == 1.0
+
+    moved = {
+        "name": "Tea", "price_usd": 1.0, "price_khr": 4000.0, "item_type": "beverage",
+        "category_id": food, "merchant_id": merchant_id,
+    }
+    response = client.put(f"{API}/menu/{cheap['id']}", json=moved, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert stats(client, drinks)["items_total"] == 1
+    assert stats(client, drinks)["min_price_usd"] == 2.0
+    assert stats(client, food)["items_by_type"] == {"beverage": 1}
+
+    assert client.delete(f"{API}/menu/{cheap['id']}", headers=auth_headers).status_code == 200
+    assert stats(client, food)["items_total"] == 0
+    assert stats(client, food)["min_price_usd"] is None
+
+
+def test_upsert_moving_an_item_refreshes_both_categories(client, auth_headers, make_category, merchant_id):
+    old, new = make_category()["id"], make_category()["id"]
+    row = {
+        "name": "Latte", "price_usd": 3.0, "price_khr": 12000.0, "item_type": "beverage",
+        "merchant_id": merchant_id, "external_id": "latte",
+    }
+    response = client.post(f"{API}/menu/bulk", json=[{**row, "category_id": old}], headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert stats(client, old)["items_total"] == 1
+
+    response = client.post(
+        f"{API}/menu/bulk?upsert=true", json=[{**row, "category_id": new}], headers=auth_headers
+    )
+    assert response.status_code == 200, response.text
+    assert stats(client, old)["items_total"] == 0
+    assert stats(client, new)["items_total"] == 1
@@ -0,0 +1,53 @@
+import re
+
+from app.core.config import settings
+
+API = settings.API_V1_STR
+
+
+def query_count(response) -> int:
+    return int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+
+
+def shape(nodes):
+    return [(node["name"], node["items_count"], shape(node["subcategories"])) for node in nodes]
+
+
+def build(make_category, make_item, levels, per_level):
+    """A full tree of ``per_level`` children per node, one item per leaf"""
+    parents = [None]
+    for level in range(levels):
+        parents = [
+            make_category(name=f"L{level}-{number}", parent_id=parent)["id"]
+            for parent in parents for number in range(per_level)
+        ]
+    for leaf in parents:
+        make_item(leaf)
+
+
+def test_tree_nests_categories_with_their_counts(client, make_category, make_item, merchant_id):
+    drinks = make_category(name="Drinks", display_order=1)["id"]
+    food = make_category(name="Food", display_order=0)["id"]
+    coffee = make_category(name="Coffee", parent_id=drinks)["id"]
+    make_category(name="Hidden", parent_id=food, is_active=False)
+    make_item(coffee)
+    make_item(coffee)
+
+    tree = client.get(f"{API}/categories/tree", params={"merchant_id": merchant_id}).json()
+    assert shape(tree) == [("Food", 0, []), ("Drinks", 0, [("Coffee", 2, [])])]
+    assert tree[1]["subcategories"][0]["stats"]["items_total"] == 2
+
+    tree = client.get(f"{API}/categories/tree", params={"merchant_id": merchant_id, "include_inactive": True}).json()
+    assert shape(tree)[0] == ("Food", 0, [("Hidden", 0, [])])
+
+    tree = client.get(f"{API}/categories/tree", params={"merchant_id": merchant_id, "max_depth": 1}).json()
+    assert shape(tree) == [("Food", 0, []), ("Drinks", 0, [])]
+
+
+def test_tree_query_count_does_not_grow_with_the_tree(client, make_category, make_item, merchant_id):
+    build(make_category, make_item, levels=1, per_level=1)
+    small = query_count(client.get(f"{API}/categories/tree", params={"merchant_id": merchant_id}))
+    build(make_category, make_item, levels=3, per_level=3)
+    large = client.get(f"{API}/categories/tree", params={"merchant_id": merchant_id})
+    assert len(large.json()) == 4
+    assert query_count(large) == small
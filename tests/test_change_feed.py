@@ -0,0 +1,130 @@
+import json
+
+import pytest
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.db.change_feed import (
+    MAX_PAYLOAD_BYTES,
+    ChangeBus,
+    ChangeEvent,
+    change_bus,
+    coalesce,
+    decode_payload,
+    encode_payloads,
+    record_changes,
+)
+from app.db.session import SessionLocal
+from app.models.menu import MenuCategory
+from app.models.merchant import Merchant
+
+API = settings.API_V1_STR
+
+
+@pytest.fixture
+def published():
+    """Batches published on the change bus while the test runs"""
+    batches = []
+    change_bus.subscribe(batches.append)
+    yield batches
+    change_bus.unsubscribe(batches.append)
+
+
+def changes(batches):
+    return sorted((change.table, change.id, change.merchant_id) for batch in batches for change in batch)
+
+
+def test_coalesce_merges_per_merchant_past_the_limit():
+    events = [ChangeEvent("menu_items", 1, 7, "2024-01-01"), ChangeEvent("menu_items", 1, 7, "2024-01-02")]
+    assert coalesce(events, 10) == [ChangeEvent("menu_items", 1, 7, "2024-01-02")]
+
+    events = [ChangeEvent("menu_items", id, id % 2, f"2024-01-0{id}") for id in range(1, 6)]
+    assert sorted(coalesce(events, 4), key=lambda change: change.merchant_id) == [
+        ChangeEvent("menu_items", None, 0, "2024-01-04"),
+        ChangeEvent("menu_items", None, 1, "2024-01-05"),
+    ]
+
+
+def test_payloads_fit_a_notification_and_round_trip():
+    events = [ChangeEvent("products", id, None, "2024-01-01T00:00:00") for id in range(500)]
+    payloads = list(encode_payloads(events))
+    assert len(payloads) > 1
+    assert all(len(payload) <= MAX_PAYLOAD_BYTES for payload in payloads)
+    assert [change for payload in payloads for change in decode_payload(payload)] == events
+    assert json.loads(payloads[0])[0] == {"table": "products", "id": 0, "merchant_id": None, "updated_at": "2024-01-01T00:00:00"}
+
+
+def test_failing_subscriber_does_not_stop_the_others():
+    bus, received = ChangeBus(), []
+
+    def broken(events):
+        raise RuntimeError("boom")
+
+    bus.subscribe(broken)
+    bus.subscribe(received.append)
+    bus.subscribe(received.append)
+    bus.publish([ChangeEvent("products")])
+    assert received == [[ChangeEvent("products")]]
+
+
+def test_commit_publishes_and_rollback_discards(merchant_id, published):
+    with SessionLocal() as db:
+        db.add(MenuCategory(name="Drinks", slug="drinks", merchant_id=merchant_id))
+        db.flush()
+        db.rollback()
+    assert published == []
+
+    with SessionLocal() as db:
+        category = MenuCategory(name="Drinks", slug="drinks", merchant_id=merchant_id)
+        db.add(category)
+        db.commit()
+        assert changes(published) == [("menu_categories", category.id, merchant_id)]
+        assert published[0][0].updated_at is not None
+
+        # Moving a row changes both merchants
+        other = Merchant(name="Other merchant")
+        db.add(other)
+        db.flush()
+        published.clear()
+        category.merchant_id = other.id
+        db.commit()
+        assert changes(published) == [
+            ("menu_categories", category.id, merchant_id), ("menu_categories", category.id, other.id),
+        ]
+
+
+def test_statement_writes_count_as_whole_table_changes(merchant_id, published):
+    with SessionLocal() as db:
+        db.execute(update(MenuCategory).values(is_active=False))
+        db.commit()
+    assert changes(published) == [("menu_categories", None, None)]
+    assert published[0][0].whole_table
+
+    published.clear()
+    with SessionLocal() as db:
+        statement = update(MenuCategory).where(MenuCategory.merchant_id == merchant_id).values(is_active=True)
+        db.execute(statement, execution_options={"changes_recorded": True})
+        record_changes(db, [ChangeEvent("menu_categories", None, merchant_id)])
+        db.commit()
+    assert changes(published) == [("menu_categories", None, merchant_id)]
+
+
+def test_large_transactions_send_one_event_per_merchant(monkeypatch, merchant_id, published):
+    monkeypatch.setattr(settings, "CHANGE_FEED_MAX_EVENTS", 3)
+    with SessionLocal() as db:
+        db.add_all(MenuCategory(name=f"C{number}", slug=f"c-{number}", merchant_id=merchant_id) for number in range(5))
+        db.commit()
+    assert changes(published) == [("menu_categories", None, merchant_id)]
+
+
+def test_api_writes_reach_the_bus(client, auth_headers, make_category, make_item, published):
+    category = make_category()["id"]
+    item = make_item(category)
+    assert ("menu_items", item["id"], item["merchant_id"]) in changes(published)
+
+    published.clear()
+    response = client.request(
+        "DELETE", f"{API}/menu/bulk", json={"ids": [item["id"]]}, headers=auth_headers
+    )
+    assert response.status_code == 200, response.text
+    assert ("menu_items", item["id"], item["merchant_id"]) in changes(published)
@@ -0,0 +1,119 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+from app.core.config import settings
+
+API = settings.API_V1_STR
+
+BODY = b'{"name": "Iced Coffee"}' * 100
+
+
+@pytest.mark.parametrize("accept_encoding, brotli_available, expected", [
+    ("", True, None),
+    ("gzip, deflate", True, "gzip"),
+    ("gzip, br", True, "br"),
+    ("gzip, br", False, "gzip"),
+    ("br;q=0.5, gzip", True, "gzip"),
+    ("gzip;q=0, identity", True, None),
+    ("*", False, "gzip"),
+    ("*, gzip;q=0", False, None),
+])
+def test_negotiate_encoding(accept_encoding, brotli_available, expected):
+    assert negotiate_encoding(accept_encoding, brotli_available) == expected
+
+
+@pytest.fixture
+def compressing_client():
+    async def small(request):
+        return Response(b'{"ok": true}', media_type="application/json")
+
+    async def large(request):
+        return Response(BODY, media_type="application/json", headers={"ETag": '"v1"'})
+
+    async def streamed(request):
+        async def chunks():
+            for _ in range(4):
+                yield BODY[:600]
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    async def encoded(request):
+        return Response(gzip.compress(BODY), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+    async def binary(request):
+        return Response(BODY, media_type="image/png")
+
+    async def not_modified(request):
+        return Response(status_code=304, headers={"ETag": '"v1"'})
+
+    app = Starlette(routes=[
+        Route(f"/{endpoint.__name__}", endpoint)
+        for endpoint in (small, large, streamed, encoded, binary, not_modified)
+    ])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app, headers={"Accept-Encoding": "gzip"})
+
+
+def raw(client, path):
+    """The response with its body still encoded"""
+    with client.stream("GET", path) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_bodies_below_the_minimum_are_sent_as_is(compressing_client):
+    response, body = raw(compressing_client, "/small")
+    assert "content-encoding" not in response.headers
+    assert body == b'{"ok": true}'
+
+
+def test_large_bodies_are_gzipped_with_a_weak_etag(compressing_client):
+    response, body = raw(compressing_client, "/large")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) == len(body) < len(BODY)
+    assert gzip.decompress(body) == BODY
+
+    response, body = raw(TestClient(compressing_client.app, headers={"Accept-Encoding": "identity"}), "/large")
+    assert "content-encoding" not in response.headers
+    assert body == BODY
+
+
+def test_streamed_bodies_are_compressed_once_past_the_minimum(compressing_client):
+    response, body = raw(compressing_client, "/streamed")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(body) == BODY[:600] * 4
+
+
+@pytest.mark.parametrize("path", ["/encoded", "/binary", "/not_modified"])
+def test_other_responses_pass_through(compressing_client, path):
+    response, body = raw(compressing_client, path)
+    assert response.headers.get("content-encoding") == ("gzip" if path == "/encoded" else None)
+    if path == "/not_modified":
+        assert response.headers["etag"] == '"v1"'
+
+
+def test_sparse_fieldsets_shrink_api_responses(client, make_category, make_item, merchant_id):
+    category = make_category()["id"]
+    for number in range(20):
+        make_item(category, name=f"Item {number}", description="A fairly long description " * 5)
+
+    params = {"merchant_id": merchant_id}
+    full = client.get(f"{API}/menu/", params=params, headers={"Accept-Encoding": "gzip"})
+    assert full.headers["content-encoding"] == "gzip"
+    assert len(full.json()) == 20
+
+    sparse = client.get(f"{API}/menu/", params={**params, "fields": "name,price_usd"}, headers={"Accept-Encoding": "gzip"})
+    assert sparse.status_code == 200, sparse.text
+    assert "content-encoding" not in sparse.headers
+    assert sparse.json()[0] == {"id": sparse.json()[0]["id"], "name": "Item 0", "price_usd": 1.0}
+
+    response = client.get(f"{API}/menu/", params={**params, "fields": "name,secret"})
+    assert response.status_code == 400
+    assert "secret" in response.json()["message"]
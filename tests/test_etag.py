@@ -0,0 +1,58 @@
+from app.core.config import settings
+from app.utils.etag import etag_matches
+
+API = settings.API_V1_STR
+
+
+def test_if_none_match_uses_weak_comparison():
+    assert etag_matches('W/"abc"', 'W/"abc"')
+    assert etag_matches('"abc"', 'W/"abc"')
+    assert etag_matches('"x", W/"abc"', 'W/"abc"')
+    assert etag_matches("*", 'W/"abc"')
+    assert not etag_matches('W/"abd"', 'W/"abc"')
+    assert not etag_matches(None, 'W/"abc"')
+
+
+def revalidate(client, path, **params):
+    first = client.get(path, params=params)
+    assert first.status_code == 200, first.text
+    etag = first.headers["etag"]
+    again = client.get(path, params=params, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert again.content == b""
+    return etag
+
+
+def test_unchanged_listings_get_304(client, make_category, make_item, make_product, merchant_id):
+    category = make_category()["id"]
+    item = make_item(category)
+    make_product()
+    revalidate(client, f"{API}/menu/", merchant_id=merchant_id)
+    revalidate(client, f"{API}/menu/", cursor="")
+    revalidate(client, f"{API}/menu/{item['id']}")
+    revalidate(client, f"{API}/categories/", merchant_id=merchant_id)
+    revalidate(client, f"{API}/categories/{category}")
+    revalidate(client, f"{API}/products/")
+
+
+def test_writes_change_the_etag(client, auth_headers, make_category, make_item, merchant_id):
+    category = make_category()["id"]
+    item = make_item(category)
+    menu = revalidate(client, f"{API}/menu/", cursor="")
+    categories = revalidate(client, f"{API}/categories/", merchant_id=merchant_id)
+
+    assert client.delete(f"{API}/menu/{item['id']}", headers=auth_headers).status_code == 200
+    # Item counts are part of the category payload, so both change
+    for path, params, etag in ((f"{API}/menu/", {"cursor": ""}, menu),
+                               (f"{API}/categories/", {"merchant_id": merchant_id}, categories)):
+        response = client.get(path, params=params, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+
+def test_etag_varies_with_query_and_language(client, make_category, make_item):
+    make_item(make_category()["id"])
+    base = client.get(f"{API}/menu/", params={"cursor": ""}).headers["etag"]
+    assert client.get(f"{API}/menu/", params={"cursor": "", "limit": 5}).headers["etag"] != base
+    assert client.get(f"{API}/menu/", params={"cursor": ""}, headers={"Accept-Language": "km"}).headers["etag"] != base
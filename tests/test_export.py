@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+
+from app.core.config import settings
+
+API = settings.API_V1_STR
+
+
+def test_export_needs_a_token(client):
+    assert client.get(f"{API}/menu/export").status_code == 401
+    assert client.get(f"{API}/products/export").status_code == 401
+
+
+def test_ndjson_export_streams_every_row_in_id_order(client, auth_headers, make_category, make_item, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    category = make_category()["id"]
+    ids = [make_item(category, name=f"Item {number}", translations={"km": "ម"})["id"] for number in range(5)]
+
+    response = client.get(f"{API}/menu/export", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == ids
+    assert rows[0]["translations"] == {"km": "ម"}
+    assert rows[0]["item_type"] == "food"
+
+
+def test_csv_export_has_a_header_and_json_encoded_documents(client, auth_headers, make_product):
+    make_product(name="Serum")
+    make_product(name="Lipstick", type="clothing", attributes={"size": "M", "color": "red"})
+
+    response = client.get(f"{API}/products/export", params={"format": "csv"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert 'filename="products.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["name"] for row in rows] == ["Serum", "Lipstick"]
+    assert json.loads(rows[1]["attributes"]) == {"size": "M", "color": "red"}
+
+    response = client.get(f"{API}/products/export", params={"attr.size": "M"}, headers=auth_headers)
+    assert [json.loads(line)["name"] for line in response.text.splitlines()] == ["Lipstick"]
+
+
+def test_compressed_export_is_gzip_encoded(client, auth_headers, make_category, make_item):
+    make_item(make_category()["id"], name="Latte")
+    response = client.get(f"{API}/menu/export", params={"compress": True}, headers=auth_headers)
+    assert response.headers["content-encoding"] == "gzip"
+    # httpx has already decoded the body
+    assert json.loads(response.text.splitlines()[0])["name"] == "Latte"
+
+
+def test_unknown_format_is_rejected(client, auth_headers):
+    assert client.get(f"{API}/menu/export", params={"format": "xml"}, headers=auth_headers).status_code == 400
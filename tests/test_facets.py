@@ -0,0 +1,65 @@
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.menu import MenuItem
+
+API = settings.API_V1_STR
+
+
+def counts(values):
+    return {facet["value"]: facet["count"] for facet in values}
+
+
+def test_product_facets_count_the_matching_products(client, make_product, product_category_id):
+    def clothing(name, price, **attributes):
+        make_product(name=name, price=price, type="clothing", attributes={"brand": "Acme", "color": "red", **attributes})
+
+    clothing("Shirt", 8, size="M", material=["cotton", "linen"])
+    clothing("Coat", 120, size="L", material="wool")
+    clothing("Scarf", 30, size="M", brand="Other")
+    make_product(name="Cream", price=600)
+
+    response = client.get(f"{API}/products/facets")
+    assert response.status_code == 200, response.text
+    facets = response.json()
+    assert facets["total"] == 4
+    assert counts(facets["type"]) == {"clothing": 3, "cosmetic": 1}
+    assert counts(facets["category"]) == {str(product_category_id): 4}
+    # Buckets come back in price order, empty ones left out
+    assert [(bucket["value"], bucket["count"]) for bucket in facets["price"]] == [
+        ("0-10", 1), ("25-50", 1), ("100-250", 1), ("500+", 1),
+    ]
+    assert counts(facets["attributes"]["brand"]) == {"Acme": 3, "Other": 1}
+    # List values count once per element; number attributes are not faceted
+    assert counts(facets["attributes"]["material"]) == {"cotton": 1, "linen": 1, "wool": 1}
+    assert "volume" not in facets["attributes"]
+
+    facets = client.get(f"{API}/products/facets", params={"product_type": "clothing", "attr.size": "M"}).json()
+    assert facets["total"] == 2
+    assert facets["attributes"]["brand"] == [{"value": "Acme", "count": 1}, {"value": "Other", "count": 1}]
+    assert "skin_type" not in facets["attributes"]
+
+
+def test_menu_facets_follow_the_merchant_and_category(client, make_category, make_item, merchant_id):
+    mains, drinks = make_category()["id"], make_category()["id"]
+    rice = make_item(mains, price_usd=4.5)["id"]
+    soup = make_item(mains, price_usd=12)["id"]
+    make_item(drinks, price_usd=1.5, item_type="beverage")
+    # Item attributes aren't part of the API schemas, so they are written directly
+    with SessionLocal() as db:
+        db.get(MenuItem, rice).attributes = {"spicy": True, "tags": ["rice", "pork"]}
+        db.get(MenuItem, soup).attributes = {"tags": ["rice"], "extra": {"nested": 1}}
+        db.commit()
+
+    facets = client.get(f"{API}/menu/facets", params={"merchant_id": merchant_id}).json()
+    assert facets["total"] == 3
+    assert counts(facets["type"]) == {"food": 2, "beverage": 1}
+    assert counts(facets["category"]) == {str(mains): 2, str(drinks): 1}
+    assert counts(facets["price"]) == {"0-2": 1, "2-5": 1, "10-20": 1}
+    assert counts(facets["attributes"]["tags"]) == {"rice": 2, "pork": 1}
+    assert counts(facets["attributes"]["spicy"]) == {"1": 1}
+    assert "extra" not in facets["attributes"]
+
+    facets = client.get(f"{API}/menu/facets", params={"merchant_id": merchant_id, "category_id": drinks}).json()
+    assert facets["total"] == 1
+    assert facets["attributes"] == {}
+    assert client.get(f"{API}/menu/facets", params={"merchant_id": merchant_id + 1}).json()["total"] == 0
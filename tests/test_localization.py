@@ -0,0 +1,72 @@
+import pytest
+
+from app.core.config import settings
+from app.utils.i18n import negotiate_language
+
+API = settings.API_V1_STR
+
+
+@pytest.mark.parametrize("lang, accept_language, expected", [
+    (None, None, None),
+    ("km", "en", "km"),
+    ("en", "km", None),
+    (None, "km-KH,en;q=0.8", "km"),
+    (None, "fr, en;q=0.5, km;q=0.9", "km"),
+    (None, "km;q=0, en;q=0.1", None),
+    (None, "fr, de", None),
+    (None, "*, km;q=0.5", None),
+    (None, "km;q=oops, en;q=0.5", None),
+])
+def test_negotiate_language(lang, accept_language, expected):
+    assert negotiate_language(lang, accept_language) == expected
+
+
+def test_menu_items_are_localized_in_the_query(client, make_category, make_item, merchant_id):
+    category = make_category()["id"]
+    translations = {"km": "កាហ្វេ", "km.description": "ផ្អែម"}
+    coffee = make_item(category, name="Coffee", description="Sweet", translations=translations)["id"]
+    make_item(category, name="Tea")
+
+    def items(**params):
+        headers = {}
+        if "accept_language" in params:
+            headers["Accept-Language"] = params.pop("accept_language")
+        response = client.get(f"{API}/menu/", params={"merchant_id": merchant_id, **params}, headers=headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    localized = items(lang="km")
+    # Untranslated fields fall back to the base values
+    assert [(item["name"], item["description"]) for item in localized] == [("កាហ្វេ", "ផ្អែម"), ("Tea", None)]
+    assert localized[0]["translations"] == translations
+    assert [item["name"] for item in items(accept_language="km-KH, en;q=0.5")] == ["កាហ្វេ", "Tea"]
+
+    trimmed = items(lang="km", include_translations="false")
+    assert [item["name"] for item in trimmed] == ["កាហ្វេ", "Tea"]
+    assert all("translations" not in item for item in trimmed)
+    # Localizing doesn't touch the stored rows
+    assert [item["name"] for item in items()] == ["Coffee", "Tea"]
+
+    detail = client.get(f"{API}/menu/{coffee}", params={"lang": "km", "include_translations": "false"}).json()
+    assert (detail["name"], detail["description"]) == ("កាហ្វេ", "ផ្អែម")
+    assert "translations" not in detail
+    assert client.get(f"{API}/menu/{coffee}", headers={"Accept-Language": "fr"}).json()["name"] == "Coffee"
+
+
+def test_categories_are_localized_in_the_query(client, make_category, merchant_id):
+    drinks = make_category(name="Drinks", description="Cold and hot",
+                           translations={"km": "ភេសជ្ជៈ", "km.description": "ត្រជាក់ និង ក្តៅ"})["id"]
+    make_category(name="Desserts", parent_id=drinks)
+
+    response = client.get(f"{API}/categories/{drinks}", headers={"Accept-Language": "km"})
+    assert response.status_code == 200, response.text
+    category = response.json()
+    assert (category["name"], category["description"]) == ("ភេសជ្ជៈ", "ត្រជាក់ និង ក្តៅ")
+    assert [child["name"] for child in category["subcategories"]] == ["Desserts"]
+
+    listed = client.get(
+        f"{API}/categories/", params={"merchant_id": merchant_id, "lang": "km", "include_translations": "false"}
+    ).json()
+    assert "ភេសជ្ជៈ" in [category["name"] for category in listed]
+    assert all("translations" not in category for category in listed)
+    assert client.get(f"{API}/categories/{drinks}").json()["name"] == "Drinks"
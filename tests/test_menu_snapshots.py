@@ -0,0 +1,61 @@
+import asyncio
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.menu_cache import menu_snapshots, snapshot_key
+from app.db.session import SessionLocal, engine
+from app.models.merchant import Merchant
+
+API = settings.API_V1_STR
+
+
+def rename_behind_the_api(item_id, name):
+    # A raw write publishes no change, so cached pages keep the old name
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE menu_items SET name = :name WHERE id = :id"), {"name": name, "id": item_id})
+
+
+def names(client, merchant_id):
+    response = client.get(f"{API}/menu/", params={"merchant_id": merchant_id})
+    assert response.status_code == 200, response.text
+    return [item["name"] for item in response.json()]
+
+
+def test_pages_are_served_from_the_snapshot_until_a_write(client, make_category, make_item, merchant_id):
+    category = make_category()["id"]
+    item = make_item(category, name="Latte")
+    response = client.get(f"{API}/menu/", params={"merchant_id": merchant_id})
+    assert response.headers["cache-control"] == f"public, max-age={settings.MENU_CACHE_MAX_AGE}"
+    assert asyncio.run(menu_snapshots.get(snapshot_key(merchant_id, "en", None, 0, 100))) is not None
+
+    rename_behind_the_api(item["id"], "Mocha")
+    assert names(client, merchant_id) == ["Latte"]
+
+    make_item(category, name="Tea")
+    assert names(client, merchant_id) == ["Mocha", "Tea"]
+
+
+def test_a_write_only_evicts_its_merchants_pages(client, make_category, make_item, merchant_id):
+    with SessionLocal() as db:
+        other = Merchant(name="Other merchant")
+        db.add(other)
+        db.commit()
+        other_id = other.id
+    mine = make_item(make_category()["id"], name="Latte")
+    theirs = make_item(make_category(merchant_id=other_id)["id"], name="Espresso", merchant_id=other_id)
+    assert names(client, merchant_id) == ["Latte"]
+    assert names(client, other_id) == ["Espresso"]
+
+    rename_behind_the_api(mine["id"], "Mocha")
+    rename_behind_the_api(theirs["id"], "Ristretto")
+    make_item(make_category()["id"], name="Tea")
+    assert names(client, merchant_id) == ["Mocha", "Tea"]
+    assert names(client, other_id) == ["Espresso"]
+
+
+def test_languages_get_their_own_snapshot(client, make_category, make_item, merchant_id):
+    make_item(make_category()["id"], name="Coffee", translations={"km": "កាហ្វេ"})
+    assert names(client, merchant_id) == ["Coffee"]
+    response = client.get(f"{API}/menu/", params={"merchant_id": merchant_id, "lang": "km"})
+    assert [item["name"] for item in response.json()] == ["កាហ្វេ"]
@@ -0,0 +1,26 @@
+from app.core.config import settings
+from app.core.metrics import _route_label
+
+API = settings.API_V1_STR
+
+
+class Route:
+    def __init__(self, path):
+        self.path = path
+
+
+def test_route_label_is_the_full_template():
+    scope = {"path": "/api/v1/menu/42", "route": Route("/{item_id}"), "path_params": {"item_id": 42}}
+    assert _route_label(scope) == "/api/v1/menu/{item_id}"
+    # Routes that already carry the prefix are left alone
+    scope = {"path": "/api/v1/menu/42", "route": Route("/api/v1/menu/{item_id:int}"), "path_params": {"item_id": 42}}
+    assert _route_label(scope) == "/api/v1/menu/{item_id:int}"
+    assert _route_label({"path": "/nowhere"}) == "unmatched"
+
+
+def test_routers_get_distinct_labels(client):
+    for path in ("/", f"{API}/menu/", f"{API}/categories/", f"{API}/menu/12345"):
+        client.get(path)
+    metrics = client.get("/metrics").text
+    for route in ("/", f"{API}/menu/", f"{API}/categories/", f"{API}/menu/{{item_id}}"):
+        assert f'http_request_duration_seconds_count{{method="GET",route="{route}"' in metrics
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.db.session import engine
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def alembic(database_url: str, *args: str) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "alembic", *args],
+        cwd=ROOT, env={**os.environ, "DATABASE_URL": database_url}, check=True, capture_output=True
+    )
+
+
+def schema(bind):
+    inspector = inspect(bind)
+    return {
+        table: sorted((index["name"], tuple(index["column_names"])) for index in inspector.get_indexes(table))
+        for table in inspector.get_table_names() if table != "alembic_version"
+    }
+
+
+def test_migrations_build_the_schema_of_the_models(database, tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    alembic(url, "upgrade", "head")
+    migrated = create_engine(url)
+    try:
+        assert schema(migrated) == schema(engine)
+    finally:
+        migrated.dispose()
+
+    alembic(url, "downgrade", "base")
+    migrated = create_engine(url)
+    try:
+        assert schema(migrated) == {}
+    finally:
+        migrated.dispose()
+
+
+def test_menu_listing_uses_the_composite_index(database):
+    with engine.connect() as conn:
+        plan = " ".join(str(row[-1]) for row in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM menu_items "
+            "WHERE merchant_id = 1 AND category_id = 2 AND id > 10 ORDER BY id LIMIT 20"
+        )))
+    assert "ix_menu_items_merchant_category" in plan
@@ -0,0 +1,60 @@
+from app.core.config import settings
+
+API = settings.API_V1_STR
+
+
+def walk(client, path, limit, **params):
+    """Every page of a cursor listing, as returned"""
+    pages, cursor = [], ""
+    while cursor is not None:
+        response = client.get(path, params={**params, "cursor": cursor, "limit": limit})
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = pages[-1]["next_cursor"]
+    return pages
+
+
+def test_menu_cursor_pages_cover_every_item_once(client, make_category, make_item):
+    category = make_category()["id"]
+    ids = [make_item(category, name=f"Item {number}")["id"] for number in range(5)]
+
+    pages = walk(client, f"{API}/menu/", 2)
+    assert [[item["id"] for item in page["items"]] for page in pages] == [ids[0:2], ids[2:4], ids[4:]]
+    assert [page["has_more"] for page in pages] == [True, True, False]
+    assert [page["page"] for page in pages] == [1, 2, 3]
+    # A lower bound until the last page, where it is exact
+    assert [page["total"] for page in pages] == [3, 5, 5]
+
+
+def test_menu_cursor_is_stable_under_deletes(client, auth_headers, make_category, make_item):
+    category = make_category()["id"]
+    ids = [make_item(category)["id"] for _ in range(4)]
+    first = client.get(f"{API}/menu/", params={"cursor": "", "limit": 2}).json()
+
+    # An offset would now skip ids[2]; the cursor continues after the last id seen
+    assert client.delete(f"{API}/menu/{ids[0]}", headers=auth_headers).status_code == 200
+    second = client.get(f"{API}/menu/", params={"cursor": first["next_cursor"], "limit": 2}).json()
+    assert [item["id"] for item in second["items"]] == ids[2:]
+
+
+def test_include_total_counts_exactly(client, make_category, make_item):
+    category = make_category()["id"]
+    for _ in range(3):
+        make_item(category)
+    page = client.get(f"{API}/menu/", params={"cursor": "", "limit": 1, "include_total": True}).json()
+    assert page["total"] == 3
+
+
+def test_categories_page_on_display_order_then_id(client, make_category):
+    orders = [2, 1, 2, 1, 0]
+    ids = [make_category(display_order=order)["id"] for order in orders]
+    expected = [category_id for _, category_id in sorted(zip(orders, ids))]
+
+    pages = walk(client, f"{API}/categories/", 2)
+    assert [category["id"] for page in pages for category in page["items"]] == expected
+
+
+def test_malformed_cursor_is_rejected(client):
+    for cursor in ("not-base64!", "eyJrIjpbXX0"):
+        response = client.get(f"{API}/menu/", params={"cursor": cursor})
+        assert response.status_code == 400
@@ -0,0 +1,49 @@
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+from app.db.pool import SYNC_POOL_SIZE, PoolStats, engine_options, worker_pool_size
+from app.db.session import get_async_database_url, get_sync_database_url
+
+POSTGRES = "postgresql+psycopg2://user:secret@db/shop"
+
+
+def test_bare_postgres_url_gets_the_installed_drivers():
+    assert get_sync_database_url("postgresql://user:secret@db/shop") == POSTGRES
+    assert get_async_database_url("postgresql://user:secret@db/shop") == "postgresql+asyncpg://user:secret@db/shop"
+
+
+def test_explicit_driver_and_sqlite_urls_are_kept():
+    assert get_sync_database_url("postgresql+psycopg://db/shop") == "postgresql+psycopg://db/shop"
+    assert get_sync_database_url("sqlite:///./app.db") == "sqlite:///./app.db"
+    assert get_async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+
+
+def test_pool_total_is_split_across_workers_and_engines(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_TOTAL", 40)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+    assert worker_pool_size() == 10 - SYNC_POOL_SIZE
+
+    async_stats, sync_stats = PoolStats("async"), PoolStats("sync")
+    async_options = engine_options(POSTGRES, async_stats, is_async=True)
+    sync_options = engine_options(POSTGRES, sync_stats)
+    assert issubclass(async_options["poolclass"], AsyncAdaptedQueuePool)
+    assert issubclass(sync_options["poolclass"], QueuePool)
+    # Neither engine may overflow, so the worker never opens more than its share
+    assert async_options["pool_size"] + sync_options["pool_size"] == 10
+    assert async_options["max_overflow"] == sync_options["max_overflow"] == 0
+    assert async_stats.max_overflow == sync_stats.max_overflow == 0
+
+
+def test_without_a_total_the_async_pool_uses_size_and_overflow(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_TOTAL", None)
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 3)
+    stats = PoolStats("async")
+    options = engine_options(POSTGRES, stats, is_async=True)
+    assert (options["pool_size"], options["max_overflow"]) == (7, 3)
+    assert stats.max_overflow == 3
+
+
+def test_sqlite_keeps_the_default_pool():
+    options = engine_options("sqlite:///./app.db", PoolStats("sync"))
+    assert "poolclass" not in options
@@ -0,0 +1,62 @@
+import json
+
+from app.core.config import settings
+
+API = settings.API_V1_STR
+
+
+def import_body(client, headers, body, content_type, **params):
+    response = client.post(
+        f"{API}/products/import", content=body, params=params,
+        headers={**headers, "Content-Type": content_type}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def products(client):
+    return {product["name"]: product for product in client.get(f"{API}/products/").json()}
+
+
+def test_csv_rows_are_validated_one_by_one(client, auth_headers, product_category_id):
+    body = "\n".join([
+        "name,description,price,stock,type,category_id,size,color,attributes",
+        f'Shirt,"Cotton,\nlong sleeves",20,3,clothing,{product_category_id},M,blue,',
+        f"Hat,,5,1,clothing,{product_category_id},,,",
+        f"Scarf,,8,2,clothing,{product_category_id}",
+        f'Boots,,50,1,clothing,{product_category_id},42,black,"{{""material"": ""leather""}}"',
+    ]) + "\n"
+    result = import_body(client, auth_headers, body.encode(), "text/csv", chunk_size=2)
+    assert (result["processed"], result["imported"], result["rejected"]) == (4, 2, 2)
+    assert [rejection["index"] for rejection in result["rejections"]] == [1, 2]
+    assert "size" in result["rejections"][0]["detail"]
+
+    imported = products(client)
+    assert imported["Shirt"]["description"] == "Cotton,\nlong sleeves"
+    assert imported["Shirt"]["attributes"] == {"size": "M", "color": "blue"}
+    assert imported["Boots"]["attributes"] == {"size": "42", "color": "black", "material": "leather"}
+
+
+def test_ndjson_import_resumes_from_a_record(client, auth_headers, product_category_id):
+    def record(name):
+        return json.dumps({
+            "name": name, "price": 1, "stock": 1, "type": "clothing",
+            "attributes": {"size": "S", "color": "red"}, "category_id": product_category_id,
+        })
+
+    body = "\n".join([record("A"), "{broken", record("B"), record("C")]) + "\n"
+    result = import_body(client, auth_headers, body.encode(), "application/x-ndjson", resume_from=2)
+    assert result["imported"] == 2
+    assert result["next_record"] == 4
+    assert sorted(products(client)) == ["B", "C"]
+
+    result = import_body(client, auth_headers, body.encode(), "application/x-ndjson")
+    assert result["rejected"] == 1
+    assert result["rejections"][0]["index"] == 1
+
+
+def test_import_needs_a_format(client, auth_headers):
+    response = client.post(
+        f"{API}/products/import", content=b"name\n", headers={**auth_headers, "Content-Type": "text/plain"}
+    )
+    assert response.status_code == 400
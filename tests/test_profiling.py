@@ -0,0 +1,63 @@
+import marshal
+
+import pytest
+
+from app.core import profiling
+from app.core.config import settings
+
+API = settings.API_V1_STR
+
+
+@pytest.fixture
+def profilers(monkeypatch):
+    def allow(*usernames):
+        monkeypatch.setattr(settings, "PROFILER_USERS", list(usernames))
+    return allow
+
+
+def test_profiling_is_off_without_profiler_users(client, auth_headers):
+    response = client.get(f"{API}/products/", headers={**auth_headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+
+def test_only_profiler_users_may_profile(client, auth_headers, profilers):
+    profilers("someone-else")
+    response = client.get(f"{API}/products/", params={"profile": "1"})
+    assert response.status_code == 401
+    response = client.get(f"{API}/products/", params={"profile": "1"}, headers=auth_headers)
+    assert response.status_code == 403
+    assert response.json() == {"message": "Profiling is not enabled for this user"}
+    # Without the flag nothing changes for anyone
+    assert client.get(f"{API}/products/").status_code == 200
+    assert client.get(f"{API}/system/profiles/missing", headers=auth_headers).status_code == 403
+
+
+def test_profiled_request_leaves_a_report(client, auth_headers, profilers, monkeypatch, make_product):
+    monkeypatch.setattr(profiling, "pyinstrument", None)
+    profilers("admin")
+    make_product()
+
+    response = client.get(f"{API}/products/", params={"attr.brand": "Acme"}, headers={**auth_headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    profile_id = response.headers["x-profile-id"]
+
+    url = f"{API}/system/profiles/{profile_id}"
+    report = client.get(url, headers=auth_headers).json()
+    assert report["username"] == "admin"
+    assert report["profiler"] == "cprofile"
+    assert (report["method"], report["path"], report["status"]) == ("GET", f"{API}/products/", 200)
+    assert report["query_string"] == "attr.brand=Acme"
+    assert report["query_count"] == len(report["queries"]) >= 2
+    assert any("FROM products" in query["sql"] for query in report["queries"])
+    assert report["formats"] == ["pstats", "text"]
+
+    assert "function calls" in client.get(url, params={"format": "text"}, headers=auth_headers).text
+    stats = marshal.loads(client.get(url, params={"format": "pstats"}, headers=auth_headers).content)
+    assert any(function[2] == "get_products" for function in stats)
+    assert client.get(url, params={"format": "html"}, headers=auth_headers).status_code == 404
+    assert client.get(f"{API}/system/profiles/missing", headers=auth_headers).status_code == 404
+
+    # Later requests are not profiled unless asked
+    assert "x-profile-id" not in client.get(f"{API}/products/", headers=auth_headers).headers
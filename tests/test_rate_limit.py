@@ -0,0 +1,172 @@
+import asyncio
+
+import pytest
+
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.rate_limit import MemoryRateLimitBackend, RateLimitMiddleware, client_address, trusted_networks
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def scope(path="/api/v1/categories/", method="GET", client="203.0.113.7", query=b"", headers=()):
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "client": (client, 50000),
+    }
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def call(middleware, request_scope):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(request_scope, receive, send)
+    start = messages[0]
+    return start["status"], dict((name.decode(), value.decode()) for name, value in start["headers"])
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_CALLER", 0.001)
+    monkeypatch.setattr(settings, "RATE_LIMIT_CALLER_BURST", 2)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MERCHANT", None)
+    monkeypatch.setattr(settings, "RATE_LIMIT_MERCHANT_BURST", 1)
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", [])
+
+
+def test_bucket_allows_the_burst_then_refills_at_the_rate(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+
+    async def scenario():
+        backend = MemoryRateLimitBackend()
+        assert [await backend.take("caller", rate=1, burst=2) for _ in range(2)] == [0.0, 0.0]
+        assert await backend.take("caller", rate=1, burst=2) == pytest.approx(1.0)
+        clock.now += 0.5
+        assert await backend.take("caller", rate=1, burst=2) == pytest.approx(0.5)
+        clock.now += 1
+        assert await backend.take("caller", rate=1, burst=2) == 0.0
+        # Other keys have their own bucket
+        assert await backend.take("other", rate=1, burst=2) == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_forwarded_for_is_only_read_from_trusted_proxies():
+    trusted = trusted_networks(["10.0.0.0/8"])
+    forwarded = [("x-forwarded-for", "198.51.100.1, 192.0.2.4, 10.1.2.3")]
+    # The client may send any X-Forwarded-For, so only the hop before our proxies counts
+    assert client_address(scope(client="10.0.0.2", headers=forwarded), trusted) == "192.0.2.4"
+    assert client_address(scope(client="203.0.113.7", headers=forwarded), trusted) == "203.0.113.7"
+    assert client_address(scope(client="10.0.0.2", headers=forwarded), []) == "10.0.0.2"
+    assert client_address(scope(client="10.0.0.2"), trusted) == "10.0.0.2"
+
+
+def test_callers_behind_a_trusted_proxy_get_their_own_buckets(limits, monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", ["10.0.0.0/8"])
+
+    async def scenario():
+        middleware = RateLimitMiddleware(ok_app, prefix="/api/v1")
+        for client in ("198.51.100.1", "198.51.100.2"):
+            request = scope(client="10.0.0.2", headers=[("x-forwarded-for", client)])
+            assert [(await call(middleware, request))[0] for _ in range(3)] == [200, 200, 429]
+
+    asyncio.run(scenario())
+
+
+def test_empty_bucket_gets_429_with_retry_after(limits):
+    async def scenario():
+        middleware = RateLimitMiddleware(ok_app, prefix="/api/v1")
+        assert (await call(middleware, scope()))[0] == 200
+        assert (await call(middleware, scope()))[0] == 200
+        status, headers = await call(middleware, scope())
+        assert status == 429
+        assert int(headers["retry-after"]) >= 1
+        # Paths outside the API prefix are not limited
+        assert (await call(middleware, scope(path="/metrics")))[0] == 200
+
+    asyncio.run(scenario())
+
+
+def test_disabled_limiter_lets_everything_through(limits, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+
+    async def scenario():
+        middleware = RateLimitMiddleware(ok_app, prefix="/api/v1")
+        assert {(await call(middleware, scope()))[0] for _ in range(5)} == {200}
+
+    asyncio.run(scenario())
+
+
+def test_merchant_bucket_is_opt_in_and_skips_snapshot_pages(limits, monkeypatch):
+    async def scenario(merchant_rate):
+        monkeypatch.setattr(settings, "RATE_LIMIT_PER_MERCHANT", merchant_rate)
+        middleware = RateLimitMiddleware(ok_app, prefix="/api/v1")
+        categories = [
+            (await call(middleware, scope(query=b"merchant_id=5", client=f"198.51.100.{number}")))[0]
+            for number in range(3)
+        ]
+        menu = [
+            (await call(middleware, scope(path="/api/v1/menu/", query=b"merchant_id=5", client=f"192.0.2.{number}")))[0]
+            for number in range(3)
+        ]
+        return categories, menu
+
+    assert asyncio.run(scenario(None)) == ([200, 200, 200], [200, 200, 200])
+    # Different callers share the merchant's bucket, but cached menu pages are not charged to it
+    assert asyncio.run(scenario(0.001)) == ([200, 429, 429], [200, 200, 200])
+
+
+def test_expensive_endpoints_are_capped_per_merchant(limits, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_CALLER_BURST", 100)
+
+    async def scenario():
+        release = asyncio.Event()
+        entered = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            entered.set()
+            await release.wait()
+            await ok_app(scope, receive, send)
+
+        middleware = RateLimitMiddleware(slow_app, prefix="/api/v1")
+        export = scope(path="/api/v1/menu/export", query=b"merchant_id=5")
+        first = asyncio.create_task(call(middleware, export))
+        await entered.wait()
+        assert (await call(middleware, scope(path="/api/v1/menu/export", query=b"merchant_id=5", client="192.0.2.1")))[0] == 429
+        release.set()
+        assert (await first)[0] == 200
+        # The slot is free again once the response is sent
+        assert (await call(middleware, export))[0] == 200
+
+    asyncio.run(scenario())
+
+
+def test_rejections_carry_cors_headers(client, limits, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_CALLER_BURST", 1)
+    headers = {"Origin": "https://shop.example"}
+    statuses = [client.get(f"{settings.API_V1_STR}/categories/", headers=headers) for _ in range(2)]
+    assert [response.status_code for response in statuses] == [200, 429]
+    assert statuses[1].headers["access-control-allow-origin"]
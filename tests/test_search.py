@@ -0,0 +1,71 @@
+from app.core.config import settings
+from app.utils.search_index import InvertedIndex, SearchDocument
+
+API = settings.API_V1_STR
+
+
+def build(*documents):
+    index = InvertedIndex()
+    for kind, id, name, description, translations in documents:
+        document = SearchDocument(kind, id, name, 1, translations)
+        index.add(document, [("name", name), ("description", description), *(("translation", t) for t in translations.values())])
+    return index.freeze()
+
+
+def ids(index, query, **kwargs):
+    return [document.id for _, document in index.search(query, 10, **kwargs)]
+
+
+def test_index_matches_prefixes_typos_and_khmer_substrings():
+    index = build(
+        ("menu_item", 1, "Iced Coffee", None, {"km": "កាហ្វេទឹកកក"}),
+        ("menu_item", 2, "Hot Chocolate", None, {}),
+        ("category", 3, "Drinks", "Coffee, tea and juices", {}),
+    )
+    assert ids(index, "coff") == [1, 3]
+    assert ids(index, "chocolat") == [2]
+    assert ids(index, "cofee") == [1, 3]
+    # Khmer runs words together, so a word is found inside the longer token
+    assert ids(index, "ទឹកកក") == [1]
+    # Every term has to match
+    assert ids(index, "iced coffee") == [1]
+    assert ids(index, "iced chocolate") == []
+    assert ids(index, "coffee", merchant_id=2) == []
+
+
+def test_name_matches_outrank_description_matches():
+    index = build(
+        ("category", 1, "Breakfast", "Served with coffee", {}),
+        ("menu_item", 2, "Coffee", None, {}),
+    )
+    scores = index.search("coffee", 10)
+    assert [document.id for _, document in scores] == [2, 1]
+    assert scores[0][0] > scores[1][0]
+
+
+def test_search_endpoint(client, auth_headers, make_category, make_item, make_product, merchant_id):
+    drinks = make_category(name="Drinks", translations={"km": "ភេសជ្ជៈ"})["id"]
+    coffee = make_item(drinks, name="Iced Coffee", translations={"km": "កាហ្វេទឹកកក"})["id"]
+    make_item(drinks, name="Old Coffee", is_active=False)
+    make_product(name="Coffee Mug", description="Keeps drinks hot")
+
+    def search(**params):
+        response = client.get(f"{API}/search", params=params)
+        assert response.status_code == 200, response.text
+        return [(hit["kind"], hit["name"]) for hit in response.json()["hits"]]
+
+    assert search(q="coffe") == [("menu_item", "Iced Coffee"), ("product", "Coffee Mug")]
+    # Products have no merchant, so a merchant search leaves them out
+    assert search(q="coffee", merchant_id=merchant_id) == [("menu_item", "Iced Coffee")]
+    assert search(q="ភេសជ្ជៈ", lang="km") == [("category", "ភេសជ្ជៈ")]
+    assert search(q="coffee", merchant_id=merchant_id + 1) == []
+    assert search(q="drinks hot") == [("product", "Coffee Mug")]
+
+    # Writes reach the index through the change feed
+    body = {"name": "Cold Brew", "price_usd": 1.0, "price_khr": 4000.0, "item_type": "beverage",
+            "category_id": drinks, "merchant_id": merchant_id}
+    assert client.put(f"{API}/menu/{coffee}", json=body, headers=auth_headers).status_code == 200
+    assert search(q="coffee", merchant_id=merchant_id) == []
+    assert search(q="brew") == [("menu_item", "Cold Brew")]
+
+    assert client.get(f"{API}/search", params={"q": ""}).status_code == 422
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+
+
+def test_cancelled_waiter_keeps_its_job_counted(monkeypatch):
+    monkeypatch.setattr(security, "_hash_capacity", 1)
+    started, release = threading.Event(), threading.Event()
+
+    def job():
+        started.set()
+        release.wait(5)
+        return "hash"
+
+    async def scenario():
+        waiter = asyncio.create_task(security._run_hash_job(job))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        # The job is still running on the pool, so the pool is still full
+        assert security._hash_in_flight == 1
+        with pytest.raises(HTTPException) as busy:
+            await security._run_hash_job(job)
+        assert busy.value.status_code == 503
+
+        release.set()
+        for _ in range(100):
+            if security._hash_in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert security._hash_in_flight == 0
+        assert await security._run_hash_job(lambda: "next") == "next"
+
+    asyncio.run(scenario())
+
+
+def test_password_round_trip_on_the_pool():
+    async def scenario():
+        hashed = await security.get_password_hash_async("secret")
+        assert await security.verify_password_async("secret", hashed)
+        assert not await security.verify_password_async("wrong", hashed)
+        assert security._hash_in_flight == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.products import Product
+from app.schemas.products import ProductBase
+from app.utils import serialization
+from app.utils.serialization import dump_json, render_json
+
+API = settings.API_V1_STR
+
+
+def test_dump_json_validates_before_encoding():
+    adapter = TypeAdapter(ProductBase)
+    row = {"name": "Lipstick", "price": 10, "stock": 5, "type": "cosmetic", "attributes": {}, "category_id": 3}
+    # Columns outside the schema are dropped, as response_model would
+    assert json.loads(dump_json(adapter, row)) == {
+        "name": "Lipstick", "description": None, "price": 10.0, "stock": 5, "type": "cosmetic", "attributes": {},
+    }
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_render_json_encodes_like_the_response_class(monkeypatch, fast):
+    monkeypatch.setattr(settings, "FAST_SERIALIZATION", fast)
+    content = {"name": "កាហ្វេ", "price": 1.5, "tags": ("a", "b")}
+    assert json.loads(render_json(content)) == {"name": "កាហ្វេ", "price": 1.5, "tags": ["a", "b"]}
+
+
+def test_fast_response_class_falls_back_without_orjson(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    body = serialization.FastJSONResponse({"name": "កាហ្វេ"}).body
+    assert json.loads(body) == {"name": "កាហ្វេ"}
+
+
+def test_fast_path_returns_the_same_documents(client, monkeypatch, make_category, make_item, make_product, merchant_id):
+    parent = make_category(translations={"km": "ភេសជ្ជៈ"})["id"]
+    child = make_category(parent_id=parent)["id"]
+    item = make_item(child, translations={"km": "កាហ្វេ"}, customizations=["size"])["id"]
+    make_item(child, name="Tea")
+    make_product(name="Shirt", type="clothing", attributes={"brand": "Acme", "size": "M", "color": "red", "material": ["cotton"]})
+    with SessionLocal() as db:
+        product = db.query(Product.id).filter(Product.name == "Shirt").scalar()
+
+    urls = [
+        (f"{API}/menu/", {"merchant_id": merchant_id, "cursor": "", "include_total": "true"}),
+        (f"{API}/menu/{item}", {"lang": "km"}),
+        (f"{API}/products/", {}),
+        (f"{API}/products/{product}", {}),
+        (f"{API}/categories/", {"merchant_id": merchant_id}),
+        (f"{API}/categories/", {"merchant_id": merchant_id, "cursor": ""}),
+        (f"{API}/categories/tree", {"merchant_id": merchant_id}),
+        (f"{API}/categories/{parent}", {"lang": "km"}),
+    ]
+
+    def responses():
+        bodies = []
+        for url, params in urls:
+            response = client.get(url, params=params)
+            assert response.status_code == 200, response.text
+            bodies.append((response.json(), response.headers["ETag"]))
+        return bodies
+
+    standard = responses()
+    monkeypatch.setattr(settings, "FAST_SERIALIZATION", True)
+    assert responses() == standard